@@ -0,0 +1,358 @@
+"""
+Headless benchmarks for the terminal's hot paths
+
+Drives TerminalWidget directly under the offscreen Qt platform and
+prints the results as JSON, so runs can be saved and compared:
+
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --only ls,read --read-sizes 1M,10M
+
+Fixtures (large directories and files) are created in a temporary
+directory, or in --workdir to keep them between runs.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from PyQt6.QtCore import QEvent, QEventLoop, Qt, PYQT_VERSION_STR, QT_VERSION_STR
+from PyQt6.QtGui import QKeyEvent
+from PyQt6.QtWidgets import QApplication
+
+BENCHMARKS = ("keystroke", "ls", "read", "rmdir", "scroll", "startup")
+
+SIZE_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+# Written to the files "read" is measured on
+LINE = "x" * 99 + "\n"
+
+# Runs a fresh interpreter up to the first prompt and reports the phases
+STARTUP_SCRIPT = """
+import sys, time, json
+start = time.perf_counter()
+from PyQt6.QtWidgets import QApplication
+import src.main
+from src.main_window import MainWindow
+imported = time.perf_counter()
+app = QApplication(sys.argv)
+app.setStyle("Fusion")
+window = MainWindow()
+window.show()
+created = time.perf_counter()
+while not window.terminal.current_prompt:
+  app.processEvents()
+prompt = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "window_ms": (created - imported) * 1000,
+                  "first_prompt_ms": (prompt - start) * 1000}))
+"""
+
+
+# HELPERS
+def parse_size(text):
+  text = text.strip().upper()
+  if text[-1] in SIZE_UNITS:
+    return int(float(text[:-1]) * SIZE_UNITS[text[-1]])
+  return int(text)
+
+
+def summarize(samples):
+  """Milliseconds statistics for a list of durations in seconds."""
+  ordered = sorted(sample * 1000 for sample in samples)
+  return {
+    "samples": len(ordered),
+    "min_ms": round(ordered[0], 3),
+    "median_ms": round(statistics.median(ordered), 3),
+    "p95_ms": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 3),
+    "max_ms": round(ordered[-1], 3),
+  }
+
+
+def result(name, params, samples, **extra):
+  entry = {"name": name, "params": params}
+  entry.update(summarize(samples))
+  entry.update(extra)
+  print(f"  {name} {params}: median {entry['median_ms']} ms", file=sys.stderr)
+  return entry
+
+
+class Bench:
+  """One terminal widget plus the fixtures directory it works in."""
+
+  def __init__(self, app, workdir):
+    from src.history import CommandHistory
+    from src.terminal_widget import TerminalWidget
+
+    self.app = app
+    self.workdir = workdir
+    self.terminal = TerminalWidget()
+    # Keep benchmark runs out of the user's history file
+    self.terminal.engine.history = CommandHistory(workdir / "history")
+    self.terminal.resize(1000, 700)
+    self.terminal.show()
+    self.wait_until_idle()
+    self.terminal.current_directory = workdir
+
+  def wait_until_idle(self):
+    # Worker signals and the sink's flush timer both wake the loop up
+    while self.terminal.executor.is_busy() or self.terminal.output.has_pending() or not self.terminal.current_prompt:
+      self.app.processEvents(QEventLoop.ProcessEventsFlag.WaitForMoreEvents)
+    self.app.processEvents()
+
+  def run(self, command):
+    """Run a command to completion (prompt back, output on screen) and time it."""
+    start = time.perf_counter()
+    self.terminal.process_command(command)
+    self.wait_until_idle()
+    return time.perf_counter() - start
+
+  def reset(self, scrollback_limit=None):
+    self.terminal.output.discard()
+    self.terminal.clear()
+    if scrollback_limit is not None:
+      self.terminal.set_scrollback_limit(scrollback_limit)
+    self.terminal.insert_prompt()
+
+  def press(self, key, text=""):
+    event = QKeyEvent(QEvent.Type.KeyPress, key, Qt.KeyboardModifier.NoModifier, text)
+    QApplication.sendEvent(self.terminal, event)
+
+
+# BENCHMARKS
+def bench_keystroke(bench, args):
+  """Time from a key press to the repainted view, with growing scrollback."""
+  results = []
+  for lines in (1000, 10000, 100000):
+    bench.reset(scrollback_limit=lines)
+    bench.terminal.output.write("\n".join(f"scrollback line {i} " + "-" * 60 for i in range(lines)))
+    bench.terminal.insert_prompt()
+    bench.wait_until_idle()
+
+    typing, erasing = [], []
+    for _ in range(args.repeat * 10):
+      for samples, key, text in ((typing, Qt.Key.Key_A, "a"), (erasing, Qt.Key.Key_Backspace, "")):
+        start = time.perf_counter()
+        bench.press(key, text)
+        bench.terminal.viewport().repaint()
+        samples.append(time.perf_counter() - start)
+    results.append(result("keystroke", {"scrollback_lines": lines, "key": "character"}, typing))
+    results.append(result("keystroke", {"scrollback_lines": lines, "key": "backspace"}, erasing))
+
+    # Up recalls a command, Down goes back to the empty line
+    bench.terminal.engine.history.append("read app.log | grep ERROR | head 20")
+    recalling = []
+    for _ in range(args.repeat * 10):
+      for key in (Qt.Key.Key_Up, Qt.Key.Key_Down):
+        start = time.perf_counter()
+        bench.press(key)
+        bench.terminal.viewport().repaint()
+        recalling.append(time.perf_counter() - start)
+    results.append(result("keystroke", {"scrollback_lines": lines, "key": "history"}, recalling))
+  bench.reset(scrollback_limit=10000)
+  return results
+
+
+def bench_ls(bench, args):
+  """ls of large directories, with the listing cache cold and warm."""
+  results = []
+  for count in (10000, 100000):
+    directory = bench.workdir / f"ls_{count}"
+    if not directory.is_dir():
+      directory.mkdir()
+      for i in range(count):
+        (directory / f"file_{i:06d}.txt").touch()
+    bench.terminal.current_directory = directory
+
+    for command in ("ls", "ls -l"):
+      cold, warm = [], []
+      for _ in range(args.repeat):
+        bench.reset()
+        bench.terminal.engine.dir_cache.invalidate()
+        cold.append(bench.run(command))
+        bench.reset()
+        warm.append(bench.run(command))
+      results.append(result("ls", {"entries": count, "command": command, "cache": "cold"}, cold))
+      results.append(result("ls", {"entries": count, "command": command, "cache": "warm"}, warm))
+  bench.terminal.current_directory = bench.workdir
+  bench.reset()
+  return results
+
+
+def bench_read(bench, args):
+  """read/tail on files of increasing size."""
+  results = []
+  for size_text in args.read_sizes.split(","):
+    size = parse_size(size_text)
+    line_count = max(size // len(LINE), 1)
+    name = f"read_{size_text.strip()}.txt"
+    path = bench.workdir / name
+    if not path.exists() or path.stat().st_size != line_count * len(LINE):
+      block = LINE * 10000
+      with open(path, "w") as f:
+        for _ in range(line_count // 10000):
+          f.write(block)
+        f.write(LINE * (line_count % 10000))
+
+    commands = {
+      "first_page": f"read {name}",
+      # Has to stream through the whole file to find the last line
+      "last_line": f"read --from {line_count} --lines 1 {name}",
+      "tail_1000": f"tail -n 1000 {name}",
+    }
+    for label, command in commands.items():
+      samples = []
+      for _ in range(args.repeat):
+        bench.reset()
+        samples.append(bench.run(command))
+      results.append(result("read", {"size": size_text.strip(), "bytes": path.stat().st_size, "case": label}, samples))
+  bench.reset()
+  return results
+
+
+def build_tree(root, depth, fanout, files):
+  root.mkdir()
+  for i in range(files):
+    (root / f"file_{i}.txt").write_text("data\n")
+  if depth > 1:
+    for i in range(fanout):
+      build_tree(root / f"d{i}", depth - 1, fanout, files)
+
+
+def bench_rmdir(bench, args):
+  """rmdir -rf on a deep chain and on a bushy tree (building isn't timed)."""
+  results = []
+  trees = {
+    "deep": {"depth": 500, "fanout": 1, "files": 2},
+    "bushy": {"depth": 4, "fanout": 10, "files": 5},
+  }
+  for shape, params in trees.items():
+    samples = []
+    for _ in range(args.repeat):
+      root = bench.workdir / f"tree_{shape}"
+      if root.exists():
+        shutil.rmtree(root)
+      build_tree(root, **params)
+      bench.reset()
+      samples.append(bench.run(f"rmdir -rf tree_{shape}"))
+      if root.exists():
+        raise RuntimeError(f"rmdir left {root} behind")
+    results.append(result("rmdir", dict(params, shape=shape), samples))
+  bench.reset()
+  return results
+
+
+def bench_scroll(bench, args):
+  """Appending to and repainting the virtualized OutputView, with growing line counts."""
+  import random
+  from src.output_view import OutputView
+
+  view = OutputView()
+  view.resize(1000, 700)
+  view.show()
+  # Not painted until the window has been exposed
+  bench.app.processEvents()
+  results = []
+  for lines in (100000, 1000000, 10000000):
+    view.clear()
+    appends = []
+    for start in range(0, lines, 10000):
+      chunk = "".join(f"scroll line {i} " + "-" * 40 + "\n" for i in range(start, start + 10000))
+      began = time.perf_counter()
+      view.append_output(chunk)
+      appends.append(time.perf_counter() - began)
+
+    scrollbar = view.verticalScrollBar()
+    paints = []
+    for _ in range(args.repeat * 20):
+      scrollbar.setValue(random.randrange(scrollbar.maximum() + 1))
+      began = time.perf_counter()
+      view.viewport().repaint()
+      paints.append(time.perf_counter() - began)
+    memory = len(view.store.data) + view.store.starts.itemsize * len(view.store.starts)
+    results.append(result("scroll", {"lines": lines, "case": "append_10000_lines"}, appends))
+    results.append(result("scroll", {"lines": lines, "case": "jump_and_repaint"}, paints, store_bytes=memory))
+  view.close()
+  return results
+
+
+def bench_startup(bench, args):
+  """Cold start in a fresh interpreter, up to the first prompt."""
+  env = dict(os.environ, QT_QPA_PLATFORM="offscreen", HOME=str(bench.workdir))
+  samples = []
+  phases = []
+  for _ in range(args.repeat):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    samples.append(time.perf_counter() - start)
+    phases.append(json.loads(output.strip().splitlines()[-1]))
+  medians = {key: round(statistics.median(phase[key] for phase in phases), 3) for key in phases[0]}
+  return [result("startup", {"process": "src.main"}, samples, phases_median=medians)]
+
+
+# ENTRY POINT
+def main():
+  parser = argparse.ArgumentParser(description="Headless Team D Terminal benchmarks")
+  parser.add_argument("--only", help=f"comma separated subset of: {', '.join(BENCHMARKS)}")
+  parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (default 5)")
+  parser.add_argument("--read-sizes", default="1M,10M,100M,1G", help="file sizes for read (default 1M,10M,100M,1G)")
+  parser.add_argument("--workdir", help="where to create fixtures (kept afterwards)")
+  parser.add_argument("--output", help="write the JSON results to this file instead of stdout")
+  args = parser.parse_args()
+
+  selected = args.only.split(",") if args.only else list(BENCHMARKS)
+  unknown = set(selected) - set(BENCHMARKS)
+  if unknown:
+    parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+  app = QApplication.instance() or QApplication(sys.argv)
+  temporary = None
+  if args.workdir:
+    workdir = Path(args.workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+  else:
+    temporary = tempfile.TemporaryDirectory(prefix="team_d_bench_")
+    workdir = Path(temporary.name)
+
+  try:
+    bench = Bench(app, workdir)
+    results = []
+    for name in selected:
+      print(f"{name}:", file=sys.stderr)
+      results.extend(globals()[f"bench_{name}"](bench, args))
+    bench.terminal.shutdown()
+  finally:
+    if temporary is not None:
+      temporary.cleanup()
+
+  report = {
+    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    "python": platform.python_version(),
+    "qt": QT_VERSION_STR,
+    "pyqt": PYQT_VERSION_STR,
+    "platform": platform.platform(),
+    "cpus": os.cpu_count(),
+    "results": results,
+  }
+  text = json.dumps(report, indent=2)
+  if args.output:
+    Path(args.output).write_text(text + "\n")
+  else:
+    print(text)
+
+
+if __name__ == "__main__":
+  main()
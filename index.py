@@ -1,4 +1,8 @@
+# Taken before anything else is imported, for --profile-startup
 import sys
+import time
+started = (time.perf_counter(), len(sys.modules))
+
 import os
 
 # Add the current directory to Python path
@@ -7,4 +11,4 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from src.main import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(started)
\ No newline at end of file
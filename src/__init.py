@@ -4,4 +4,4 @@ Team D Terminal
 This package contains a PyQt6-based terminal application.
 """
 
-__all__ = ['terminal_widget', 'main_window', 'main']
\ No newline at end of file
+__all__ = ['terminal_widget', 'main_window', 'main', 'command_executor', 'file_reader', 'scrollback', 'output_sink', 'dir_cache', 'commands', 'history', 'completion', 'metrics', 'tree_remover', 'tree_search', 'startup', 'file_copy', 'engine', 'batch', 'pipeline', 'line_store', 'output_view', 'virtual_terminal', 'ansi', 'disk_usage', 'output_search', 'find_bar', 'file_follower', 'line_editor', 'session_view', 'text_formats']
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+ANSI escape sequences in program output
+
+Programs asked for colour (ls --color=always, grep --color=always, most
+test runners) mark it with SGR sequences such as "\\x1b[1;31m". The
+parser turns a stream of output into (text, Style) spans; what a Style
+looks like on screen is up to the widget (see FormatCache in
+text_formats). Other escape sequences - cursor movement, erasing,
+window titles - mean nothing in a scrollback and are dropped.
+"""
+
+import re
+from collections import namedtuple
+
+# Text attributes set by SGR codes; colours are a palette index (0-255),
+# an (r, g, b) tuple or None for the default
+Style = namedtuple("Style", "foreground background bold dim italic underline inverse strike")
+
+DEFAULT_STYLE = Style(None, None, False, False, False, False, False, False)
+
+# Colours of the window's stylesheet, for inverse video
+DEFAULT_FOREGROUND = (0xf0, 0xf0, 0xf0)
+DEFAULT_BACKGROUND = (0x1e, 0x1e, 0x1e)
+
+# The 16 basic colours (30-37, 90-97), readable on the dark background
+BASIC_COLORS = (
+  (0x00, 0x00, 0x00), (0xcd, 0x31, 0x31), (0x0d, 0xbc, 0x79), (0xe5, 0xe5, 0x10),
+  (0x24, 0x72, 0xc8), (0xbc, 0x3f, 0xbc), (0x11, 0xa8, 0xcd), (0xe5, 0xe5, 0xe5),
+  (0x66, 0x66, 0x66), (0xf1, 0x4c, 0x4c), (0x23, 0xd1, 0x8b), (0xf5, 0xf5, 0x43),
+  (0x3b, 0x8e, 0xea), (0xd6, 0x70, 0xd6), (0x29, 0xb8, 0xdb), (0xff, 0xff, 0xff),
+)
+
+# A complete escape sequence: CSI (ESC [ ... final byte), OSC (ESC ] ...
+# BEL or ESC \) or a two character one (ESC 7, ESC ( B, ...)
+SEQUENCE = re.compile(r"\x1b(?:\[([0-?]*)[ -/]*([@-~])|\][^\x07\x1b]*(?:\x07|\x1b\\)|[ -/]*[0-Z\\^-~])")
+
+# The start of a sequence cut off by the end of a chunk
+PARTIAL = re.compile(r"\x1b(?:\[[0-?]*[ -/]*|\][^\x07\x1b]*\x1b?|[ -/]*)\Z")
+
+# An unterminated OSC longer than this is treated as text
+MAX_PENDING = 4096
+
+# Style changes remembered per parser (24-bit colours could make them endless)
+MAX_TRANSITIONS = 1024
+
+
+def color_rgb(color):
+  """(r, g, b) of a palette index or an (r, g, b) colour."""
+  if isinstance(color, tuple):
+    return color
+  if color < 16:
+    return BASIC_COLORS[color]
+  if color < 232:
+    # 6x6x6 colour cube
+    color -= 16
+    levels = (0, 95, 135, 175, 215, 255)
+    return levels[color // 36], levels[color // 6 % 6], levels[color % 6]
+  gray = 8 + (color - 232) * 10
+  return gray, gray, gray
+
+
+class AnsiParser:
+  """
+  Splits output into styled spans, one chunk at a time
+
+  The style carries over from one chunk to the next, and a sequence cut
+  in half by a chunk boundary is held back until the rest arrives, so
+  output can be fed in whatever pieces it was flushed in.
+  """
+
+  def __init__(self):
+    self.style = DEFAULT_STYLE
+    self._pending = ""
+    # (style, parameters) -> resulting style; coloured listings repeat the
+    # same few sequences over and over
+    self._transitions = {}
+
+  def reset(self):
+    """Back to the default style, e.g. for a new prompt after a program left colours on."""
+    self.style = DEFAULT_STYLE
+    self._pending = ""
+
+  def feed(self, text):
+    """
+    Returns:
+        List of (text, Style) spans; empty spans are left out
+    """
+    if self._pending:
+      text = self._pending + text
+      self._pending = ""
+    # Most output has no escapes at all
+    if "\x1b" not in text:
+      return [(text, self.style)] if text else []
+
+    spans = []
+    position = 0
+    for match in SEQUENCE.finditer(text):
+      if match.start() > position:
+        spans.append((text[position:match.start()], self.style))
+      if match.group(2) == "m":
+        key = (self.style, match.group(1))
+        style = self._transitions.get(key)
+        if style is None:
+          style = self.apply(match.group(1))
+          if len(self._transitions) < MAX_TRANSITIONS:
+            self._transitions[key] = style
+        self.style = style
+      position = match.end()
+
+    rest = text[position:]
+    escape = rest.rfind("\x1b")
+    if escape != -1 and len(rest) - escape < MAX_PENDING and PARTIAL.match(rest, escape):
+      self._pending = rest[escape:]
+      rest = rest[:escape]
+    if rest:
+      spans.append((rest, self.style))
+    return spans
+
+  def plain(self, text):
+    """The text of feed(text) without its styles."""
+    if not self._pending and "\x1b" not in text:
+      return text
+    return "".join(span for span, style in self.feed(text))
+
+  def apply(self, parameters):
+    """Return the current style changed by the SGR parameters of one sequence."""
+    # "38:5:208" is the same as "38;5;208"; no parameters means reset
+    codes = [int(code) if code.isdigit() else 0 for code in parameters.replace(":", ";").split(";")]
+    foreground, background, bold, dim, italic, underline, inverse, strike = self.style
+    index = 0
+    while index < len(codes):
+      code = codes[index]
+      index += 1
+      if code == 0:
+        foreground, background, bold, dim, italic, underline, inverse, strike = DEFAULT_STYLE
+      elif code == 1:
+        bold = True
+      elif code == 2:
+        dim = True
+      elif code == 3:
+        italic = True
+      elif code == 4:
+        underline = True
+      elif code == 7:
+        inverse = True
+      elif code == 9:
+        strike = True
+      elif code == 22:
+        bold = dim = False
+      elif code == 23:
+        italic = False
+      elif code == 24:
+        underline = False
+      elif code == 27:
+        inverse = False
+      elif code == 29:
+        strike = False
+      elif 30 <= code <= 37:
+        foreground = code - 30
+      elif 90 <= code <= 97:
+        foreground = code - 90 + 8
+      elif code == 39:
+        foreground = None
+      elif 40 <= code <= 47:
+        background = code - 40
+      elif 100 <= code <= 107:
+        background = code - 100 + 8
+      elif code == 49:
+        background = None
+      elif code in (38, 48):
+        color, index = self.extended_color(codes, index)
+        if color is not None:
+          if code == 38:
+            foreground = color
+          else:
+            background = color
+    return Style(foreground, background, bold, dim, italic, underline, inverse, strike)
+
+  def extended_color(self, codes, index):
+    """Read the "5;n" or "2;r;g;b" after a 38/48; returns (colour or None, next index)."""
+    if index < len(codes) and codes[index] == 5 and index + 1 < len(codes):
+      return min(codes[index + 1], 255), index + 2
+    if index < len(codes) and codes[index] == 2 and index + 3 < len(codes):
+      return tuple(min(value, 255) for value in codes[index + 1:index + 4]), index + 4
+    return None, len(codes)
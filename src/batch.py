@@ -0,0 +1,94 @@
+import os
+import signal
+import sys
+from pathlib import Path
+from src.engine import DirectExecutor, StreamSink, TerminalEngine
+from src.metrics import export_if_requested
+
+USAGE = "Usage: index.py --batch <script_file> | --stdin"
+
+
+def run_batch(lines, stream=None):
+  """
+  Run command lines one after another without a window
+
+  Every command runs to completion before the next line is read and
+  writes straight to stream (stdout by default). Blank lines and lines
+  starting with # are skipped, "exit" ends the script. Ctrl+C stops
+  the running command the way it does in the window, and then the
+  script.
+
+  Args:
+      lines (iterable): Command lines, e.g. an open script file or sys.stdin
+      stream: Text stream the output goes to
+
+  Returns:
+      Exit status: 0, 1 if a command failed (reported an error, or was
+      a program exiting with a non-zero code) or was used wrongly, 130
+      when interrupted
+  """
+  output = StreamSink(stream or sys.stdout)
+  executor = DirectExecutor(output)
+  engine = TerminalEngine(output, executor)
+  # Scripts run where they were started, not in the home directory
+  engine.current_directory = Path.cwd()
+
+  interrupted = []
+
+  def interrupt(signum, frame):
+    interrupted.append(True)
+    if not executor.cancel():
+      raise KeyboardInterrupt
+
+  previous_handler = signal.signal(signal.SIGINT, interrupt)
+  try:
+    for line in lines:
+      command = line.strip()
+      if not command or command.startswith("#"):
+        continue
+      if command.lower() == "exit":
+        break
+      engine.execute(command)
+      if interrupted:
+        break
+  except KeyboardInterrupt:
+    pass
+  finally:
+    signal.signal(signal.SIGINT, previous_handler)
+    output.finish()
+    export_if_requested()
+
+  if interrupted:
+    return 130
+  failed = executor.failures or engine.inline_task.failures or engine.usage_errors
+  return 1 if failed else 0
+
+
+def main(args):
+  """Handle index.py --batch <file> / --stdin, returning the exit status."""
+  # Output that can't be encoded for the console mustn't stop the script
+  sys.stdout.reconfigure(errors="replace")
+  try:
+    if "--stdin" in args:
+      return run_batch(sys.stdin)
+    return run_script(args)
+  except BrokenPipeError:
+    # Whoever read the output stopped (e.g. "| head"); stop quietly too
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 1
+
+
+def run_script(args):
+  """Run the script file named after --batch."""
+  index = args.index("--batch")
+  if index + 1 >= len(args):
+    print(USAGE, file=sys.stderr)
+    return 2
+  script = args[index + 1]
+  try:
+    lines = open(script, encoding="utf-8")
+  except OSError as e:
+    print(f"Error: could not read '{script}': {e.strerror or e}", file=sys.stderr)
+    return 2
+  with lines:
+    return run_batch(lines)
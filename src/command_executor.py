@@ -0,0 +1,196 @@
+import threading
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from src.engine import CommandCancelled
+
+# How much output a task may have sent that isn't on screen yet before
+# its next write blocks, so a chatty command can't flood the GUI thread.
+# Counted in characters, with every line break costing LINE_COST more:
+# laying out many short lines is what makes a big flush slow.
+MAX_OUTPUT_BACKLOG = 256 * 1024
+LINE_COST = 64
+
+
+def output_cost(text):
+  return len(text) + LINE_COST * text.count("\n")
+
+
+class TaskSignals(QObject):
+  # QRunnable is not a QObject, so its signals live on a helper object.
+  # They are emitted from the worker thread and delivered to the GUI
+  # thread through queued connections.
+  output = pyqtSignal(str)
+  text = pyqtSignal(str)
+  failed = pyqtSignal(str)
+  finished = pyqtSignal(bool)
+
+
+class CommandTask(QRunnable):
+  """A single command handler running on the worker pool."""
+
+  def __init__(self, func, *args):
+    super().__init__()
+    self.func = func
+    self.args = args
+    self.signals = TaskSignals()
+    # Set by fail(), batch mode turns it into the exit status
+    self.failed = False
+    self._cancel_event = threading.Event()
+    self._cancel_callbacks = []
+    self._lock = threading.Lock()
+    self._drained = threading.Condition(self._lock)
+    self._backlog = 0
+
+  def write(self, text):
+    """Send a line of output back to the GUI thread."""
+    self._wait_for_backlog(output_cost(text) + LINE_COST)
+    self.signals.output.emit(text)
+
+  def write_text(self, text):
+    """Send output to be appended as-is, without starting a new line."""
+    self._wait_for_backlog(output_cost(text))
+    self.signals.text.emit(text)
+
+  def fail(self, message=None):
+    """Mark the command as failed, writing message (an error) if given."""
+    self.failed = True
+    if message is not None:
+      self.write(message)
+
+  def _wait_for_backlog(self, size):
+    with self._drained:
+      while self._backlog > MAX_OUTPUT_BACKLOG and not self._cancel_event.is_set():
+        self._drained.wait(0.1)
+      self._backlog += size
+    self.check_cancelled()
+
+  def acknowledge(self, size):
+    """Called from the GUI thread once output of this cost has been written."""
+    with self._drained:
+      self._backlog = max(self._backlog - size, 0)
+      self._drained.notify_all()
+
+  def on_cancel(self, callback):
+    """
+    Call callback() from the GUI thread on every cancel request
+
+    For handlers blocked in something check_cancelled() can't interrupt,
+    such as a child process. Runs right away if already cancelled.
+    """
+    with self._lock:
+      self._cancel_callbacks.append(callback)
+      cancelled = self._cancel_event.is_set()
+    if cancelled:
+      callback()
+
+  def cancel(self):
+    with self._lock:
+      self._cancel_event.set()
+      callbacks = list(self._cancel_callbacks)
+      self._drained.notify_all()
+    for callback in callbacks:
+      callback()
+
+  def is_cancelled(self):
+    return self._cancel_event.is_set()
+
+  def check_cancelled(self):
+    """Abort the handler if the user asked to cancel it."""
+    if self._cancel_event.is_set():
+      raise CommandCancelled()
+
+  def run(self):
+    try:
+      self.func(self, *self.args)
+    except CommandCancelled:
+      pass
+    except Exception as e:
+      self.signals.failed.emit(str(e))
+    finally:
+      self.signals.finished.emit(self.is_cancelled())
+
+
+class CommandExecutor(QObject):
+  """Runs command handlers off the GUI thread, one at a time."""
+
+  output = pyqtSignal(str)
+  text = pyqtSignal(str)
+  failed = pyqtSignal(str)
+  finished = pyqtSignal(bool)
+  busyChanged = pyqtSignal(bool)
+
+  def __init__(self, parent=None):
+    super().__init__(parent)
+    self.pool = QThreadPool(self)
+    self.current_task = None
+    # Output counts as written when it arrives, unless acknowledge_on() is used
+    self._acknowledge_on_arrival = True
+    self._unacknowledged = 0
+
+  def acknowledge_on(self, signal):
+    """
+    Count task output as written only when signal is emitted
+
+    Connect the signal of whatever really puts output on screen (e.g. the
+    output sink's flush), so back-pressure covers the queued text too.
+    """
+    self._acknowledge_on_arrival = False
+    signal.connect(self._acknowledge)
+
+  def is_busy(self):
+    return self.current_task is not None
+
+  def submit(self, func, *args):
+    """
+    Run func(task, *args) on the worker pool
+
+    Args:
+        func (callable): Handler receiving the CommandTask as first argument
+        args: Extra arguments passed through to the handler
+    """
+    if self.current_task is not None:
+      raise RuntimeError("Another command is still running")
+
+    task = CommandTask(func, *args)
+    task.signals.output.connect(self._task_output)
+    task.signals.text.connect(self._task_text)
+    task.signals.failed.connect(self.failed)
+    task.signals.finished.connect(self._task_finished)
+    self.current_task = task
+    self.busyChanged.emit(True)
+    self.pool.start(task)
+    return task
+
+  def cancel(self):
+    """Request cancellation of the running task (Ctrl+C)."""
+    if self.current_task is not None:
+      self.current_task.cancel()
+      return True
+    return False
+
+  def wait(self, msecs=-1):
+    """Block until the pool is idle. Used on shutdown."""
+    return self.pool.waitForDone(msecs)
+
+  def _task_output(self, text):
+    self._received(output_cost(text) + LINE_COST)
+    self.output.emit(text)
+
+  def _task_text(self, text):
+    self._received(output_cost(text))
+    self.text.emit(text)
+
+  def _received(self, cost):
+    self._unacknowledged += cost
+    if self._acknowledge_on_arrival:
+      self._acknowledge()
+
+  def _acknowledge(self):
+    if self.current_task is not None and self._unacknowledged:
+      self.current_task.acknowledge(self._unacknowledged)
+    self._unacknowledged = 0
+
+  def _task_finished(self, cancelled):
+    self.current_task = None
+    self._unacknowledged = 0
+    self.busyChanged.emit(False)
+    self.finished.emit(cancelled)
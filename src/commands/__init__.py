@@ -0,0 +1,226 @@
+"""
+Terminal commands
+
+Each command is a Command subclass living in one of the modules of this
+package. The registry only knows their "module:Class" names and imports a
+module the first time one of its commands is used, so starting the
+terminal doesn't load any command code.
+
+Other packages can add commands through the "team_d_terminal.commands"
+entry point group, e.g. in their pyproject.toml:
+
+    [project.entry-points."team_d_terminal.commands"]
+    hello = "my_package.hello:HelloCommand"
+"""
+
+import importlib
+
+ENTRY_POINT_GROUP = "team_d_terminal.commands"
+
+# Built-in command name -> "module:Class"
+BUILTIN_COMMANDS = {
+  "help": "src.commands.session:HelpCommand",
+  "clear": "src.commands.session:ClearCommand",
+  "cls": "src.commands.session:ClearCommand",
+  "exit": "src.commands.session:ExitCommand",
+  "history-output": "src.commands.session:HistoryOutputCommand",
+  "scrollback": "src.commands.session:ScrollbackCommand",
+  "mem": "src.commands.session:MemoryCommand",
+  "time": "src.commands.session:TimeCommand",
+  "stats": "src.commands.session:StatsCommand",
+  "cd": "src.commands.navigation:ChangeDirectoryCommand",
+  "pwd": "src.commands.navigation:PrintDirectoryCommand",
+  "ls": "src.commands.navigation:ListCommand",
+  "du": "src.commands.navigation:DiskUsageCommand",
+  "mkdir": "src.commands.files:MakeDirectoryCommand",
+  "rmdir": "src.commands.files:RemoveDirectoryCommand",
+  "touch": "src.commands.files:TouchCommand",
+  "rm": "src.commands.files:RemoveCommand",
+  "write": "src.commands.files:WriteCommand",
+  "append": "src.commands.files:AppendCommand",
+  "cat": "src.commands.files:CatCommand",
+  "cp": "src.commands.files:CopyCommand",
+  "mv": "src.commands.files:MoveCommand",
+  "read": "src.commands.reading:ReadCommand",
+  "more": "src.commands.reading:MoreCommand",
+  "head": "src.commands.reading:HeadCommand",
+  "tail": "src.commands.reading:TailCommand",
+  "find": "src.commands.search:FindCommand",
+  "grep": "src.commands.search:GrepCommand",
+}
+
+# Runs anything that isn't a command name as a program
+EXTERNAL_COMMAND = "src.commands.external:ExternalCommand"
+
+
+class UsageError(Exception):
+  """Raised by Command.parse when the arguments don't fit the command."""
+
+
+class Command:
+  """
+  Base class for terminal commands
+
+  Subclasses set the class attributes below, override parse() when they
+  take arguments and implement run(). Commands with background = True
+  run on the terminal's worker pool, the rest on the GUI thread.
+  Commands with whole_line = True get the rest of the line as one
+  string, pipes and redirections included (time).
+
+  In a pipeline commands run through stream() instead, see
+  src/pipeline.py. Pipelines run on the worker pool, so a GUI-thread
+  command can only be a stage, or have its output redirected, if it sets
+  pipeable = True: its run() must do nothing but write output.
+  """
+
+  name = ""
+  usage = ""
+  examples = ()
+  background = False
+  whole_line = False
+  pipeable = False
+
+  def parse(self, args):
+    """Turn the raw argument list into whatever run() expects."""
+    return args
+
+  def run(self, terminal, task, args):
+    raise NotImplementedError
+
+  def stream(self, terminal, task, args, lines):
+    """
+    Run as a stage of a pipeline, yielding output lines
+
+    Args:
+        lines: Iterator over the previous stage's lines, None for the
+            first stage
+
+    Commands that don't override this ignore their input and have the
+    output of run() collected, then passed on.
+    """
+    from src.pipeline import CaptureTask
+    capture = CaptureTask(task)
+    self.run(terminal, capture, args)
+    yield from capture.lines
+
+  def write_to(self, terminal, task, args, path, append):
+    """
+    Write the output to path directly, for "command > file"
+
+    Returns False to have stream()'s lines written instead; commands with
+    a faster way to produce the file override this.
+    """
+    return False
+
+  # Helpers for parse()
+  def split_flags(self, args, allowed):
+    """
+    Separate short flags from positional arguments
+
+    Combined flags such as "-rf" are split into single letters and long
+    flags are looked up in `allowed`, a {"--long": "letter"} mapping plus
+    the accepted letters as a string under the key "".
+    """
+    flags = set()
+    positional = []
+    for arg in args:
+      if arg.startswith("--") and arg in allowed:
+        flags.add(allowed[arg])
+      elif arg.startswith("-") and len(arg) > 1:
+        for letter in arg[1:]:
+          if letter not in allowed.get("", ""):
+            raise UsageError(f"unknown {self.name} option '-{letter}'")
+          flags.add(letter)
+      else:
+        positional.append(arg)
+    return flags, positional
+
+  def numeric_options(self, args, defaults):
+    """Split numeric options such as "-n 20" from positional arguments."""
+    options = dict(defaults)
+    positional = []
+    args = iter(args)
+    for arg in args:
+      if arg in defaults:
+        value = next(args, None)
+        if value is None or not value.isdigit():
+          raise UsageError(f"{arg} requires a number")
+        options[arg] = int(value)
+      else:
+        positional.append(arg)
+    return options, positional
+
+
+class CommandRegistry:
+  """Maps command names to lazily created Command instances."""
+
+  def __init__(self):
+    self._targets = dict(BUILTIN_COMMANDS)
+    self._commands = {}
+    self._external = None
+    self._plugins_loaded = False
+
+  def register(self, name, target):
+    """
+    Add or replace a command
+
+    Args:
+        name (str): Name typed at the prompt
+        target: A "module:Class" string, a Command subclass or an instance
+    """
+    self._targets[name] = target
+    self._commands.pop(name, None)
+
+  def get(self, name):
+    """Return the Command for name, importing its module on first use."""
+    command = self._commands.get(name)
+    if command is not None:
+      return command
+
+    target = self._targets.get(name)
+    if target is None and not self._plugins_loaded:
+      self.load_plugins()
+      target = self._targets.get(name)
+    if target is None:
+      return None
+
+    command = self._instantiate(target)
+    self._commands[name] = command
+    return command
+
+  def external(self):
+    """Return the Command that runs unknown names as external programs."""
+    if self._external is None:
+      self._external = self._instantiate(EXTERNAL_COMMAND)
+    return self._external
+
+  def names(self):
+    self.load_plugins()
+    return sorted(self._targets)
+
+  def extra_names(self):
+    """Names of commands that aren't built in (plugins and register() calls)."""
+    self.load_plugins()
+    return sorted(name for name in self._targets if name not in BUILTIN_COMMANDS)
+
+  def load_plugins(self):
+    """Register commands advertised by installed packages (done once)."""
+    if self._plugins_loaded:
+      return
+    self._plugins_loaded = True
+    try:
+      from importlib.metadata import entry_points
+      plugins = entry_points(group=ENTRY_POINT_GROUP)
+    except Exception:
+      return
+    for entry_point in plugins:
+      # Built-ins win, a plugin can't silently replace "rm"
+      self._targets.setdefault(entry_point.name, entry_point)
+
+  def _instantiate(self, target):
+    if isinstance(target, str):
+      module_name, class_name = target.split(":")
+      target = getattr(importlib.import_module(module_name), class_name)
+    elif hasattr(target, "load"):
+      target = target.load()
+    return target() if isinstance(target, type) else target
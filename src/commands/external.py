@@ -0,0 +1,197 @@
+import codecs
+import locale
+import os
+import shlex
+import signal
+import subprocess
+import threading
+from src.commands import Command, UsageError
+from src.engine import CommandCancelled
+from src.file_reader import CHUNK_SIZE
+
+
+def start_process(argv, directory, stdin=subprocess.DEVNULL):
+  """
+  Start argv in directory with stdout and stderr merged into one pipe
+
+  The program gets its own process group so Ctrl+C can be forwarded to it
+  and anything it started, without reaching the terminal itself.
+  """
+  options = {}
+  if os.name == "nt":
+    options["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+  else:
+    options["start_new_session"] = True
+  return subprocess.Popen(argv, cwd=directory, stdin=stdin,
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **options)
+
+
+def interrupt_process(process, force=False):
+  """Send the process group Ctrl+C, or kill it when force is set."""
+  try:
+    if os.name == "nt":
+      if force:
+        process.kill()
+      else:
+        process.send_signal(signal.CTRL_BREAK_EVENT)
+    else:
+      os.killpg(process.pid, signal.SIGKILL if force else signal.SIGINT)
+  except OSError:
+    # Already gone
+    pass
+
+
+def interrupter(process):
+  """A cancel callback: the first call interrupts the process, later ones kill it."""
+  interrupts = []
+
+  def interrupt():
+    interrupt_process(process, force=bool(interrupts))
+    interrupts.append(True)
+  return interrupt
+
+
+def feed(pipe, lines, encoding):
+  """Write lines to a program's standard input, then close it (runs on its own thread)."""
+  try:
+    for line in lines:
+      pipe.write((line + "\n").encode(encoding, errors="replace"))
+  except (OSError, ValueError, CommandCancelled):
+    # The program exited or stopped reading, or the pipeline was cancelled
+    pass
+  finally:
+    try:
+      pipe.close()
+    except OSError:
+      pass
+
+
+def exit_status(code):
+  if code < 0 and os.name != "nt":
+    try:
+      return f"terminated by {signal.Signals(-code).name}"
+    except ValueError:
+      return f"terminated by signal {-code}"
+  return f"exited with code {code}"
+
+
+# EXTERNAL PROGRAMS
+class ExternalCommand(Command):
+  usage = "<program> [arguments]"
+  examples = ("python --version", 'grep -n "some text" notes.txt')
+  background = True
+
+  def parse(self, command_line):
+    """Split the whole command line like a shell would, keeping quoted arguments together."""
+    try:
+      argv = shlex.split(command_line, posix=os.name != "nt")
+    except ValueError as e:
+      raise UsageError(f"could not parse the command line ({e})")
+    if not argv or not argv[0]:
+      raise UsageError("no program given")
+    return argv
+
+  def run(self, terminal, task, argv):
+    """
+    Run a program in the current directory, streaming its output
+
+    Output is written as it arrives, through the same batched path as
+    every other command. Writes block while too much of it is still
+    waiting to be shown, which stops reading the pipe, so a chatty
+    program is slowed down by its full pipe instead of flooding the GUI.
+    The first Ctrl+C interrupts the program, another one kills it.
+    """
+    try:
+      process = start_process(argv, terminal.current_directory)
+    except FileNotFoundError:
+      task.fail(f"\nCommand not found: {argv[0]}")
+      return
+    except OSError as e:
+      task.fail(f"\nError starting '{argv[0]}': {e}")
+      return
+
+    task.on_cancel(interrupter(process))
+    try:
+      decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+      # Line breaks at the end of a chunk are held back, the prompt adds its own
+      held = ""
+      task.write("")
+      while True:
+        data = process.stdout.read1(CHUNK_SIZE)
+        if not data:
+          break
+        text = held + decoder.decode(data)
+        shown = text.rstrip("\r\n")
+        held = text[len(shown):]
+        if shown:
+          task.write_text(shown.replace("\r\n", "\n").replace("\r", "\n"))
+      text = (held + decoder.decode(b"", final=True)).rstrip("\r\n")
+      if text:
+        task.write_text(text.replace("\r\n", "\n").replace("\r", "\n"))
+
+      code = process.wait()
+      if code != 0:
+        task.fail(f"\n{argv[0]} {exit_status(code)}")
+    finally:
+      process.stdout.close()
+      if process.poll() is None:
+        # Cancelled while the program was still writing
+        try:
+          process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+          interrupt_process(process, force=True)
+          process.wait()
+
+  def stream(self, terminal, task, argv, lines):
+    """
+    In a pipeline: the program's output lines
+
+    The previous stage's lines are written to the program's standard
+    input from a helper thread. If the pipeline stops reading early the
+    pipe is closed, and the program ends on its next write (SIGPIPE).
+    """
+    try:
+      process = start_process(argv, terminal.current_directory,
+                              stdin=subprocess.DEVNULL if lines is None else subprocess.PIPE)
+    except FileNotFoundError:
+      task.fail(f"\nCommand not found: {argv[0]}")
+      return
+    except OSError as e:
+      task.fail(f"\nError starting '{argv[0]}': {e}")
+      return
+
+    task.on_cancel(interrupter(process))
+    encoding = locale.getpreferredencoding(False)
+    feeder = None
+    if lines is not None:
+      feeder = threading.Thread(target=feed, args=(process.stdin, lines, encoding), daemon=True)
+      feeder.start()
+    try:
+      decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+      held = ""
+      while True:
+        data = process.stdout.read1(CHUNK_SIZE)
+        if not data:
+          break
+        parts = (held + decoder.decode(data)).split("\n")
+        held = parts.pop()
+        for line in parts:
+          yield line.rstrip("\r")
+      held += decoder.decode(b"", final=True)
+      if held:
+        yield held.rstrip("\r")
+
+      code = process.wait()
+      if code != 0:
+        task.fail(f"\n{argv[0]} {exit_status(code)}")
+    finally:
+      process.stdout.close()
+      if process.poll() is None:
+        try:
+          process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+          interrupt_process(process, force=True)
+          process.wait()
+      # The feeder must be done with the previous stage before that is closed
+      if feeder is not None:
+        feeder.join()
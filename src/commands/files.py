@@ -0,0 +1,566 @@
+import time
+from pathlib import Path
+from src.commands import Command, UsageError
+from src.commands.reading import write_lines
+from src.disk_usage import DISK_USAGE_CACHE
+from src.file_copy import PROGRESS_INTERVAL, CopyStats, atomic_write, concatenate, copy_file, copy_tree, move
+from src.file_reader import iter_lines
+from src.scrollback import format_bytes
+from src.tree_remover import remove_tree
+
+# Errors listed after a partly failed removal
+MAX_REPORTED_ERRORS = 10
+
+
+def is_protected(path):
+  """True for directories that must never be deleted: root, home and anything holding home."""
+  homes = {Path.home(), Path.home().resolve()}
+  for candidate in (path, path.resolve()):
+    if candidate == Path(candidate.anchor) or any(home == candidate or candidate in home.parents for home in homes):
+      return True
+  return False
+
+
+def remove_tree_with_progress(terminal, task, dir_path):
+  """
+  Delete a directory tree, reporting progress as it goes
+
+  Returns:
+      True if everything was removed
+  """
+  def report(stats):
+    task.write(f"Removed {stats.files} files ({format_bytes(stats.bytes)}), "
+               f"{stats.files_per_second():.0f} files/s")
+
+  try:
+    stats = remove_tree(dir_path, cancel=task.check_cancelled, progress=report)
+  finally:
+    terminal.dir_cache.invalidate()
+
+  summary = (f"{stats.files} files, {stats.directories} directories, "
+             f"{format_bytes(stats.bytes)} in {stats.elapsed():.1f}s")
+  if stats.errors:
+    task.fail(f"\nError: could not remove {len(stats.errors)} entries ({summary} removed):")
+    for path, error in stats.errors[:MAX_REPORTED_ERRORS]:
+      task.write(f"  {path}: {error.strerror or error}")
+    if len(stats.errors) > MAX_REPORTED_ERRORS:
+      task.write(f"  ... and {len(stats.errors) - MAX_REPORTED_ERRORS} more")
+    return False
+  task.write(f"\nRemoved {summary}")
+  return True
+
+
+def report_copy(task, stats):
+  total = f" of {format_bytes(stats.total_bytes)}" if stats.total_bytes else ""
+  task.write(f"Copied {format_bytes(stats.bytes)}{total} ({format_bytes(int(stats.bytes_per_second()))}/s)")
+
+
+def copy_progress(task, stats):
+  """An on_bytes callback adding to stats and reporting about once a second."""
+  last_report = [time.perf_counter()]
+
+  def on_bytes(amount):
+    stats.add_bytes(amount)
+    now = time.perf_counter()
+    if now - last_report[0] >= PROGRESS_INTERVAL:
+      last_report[0] = now
+      report_copy(task, stats)
+  return on_bytes
+
+
+def report_copy_errors(task, stats):
+  task.fail(f"\nError: could not copy {len(stats.errors)} entries:")
+  for path, error in stats.errors[:MAX_REPORTED_ERRORS]:
+    task.write(f"  {path}: {error.strerror or error}")
+  if len(stats.errors) > MAX_REPORTED_ERRORS:
+    task.write(f"  ... and {len(stats.errors) - MAX_REPORTED_ERRORS} more")
+
+
+def copy_summary(stats):
+  return (f"{stats.files} files, {format_bytes(stats.bytes)} in {stats.elapsed():.1f}s "
+          f"({format_bytes(int(stats.bytes_per_second()))}/s)")
+
+
+def target_path(source, destination):
+  """Copying or moving onto an existing directory puts the source inside it."""
+  if destination.is_dir() and not destination.is_symlink():
+    return destination / source.name
+  return destination
+
+
+def is_inside(path, directory):
+  path = path.resolve()
+  directory = directory.resolve()
+  return path == directory or directory in path.parents
+
+
+# CREATE A FILE
+class TouchCommand(Command):
+  name = "touch"
+  usage = "touch <file_name>"
+  examples = ("touch index.ts",)
+
+  def parse(self, args):
+    if not args:
+      raise UsageError("touch command requires a file name")
+    return args[0]
+
+  def run(self, terminal, task, file_name):
+    try:
+        new_file = terminal.current_directory / file_name
+
+        # Check if file already exists
+        if new_file.exists():
+            task.fail(f"\nError: File '{file_name}' already exists")
+            return
+
+        # Check if the file extension is valid (optional)
+        valid_extensions = ['.txt', '.py', '.md', '.json', '.csv']  # Add more as needed
+        if not any(file_name.lower().endswith(ext) for ext in valid_extensions):
+            task.fail(f"\nError: Invalid file type. Please use one of these extensions: {', '.join(valid_extensions)}")
+            return
+
+        # If all checks pass, create the file
+        new_file.touch()
+        terminal.dir_cache.invalidate(terminal.current_directory)
+        task.write(f"\nFile created: {new_file}")
+
+    except Exception as e:
+        task.fail(f"\nError creating file: {e}")
+
+
+# CREATE OR UPDATE EXISTING FILE
+class WriteCommand(Command):
+  name = "write"
+  usage = "write <file_name> <content>"
+  examples = ('write test.txt "Hello, World!"',)
+  background = True
+
+  def parse(self, args):
+    if len(args) < 2:
+      raise UsageError("write command requires a file name and content")
+    return args[0], ' '.join(args[1:])
+
+  def run(self, terminal, task, args):
+    """Write content to a file in the current directory."""
+    file_name, content = args
+    try:
+      file_path = terminal.current_directory / file_name
+      # Remove surrounding quotes if present
+      content = content.strip('"\'')
+      # Temp file plus rename: an interrupted write never leaves half a file
+      atomic_write(file_path, [content.encode('utf-8')])
+      terminal.dir_cache.invalidate(file_path.parent)
+      task.write(f"\nContent written to '{file_name}' successfully")
+    except Exception as e:
+      task.fail(f"\nError writing to file: {e}")
+
+
+# APPEND TO A FILE
+class AppendCommand(Command):
+  name = "append"
+  usage = "append <file_name> <content>"
+  examples = ('append notes.txt "Call the bank"',)
+  background = True
+
+  def parse(self, args):
+    if len(args) < 2:
+      raise UsageError("append command requires a file name and content")
+    return args[0], ' '.join(args[1:])
+
+  def run(self, terminal, task, args):
+    """Add content as a new line at the end of a file, creating it if needed."""
+    file_name, content = args
+    try:
+      file_path = terminal.current_directory / file_name
+      if file_path.is_dir():
+        task.fail(f"\nError: '{file_name}' is a directory")
+        return
+      content = content.strip('"\'')
+      # In place rather than atomic: rewriting the whole file for every
+      # appended line would make growing a log quadratic
+      with open(file_path, 'ab+') as f:
+        if f.tell() > 0:
+          f.seek(-1, 2)
+          if f.read(1) != b'\n':
+            content = '\n' + content
+        f.write((content + '\n').encode('utf-8'))
+      terminal.dir_cache.invalidate(file_path.parent)
+      # Grown in place, the directory's mtime stays the same
+      DISK_USAGE_CACHE.invalidate(file_path.parent)
+      task.write(f"\nContent appended to '{file_name}' successfully")
+    except Exception as e:
+      task.fail(f"\nError appending to file: {e}")
+
+
+# SHOW OR JOIN FILES
+class CatCommand(Command):
+  name = "cat"
+  usage = "cat <file> [file ...] [> <output> | >> <output>]"
+  examples = ("cat notes.txt", "cat part1.txt part2.txt > whole.txt", "cat today.log >> all.log")
+  background = True
+
+  def parse(self, args):
+    """Return the file names; there may be none when reading a pipe."""
+    return args
+
+  def source_paths(self, terminal, task, sources):
+    """Resolve the file names, or write an error and return None."""
+    paths = []
+    for name in sources:
+      path = terminal.current_directory / name
+      if not path.exists():
+        task.fail(f"\nError: File '{name}' not found")
+        return None
+      if path.is_dir():
+        task.fail(f"\nError: '{name}' is a directory")
+        return None
+      paths.append(path)
+    return paths
+
+  def run(self, terminal, task, sources):
+    """Show files one after another."""
+    try:
+      if not sources:
+        task.fail("\nError: cat command requires a file name")
+        return
+      paths = self.source_paths(terminal, task, sources)
+      if paths is None:
+        return
+      task.write("")
+      for path in paths:
+        write_lines(task, iter_lines(path, cancel=task.check_cancelled), float("inf"))
+    except Exception as e:
+      task.fail(f"\nError reading file: {e}")
+
+  def stream(self, terminal, task, sources, lines):
+    """In a pipeline: the lines of the files, or the previous stage's passed on."""
+    if not sources:
+      if lines is None:
+        task.fail("\nError: cat command requires a file name")
+        return
+      yield from lines
+      return
+    paths = self.source_paths(terminal, task, sources)
+    for path in paths or ():
+      yield from (line for line, _ in iter_lines(path, cancel=task.check_cancelled))
+
+  def write_to(self, terminal, task, sources, path, append):
+    """
+    Join the files into path
+
+    Goes through copy_file_range/sendfile, so the data never passes
+    through Python. ">" replaces path atomically, ">>" appends in place.
+    """
+    if not sources:
+      return False
+    try:
+      paths = self.source_paths(terminal, task, sources)
+      if paths is None:
+        return True
+      # Appending a file to itself would chase its own end forever
+      if append and path.exists() and any(source.samefile(path) for source in paths):
+        task.fail(f"\nError: '{path.name}' is both an input and the output")
+        return True
+      stats = CopyStats(sum(source.stat().st_size for source in paths))
+      try:
+        concatenate(paths, path, append, task.check_cancelled, copy_progress(task, stats))
+      finally:
+        terminal.dir_cache.invalidate(path.parent)
+        if append:
+          DISK_USAGE_CACHE.invalidate(path.parent)
+      task.write(f"\n{'Appended' if append else 'Wrote'} {format_bytes(stats.bytes)} to '{path.name}'")
+    except Exception as e:
+      task.fail(f"\nError joining files: {e}")
+    return True
+
+
+# COPY FILES AND DIRECTORIES
+class CopyCommand(Command):
+  name = "cp"
+  usage = "cp [-r] <source> <destination>"
+  examples = ("cp notes.txt backup.txt", "cp report.pdf archive", "cp -r project project_backup")
+  background = True
+
+  def parse(self, args):
+    flags, positional = self.split_flags(args, {"": "r", "--recursive": "r"})
+    if len(positional) != 2:
+      raise UsageError("cp command requires a source and a destination")
+    return positional[0], positional[1], "r" in flags
+
+  def run(self, terminal, task, args):
+    """
+    Copy a file, or a directory tree with -r
+
+    Files are copied by the kernel (copy_file_range, then sendfile) into
+    a temporary file that is renamed into place, keeping the permissions
+    and modification time. Trees are copied by a pool of threads.
+    """
+    source_name, destination_name, recursive = args
+    try:
+      source = terminal.current_directory / source_name
+      if not source.exists():
+        task.fail(f"\nError: '{source_name}' not found")
+        return
+      destination = target_path(source, terminal.current_directory / destination_name)
+
+      if source.is_dir():
+        if not recursive:
+          task.fail(f"\nError: '{source_name}' is a directory (use cp -r to copy it)")
+          return
+        if destination.exists():
+          task.fail(f"\nError: '{destination_name}' already exists")
+          return
+        if is_inside(destination.parent, source):
+          task.fail(f"\nError: Cannot copy '{source_name}' into itself")
+          return
+        try:
+          stats = copy_tree(source, destination, cancel=task.check_cancelled,
+                            progress=lambda stats: report_copy(task, stats))
+        finally:
+          terminal.dir_cache.invalidate()
+        if stats.errors:
+          report_copy_errors(task, stats)
+        task.write(f"\nCopied '{source_name}' to '{destination_name}': {copy_summary(stats)}")
+        return
+
+      if destination.exists() and source.samefile(destination):
+        task.fail(f"\nError: '{source_name}' and '{destination_name}' are the same file")
+        return
+      stats = CopyStats(source.stat().st_size)
+      try:
+        copy_file(source, destination, task.check_cancelled, copy_progress(task, stats))
+      finally:
+        terminal.dir_cache.invalidate(destination.parent)
+      stats.files = 1
+      task.write(f"\nCopied '{source_name}' to '{destination_name}': {copy_summary(stats)}")
+    except Exception as e:
+      task.fail(f"\nError copying: {e}")
+
+
+# MOVE OR RENAME
+class MoveCommand(Command):
+  name = "mv"
+  usage = "mv <source> <destination>"
+  examples = ("mv draft.txt final.txt", "mv report.pdf archive")
+  background = True
+
+  def parse(self, args):
+    if len(args) != 2:
+      raise UsageError("mv command requires a source and a destination")
+    return args[0], args[1]
+
+  def run(self, terminal, task, args):
+    """
+    Move or rename a file or directory
+
+    A plain rename within a file system; across file systems the source
+    is copied like cp does and only deleted once the copy is complete.
+    """
+    source_name, destination_name = args
+    try:
+      source = terminal.current_directory / source_name
+      if not source.exists() and not source.is_symlink():
+        task.fail(f"\nError: '{source_name}' not found")
+        return
+      if source.is_dir() and not source.is_symlink() and is_protected(source):
+        task.fail(f"\nError: Cannot move critical directory '{source_name}'")
+        return
+      destination = target_path(source, terminal.current_directory / destination_name)
+      if destination.is_dir() and not destination.is_symlink():
+        task.fail(f"\nError: Directory '{destination_name}' already exists")
+        return
+      if source.is_dir() and not source.is_symlink() and is_inside(destination.parent, source):
+        task.fail(f"\nError: Cannot move '{source_name}' into itself")
+        return
+      try:
+        stats = move(source, destination, cancel=task.check_cancelled,
+                     progress=lambda stats: report_copy(task, stats))
+      finally:
+        terminal.dir_cache.invalidate()
+      if stats is None:
+        task.write(f"\nMoved '{source_name}' to '{destination_name}'")
+      elif stats.errors:
+        report_copy_errors(task, stats)
+        task.write(f"'{source_name}' was kept, the copy in '{destination_name}' is incomplete")
+      elif stats.left_behind:
+        task.fail(f"\nError: copied '{source_name}' to '{destination_name}', but could not remove "
+                  f"{len(stats.left_behind)} entries of '{source_name}':")
+        for path, error in stats.left_behind[:MAX_REPORTED_ERRORS]:
+          task.write(f"  {path}: {error.strerror or error}")
+        if len(stats.left_behind) > MAX_REPORTED_ERRORS:
+          task.write(f"  ... and {len(stats.left_behind) - MAX_REPORTED_ERRORS} more")
+      else:
+        task.write(f"\nMoved '{source_name}' to '{destination_name}' across file systems: {copy_summary(stats)}")
+    except Exception as e:
+      task.fail(f"\nError moving: {e}")
+
+
+# DELETE FILE
+class RemoveCommand(Command):
+  name = "rm"
+  usage = "rm <file_name>"
+  examples = ("rm test.txt",)
+  background = True
+
+  def parse(self, args):
+    if not args:
+      raise UsageError("rm command requires a file name")
+    return args[0]
+
+  def run(self, terminal, task, file_name):
+    """Delete a file from the current directory."""
+
+    try:
+      file_path = terminal.current_directory / file_name
+      if not file_path.exists():
+        task.fail(f"\nError: File '{file_name}' not found")
+        return
+      if file_path.is_dir() and not file_path.is_symlink():
+        if is_protected(file_path):
+          task.fail(f"\nError: Cannot remove critical directory '{file_name}'")
+          return
+        if remove_tree_with_progress(terminal, task, file_path):
+          task.write(f"Directory '{file_name}' and its contents deleted successfully")
+      else:
+        file_path.unlink()
+        terminal.dir_cache.invalidate(file_path.parent)
+        task.write(f"\nFile '{file_name}' deleted successfully")
+    except Exception as e:
+      task.fail(f"\nError deleting file: {e}")
+
+
+# DIRECTORY CREATION
+class MakeDirectoryCommand(Command):
+  name = "mkdir"
+  usage = "mkdir <directory_name>"
+  examples = ("mkdir project",)
+
+  def parse(self, args):
+    if not args:
+      raise UsageError("mkdir command requires a directory name")
+    return args[0]
+
+  def run(self, terminal, task, directory_name):
+    try:
+        # Check for invalid characters in directory name
+        invalid_chars = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
+        if any(char in directory_name for char in invalid_chars):
+            task.fail(f"\nError: Directory name contains invalid characters. Cannot use: {' '.join(invalid_chars)}")
+            return
+
+        new_dir = terminal.current_directory / directory_name
+
+        # Check if directory already exists
+        if new_dir.exists():
+            task.fail(f"\nError: Directory '{directory_name}' already exists")
+            return
+
+        # If checks pass, create the directory
+        new_dir.mkdir()
+        terminal.dir_cache.invalidate(terminal.current_directory)
+        task.write(f"\nDirectory created: {new_dir}")
+
+    except Exception as e:
+        task.fail(f"\nError creating directory: {e}")
+
+
+# REMOVE DIRECTORY
+class RemoveDirectoryCommand(Command):
+  name = "rmdir"
+  usage = "rmdir [options] <directory_name>"
+
+  def parse(self, args):
+    """Return (dir_name, force, recursive), or None to show the help."""
+    if not args:
+      return None
+    flags, positional = self.split_flags(args, {"": "rf", "--recursive": "r", "--force": "f"})
+    if not positional:
+      raise UsageError("rmdir command requires a directory name")
+    # Get the directory name (last argument)
+    return positional[-1], "f" in flags, "r" in flags
+
+  def run(self, terminal, task, args):
+    if args is None:
+      self.show_help(task)
+      return
+    dir_name, force, recursive = args
+    self.remove_directory(terminal, task, dir_name, force=force, recursive=recursive)
+
+  # SHOW REMOVE DIRECTORY HELP
+  def show_help(self, task):
+    """Show help for rmdir command"""
+    help_text = """
+    rmdir - Remove directory command
+
+    Usage: rmdir [options] <directory_name>
+
+    Options:
+      -r, --recursive  : Remove directory and its contents recursively
+      -f, --force     : Force removal without confirmation
+
+    Examples:
+      rmdir empty_dir          : Remove an empty directory
+      rmdir -r project_dir     : Remove directory and all its contents
+      rmdir -f old_dir         : Force remove without confirmation
+      rmdir -rf temp_dir       : Force remove recursively without confirmation
+    """
+    task.write(help_text)
+
+  def remove_directory(self, terminal, task, dir_name, force=False, recursive=False):
+    """
+    Remove a directory with various options
+
+    Args:
+        dir_name (str): Name of directory to remove
+        force (bool): If True, skip confirmation
+        recursive (bool): If True, remove directory and all contents
+    """
+    try:
+      dir_path = terminal.current_directory / dir_name
+
+      # Check if directory exists
+      if not dir_path.exists():
+        task.fail(f"\nError: Directory '{dir_name}' does not exist")
+        return
+
+      # Check if it's actually a directory
+      if not dir_path.is_dir():
+        task.fail(f"\nError: '{dir_name}' is not a directory")
+        return
+
+      # Check if directory is empty when not using recursive
+      if not recursive and any(dir_path.iterdir()):
+        task.fail(f"\nError: Directory '{dir_name}' is not empty")
+        task.write("Use 'rmdir -r' to remove directory and its contents")
+        return
+
+      # Safety check: prevent removing important directories
+      if is_protected(dir_path):
+        task.fail(f"\nError: Cannot remove critical directory '{dir_name}'")
+        return
+
+      # Get confirmation if not force mode
+      if not force:
+        msg = f"Remove {'directory and its contents' if recursive else 'empty directory'}: {dir_name}?"
+        terminal.ask_confirmation(msg, lambda: terminal.run_in_background(self.complete_removal, dir_path, recursive))
+        return
+
+      # If force mode, proceed directly
+      terminal.run_in_background(self.complete_removal, dir_path, recursive)
+
+    except Exception as e:
+      task.fail(f"\nError removing directory: {e}")
+
+  def complete_removal(self, terminal, task, dir_path, recursive):
+    """Complete the directory removal operation"""
+    try:
+      if recursive:
+        if remove_tree_with_progress(terminal, task, dir_path):
+          task.write(f"Directory '{dir_path.name}' and its contents removed successfully")
+      else:
+        dir_path.rmdir()
+        terminal.dir_cache.invalidate(dir_path.parent)
+        task.write(f"\nEmpty directory '{dir_path.name}' removed successfully")
+    except Exception as e:
+        task.fail(f"\nError completing directory removal: {e}")
@@ -0,0 +1,199 @@
+import os
+import stat
+import time
+from datetime import datetime
+from pathlib import Path
+from src.commands import Command, UsageError
+from src.disk_usage import DISK_USAGE_CACHE, disk_usage, usage
+from src.scrollback import format_bytes
+
+# Seconds du may hold back finished lines, waiting for a full batch
+STREAM_INTERVAL = 0.25
+
+
+# CHANGE DIRECTORY
+class ChangeDirectoryCommand(Command):
+  name = "cd"
+  usage = "cd <directory_path>"
+  examples = ("cd project", "cd ..", "cd ../..")
+
+  def parse(self, args):
+    if not args:
+      raise UsageError("cd command requires a directory path")
+    return args[0]
+
+  def run(self, terminal, task, directory):
+    try:
+      # Handle multiple dots for going back multiple levels
+      if directory.startswith('.'):
+        dot_count = directory.count('.')
+        # Get the parent directory for the number of dots
+        new_dir = terminal.current_directory
+        for _ in range(dot_count):
+          new_dir = new_dir.parent
+          # Prevent going above root directory
+          if new_dir == new_dir.parent:
+              break
+      else:
+        # Normalize path separators and handle absolute/relative paths
+        normalized_path = directory.replace('\\', '/')
+        if normalized_path.startswith('/'):
+          # Absolute path
+          new_dir = Path(normalized_path)
+        else:
+          # Relative path
+          new_dir = terminal.current_directory / normalized_path
+
+      # Resolve the path to handle . and .. references
+      new_dir = new_dir.resolve()
+
+      if new_dir.is_dir():
+        terminal.current_directory = new_dir
+        task.write(f"\nChanged directory to: {new_dir}")
+      else:
+        task.fail(f"\nDirectory not found: {new_dir}")
+    except Exception as e:
+      task.fail(f"\nError changing directory: {e}")
+
+
+# SHOW THE CURRENT DIRECTORY
+class PrintDirectoryCommand(Command):
+  name = "pwd"
+  pipeable = True
+
+  def run(self, terminal, task, args):
+    task.write(f"\n{terminal.current_directory}")
+
+
+# FILES AND DIRECTORIES LISTINGS
+class ListCommand(Command):
+  name = "ls"
+  usage = "ls [-l] [-a] [-S | -t] [-r]"
+  examples = ("ls -la",)
+  background = True
+
+  def parse(self, args):
+    flags, positional = self.split_flags(args, {"": "laStr"})
+    if positional:
+      raise UsageError(f"unknown ls option '{positional[0]}'")
+    return flags
+
+  def run(self, terminal, task, flags):
+    """
+    List the current directory from the cached scandir listing
+
+    Args:
+        flags (set): Any of l (long), a (all), S (by size), t (by time), r (reverse)
+    """
+    try:
+      entries = terminal.dir_cache.listing(terminal.current_directory, cancel=task.check_cancelled)
+      if "a" not in flags:
+        entries = [item for item in entries if not item.name.startswith(".")]
+      # Directory sizes are only known once du has added them up
+      totals = {}
+      for item in entries:
+        if item.is_dir:
+          totals[item.name] = DISK_USAGE_CACHE.total(terminal.current_directory / item.name)
+      if "S" in flags:
+        entries = sorted(entries, key=lambda item: totals.get(item.name) or item.size, reverse=True)
+      elif "t" in flags:
+        entries = sorted(entries, key=lambda item: item.mtime, reverse=True)
+      if "r" in flags:
+        entries = entries[::-1]
+
+      long_format = "l" in flags
+      task.write("\nDirectory contents:")
+      task.write("----------------------------------------")
+      if long_format:
+        task.write("Mode        Type       Size        Modified            Name")
+      else:
+        task.write("Type       Size        Modified         Name")
+      task.write("----------------------------------------")
+
+      time_format = "%Y-%m-%d %H:%M:%S" if long_format else "%Y-%m-%d %H:%M"
+      batch = []
+      for item in entries:
+        item_type = "DIR " if item.is_dir else "FILE"
+        size = totals.get(item.name) if item.is_dir else item.size
+        size = "-" if size is None else f"{size:8d}B"
+        modified = datetime.fromtimestamp(item.mtime).strftime(time_format)
+        if long_format:
+          batch.append(f"{stat.filemode(item.mode)}  {item_type:9} {size:10} {modified:19} {item.name}")
+        else:
+          batch.append(f"{item_type:9} {size:10} {modified:15} {item.name}")
+        # One signal per batch rather than per entry
+        if len(batch) >= 256:
+          task.check_cancelled()
+          task.write("\n".join(batch))
+          batch = []
+      if batch:
+        task.write("\n".join(batch))
+
+      task.write("----------------------------------------")
+    except Exception as e:
+      task.fail(f"\nError listing files: {e}")
+
+
+# DISK USAGE
+class DiskUsageCommand(Command):
+  name = "du"
+  usage = "du [-s] [-h] [--max-depth <n>] [paths]"
+  examples = ("du -sh", "du -h --max-depth 1 src")
+  background = True
+
+  def parse(self, args):
+    options, positional = self.numeric_options(args, {"--max-depth": None})
+    flags, paths = self.split_flags(positional, {"": "sh"})
+    max_depth = options["--max-depth"]
+    if "s" in flags:
+      if max_depth not in (None, 0):
+        raise UsageError("-s can't be combined with --max-depth")
+      max_depth = 0
+    return paths or ["."], "h" in flags, max_depth
+
+  def run(self, terminal, task, options):
+    """
+    Show the disk space used below each directory, as each subtree is done
+
+    Args:
+        options (tuple): (paths, human_readable, max_depth or None)
+    """
+    try:
+      task.write("")
+      batch = []
+      last_write = time.perf_counter()
+      for line in self.lines(terminal, task, options):
+        batch.append(line)
+        # Big subtrees take a while, show what's finished meanwhile
+        if len(batch) >= 256 or time.perf_counter() - last_write >= STREAM_INTERVAL:
+          task.write("\n".join(batch))
+          batch = []
+          last_write = time.perf_counter()
+      if batch:
+        task.write("\n".join(batch))
+    except Exception as e:
+      task.fail(f"\nError: {e}")
+
+  def stream(self, terminal, task, options, lines):
+    yield from self.lines(terminal, task, options)
+
+  def lines(self, terminal, task, options):
+    """Yield "size  path" lines, deepest directories first, each path's total last."""
+    paths, human, max_depth = options
+    size_text = format_bytes if human else lambda size: str((size + 1023) // 1024)
+    for name in paths:
+      root = terminal.current_directory / name
+      if not root.exists() and not root.is_symlink():
+        task.fail()
+        yield f"Error: '{name}' not found"
+        continue
+      if not root.is_dir() or root.is_symlink():
+        yield f"{size_text(usage(root.lstat())):<10} {name}"
+        continue
+      for path, total, depth in disk_usage(root, DISK_USAGE_CACHE, cancel=task.check_cancelled):
+        shown = os.path.join(name, os.path.relpath(path, root)) if depth else name
+        if total is None:
+          task.fail()
+          yield f"Error: cannot read '{os.path.normpath(shown)}'"
+        elif max_depth is None or depth <= max_depth:
+          yield f"{size_text(total):<10} {os.path.normpath(shown)}"
@@ -0,0 +1,250 @@
+from collections import deque
+from itertools import islice
+from src.commands import Command, UsageError
+from src.file_follower import follow
+from src.file_reader import PAGE_LINES, ReadPager, iter_lines, tail_offset
+
+
+def readable_path(terminal, task, file_name):
+  file_path = terminal.current_directory / file_name
+  if not file_path.exists():
+    task.fail(f"\nError: File '{file_name}' not found")
+    return None
+  if file_path.is_dir():
+    task.fail(f"\nError: '{file_name}' is a directory")
+    return None
+  return file_path
+
+
+def write_lines(task, lines, limit, lead=""):
+  """Write up to `limit` lines, grouped so each signal carries a batch."""
+  batch = []
+  written = 0
+  offset = None
+  if limit <= 0:
+    lines.close()
+    return written, offset
+  try:
+    for line, offset in lines:
+      batch.append(line)
+      written += 1
+      if len(batch) >= 256:
+        task.write(lead + "\n".join(batch))
+        batch = []
+        lead = ""
+      if written >= limit:
+        break
+  finally:
+    lines.close()
+  if batch:
+    task.write(lead + "\n".join(batch))
+  return written, offset
+
+
+def write_page(terminal, task, file_path, lines, first_line):
+  """Write one page and remember where to continue if the file goes on."""
+  written, offset = write_lines(task, lines, PAGE_LINES)
+  if written == PAGE_LINES and offset < file_path.stat().st_size:
+    terminal.pager = ReadPager(file_path, offset, first_line + written)
+    task.write(f"-- more -- (lines {first_line}-{first_line + written - 1}, type 'more' or scroll down to continue)")
+
+
+# READ FILE
+class ReadCommand(Command):
+  name = "read"
+  usage = "read [--from <line>] [--lines <count>] <file_name>"
+  examples = ("read test.txt", "read --from 100 --lines 20 app.log")
+  background = True
+
+  def parse(self, args):
+    options, positional = self.numeric_options(args, {"--from": 1, "--lines": None})
+    if len(positional) != 1:
+      raise UsageError("read command requires a file name")
+    return positional[0], max(options["--from"], 1), options["--lines"]
+
+  def run(self, terminal, task, args):
+    """
+    Display the content of a file, streaming it in bounded pages
+
+    Args:
+        args (tuple): File name, first line to show (1-based) and number of
+            lines to show, or None to page through the file
+    """
+    file_name, start, count = args
+    try:
+      file_path = readable_path(terminal, task, file_name)
+      if file_path is None:
+        return
+      terminal.pager = None
+      task.write(f"\nContent of '{file_name}':")
+      task.write("----------------------------------------")
+      lines = iter_lines(file_path, skip=start - 1, cancel=task.check_cancelled)
+      if count is None:
+        write_page(terminal, task, file_path, lines, start)
+      else:
+        write_lines(task, lines, count)
+      task.write("----------------------------------------")
+    except Exception as e:
+      task.fail(f"\nError reading file: {e}")
+
+  def stream(self, terminal, task, args, lines):
+    """In a pipeline: the file's lines, unpaged and without the frame."""
+    file_name, start, count = args
+    file_path = readable_path(terminal, task, file_name)
+    if file_path is None:
+      return
+    file_lines = iter_lines(file_path, skip=start - 1, cancel=task.check_cancelled)
+    try:
+      for line, _ in islice(file_lines, count):
+        yield line
+    finally:
+      file_lines.close()
+
+
+# SHOW NEXT PAGE OF THE LAST READ
+class MoreCommand(Command):
+  name = "more"
+  background = True
+
+  def run(self, terminal, task, args):
+    """Continue the last paged read where it stopped."""
+    try:
+      pager = terminal.pager
+      if pager is None:
+        task.write("\nNothing more to read")
+        return
+      terminal.pager = None
+      task.write(f"\nContent of '{pager.path.name}' from line {pager.line_number}:")
+      task.write("----------------------------------------")
+      lines = iter_lines(pager.path, offset=pager.offset, cancel=task.check_cancelled)
+      write_page(terminal, task, pager.path, lines, pager.line_number)
+      task.write("----------------------------------------")
+    except Exception as e:
+      task.fail(f"\nError reading file: {e}")
+
+
+# FIRST / LAST LINES OF A FILE
+class HeadCommand(Command):
+  name = "head"
+  usage = "head [-n <count>] <file_name>, or ... | head [<count>]"
+  examples = ("head -n 20 app.log", "read app.log | grep ERROR | head 20")
+  background = True
+
+  # Lines shown when no count is given
+  default_count = 10
+
+  def parse(self, args):
+    """Return (file_name, count); both may be None when reading a pipe."""
+    options, positional = self.numeric_options(args, {"-n": None})
+    if len(positional) > 1:
+      raise UsageError(f"{self.name} takes a single file name")
+    file_name = positional[0] if positional else None
+    return file_name, options["-n"]
+
+  def stream_source(self, terminal, args, lines):
+    """
+    Work out what a pipeline stage reads: (file_name, count)
+
+    A lone number after head or tail in a pipe is the count, as in
+    "... | head 20", unless a file of that name exists.
+    """
+    file_name, count = args
+    if (lines is not None and count is None and file_name is not None and file_name.isdigit()
+        and not (terminal.current_directory / file_name).exists()):
+      return None, int(file_name)
+    return file_name, self.default_count if count is None else count
+
+  def stream(self, terminal, task, args, lines):
+    """In a pipeline: the first lines of the file, or of the previous stage."""
+    file_name, count = self.stream_source(terminal, args, lines)
+    if file_name is not None:
+      file_path = readable_path(terminal, task, file_name)
+      if file_path is None:
+        return
+      lines = (line for line, _ in iter_lines(file_path, cancel=task.check_cancelled))
+    elif lines is None:
+      task.fail(f"\nError: {self.name} command requires a file name")
+      return
+    # islice stops without asking for one line more, so everything
+    # before this stage stops reading right here
+    yield from islice(lines, count)
+
+  def run(self, terminal, task, args):
+    """Display the first lines of a file."""
+    file_name, count = args
+    if count is None:
+      count = self.default_count
+    try:
+      if file_name is None:
+        task.fail(f"\nError: {self.name} command requires a file name")
+        return
+      file_path = readable_path(terminal, task, file_name)
+      if file_path is None:
+        return
+      lines = iter_lines(file_path, cancel=task.check_cancelled)
+      write_lines(task, lines, count, lead="\n")
+    except Exception as e:
+      task.fail(f"\nError reading file: {e}")
+
+
+class TailCommand(HeadCommand):
+  name = "tail"
+  usage = "tail [-f] [-n <count>] <file_name>, or ... | tail [<count>]"
+  examples = ("tail -n 20 app.log", "tail -f app.log", "grep -r TODO src | tail 5")
+
+  def parse(self, args):
+    """Return (file_name, count, follow)."""
+    follow_file = "-f" in args or "--follow" in args
+    file_name, count = super().parse([arg for arg in args if arg not in ("-f", "--follow")])
+    return file_name, count, follow_file
+
+  def stream(self, terminal, task, args, lines):
+    """In a pipeline: the last lines of the file, or of the previous stage."""
+    file_name, count, follow_file = args
+    if follow_file:
+      # Stages pass lines on in batches, a followed line could sit in one
+      # until more arrive; following is for the screen only
+      task.fail(f"\nError: {self.name} -f can't be piped or redirected")
+      return
+    file_name, count = self.stream_source(terminal, (file_name, count), lines)
+    if file_name is not None:
+      file_path = readable_path(terminal, task, file_name)
+      if file_path is None:
+        return
+      lines = iter_lines(file_path, offset=tail_offset(file_path, count), cancel=task.check_cancelled)
+      yield from (line for line, _ in lines)
+    elif lines is None:
+      task.fail(f"\nError: {self.name} command requires a file name")
+    else:
+      # Only the last count lines are held while the input goes by
+      yield from deque(lines, maxlen=count)
+
+  def run(self, terminal, task, args):
+    """
+    Display the last lines of a file without reading the rest of it
+
+    With -f, keep displaying the lines appended to it until Ctrl+C.
+    """
+    file_name, count, follow_file = args
+    if count is None:
+      count = self.default_count
+    try:
+      if file_name is None:
+        task.fail(f"\nError: {self.name} command requires a file name")
+        return
+      file_path = readable_path(terminal, task, file_name)
+      if file_path is None:
+        return
+      start = tail_offset(file_path, count)
+      lines = iter_lines(file_path, offset=start, cancel=task.check_cancelled)
+      written, offset = write_lines(task, lines, count, lead="\n")
+      if not follow_file:
+        return
+      if offset is None:
+        offset = start
+        task.write("")
+      # Only what's appended from here on is read
+      for batch in follow(file_path, offset, cancel=task.check_cancelled, notices=task.write):
+        task.write("\n".join(batch))
+    except Exception as e:
+      task.fail(f"\nError reading file: {e}")
@@ -0,0 +1,213 @@
+import os
+import re
+import shlex
+import time
+from src.commands import Command, UsageError
+from src.pipeline import batches
+from src.tree_search import MAX_MATCHES_PER_FILE, compile_pattern, find, grep, grep_targets, parse_size
+
+
+def split_quoted(args):
+  """Rejoin the words of the command line so quoted arguments stay together."""
+  try:
+    return shlex.split(" ".join(args))
+  except ValueError as e:
+    raise UsageError(f"could not parse the arguments ({e})")
+
+
+# FIND FILES BY NAME, TYPE, SIZE OR AGE
+class FindCommand(Command):
+  name = "find"
+  usage = "find [directory] [-name <glob>] [-iname <glob>] [-type f|d] [-size [+|-]<n>[k|M|G]] [-mtime [+|-]<days>]"
+  examples = ('find -name "*.py"', "find src -type f -size +1M", "find -mtime -2")
+  background = True
+
+  def parse(self, args):
+    args = split_quoted(args)
+    options = {"name": None, "ignore_case": False, "kind": None, "size": None, "mtime": None}
+    directory = None
+    args = iter(args)
+    for arg in args:
+      if arg in ("-name", "-iname", "-type", "-size", "-mtime"):
+        value = next(args, None)
+        if value is None:
+          raise UsageError(f"{arg} requires a value")
+        if arg in ("-name", "-iname"):
+          options["name"] = value
+          options["ignore_case"] = arg == "-iname"
+        elif arg == "-type":
+          if value not in ("f", "d"):
+            raise UsageError("-type must be f (files) or d (directories)")
+          options["kind"] = value
+        elif arg == "-size":
+          try:
+            options["size"] = parse_size(value)
+          except ValueError as e:
+            raise UsageError(str(e))
+        else:
+          match = re.fullmatch(r"([+-]?)(\d+)", value)
+          if match is None:
+            raise UsageError(f"invalid number of days '{value}'")
+          options["mtime"] = (match.group(1), int(match.group(2)))
+      elif arg.startswith("-") or directory is not None:
+        raise UsageError(f"unknown find option '{arg}'")
+      else:
+        directory = arg
+    return directory, options
+
+  def run(self, terminal, task, args):
+    """List everything below a directory that passes the filters, as it's found."""
+    directory, options = args
+    try:
+      root = terminal.current_directory / (directory or ".")
+      if not root.is_dir():
+        task.fail(f"\nError: Directory '{directory}' not found")
+        return
+      found = 0
+      batch = []
+      prefix = "" if directory is None else os.path.join(directory, "")
+      task.write("")
+      for relative in find(root, now=time.time(), cancel=task.check_cancelled, **options):
+        batch.append(prefix + relative)
+        found += 1
+        # One signal per batch rather than per path
+        if len(batch) >= 256:
+          task.write("\n".join(batch))
+          batch = []
+      if batch:
+        task.write("\n".join(batch))
+      task.write(f"\n{found} found")
+    except Exception as e:
+      task.fail(f"\nError searching files: {e}")
+
+  def stream(self, terminal, task, args, lines):
+    """In a pipeline: the paths found, one per line."""
+    directory, options = args
+    root = terminal.current_directory / (directory or ".")
+    if not root.is_dir():
+      task.fail(f"\nError: Directory '{directory}' not found")
+      return
+    prefix = "" if directory is None else os.path.join(directory, "")
+    for relative in find(root, now=time.time(), cancel=task.check_cancelled, **options):
+      yield prefix + relative
+
+
+# SEARCH FILE CONTENTS
+class GrepCommand(Command):
+  name = "grep"
+  usage = "grep [-r] [-i] [-n] [-l] [-F] [--include <glob>] <pattern> [file_or_directory ...]"
+  examples = ('grep -rn "TODO" src', "grep -i error app.log", 'grep -rl --include "*.py" import',
+              "read app.log | grep -n ERROR")
+  background = True
+
+  def parse(self, args):
+    """Return (regex, paths, flags, include); paths is empty to read a pipe."""
+    args = split_quoted(args)
+    include = None
+    rest = []
+    args = iter(args)
+    for arg in args:
+      if arg == "--include":
+        include = next(args, None)
+        if include is None:
+          raise UsageError("--include requires a glob")
+      else:
+        rest.append(arg)
+    flags, positional = self.split_flags(rest, {"": "rinlF"})
+    if not positional:
+      raise UsageError("grep command requires a pattern")
+    pattern, paths = positional[0], positional[1:]
+    try:
+      regex = compile_pattern(pattern, ignore_case="i" in flags, fixed="F" in flags)
+    except re.error as e:
+      raise UsageError(f"invalid pattern: {e}")
+    return regex, paths, flags, include
+
+  def run(self, terminal, task, args):
+    """
+    Search files for a regular expression
+
+    Files are searched in parallel worker processes through mmap and
+    matches are shown as each batch of files completes, so the order of
+    files can differ between runs. Binary files are skipped.
+    """
+    regex, paths, flags, include = args
+    try:
+      if not paths and "r" not in flags:
+        task.fail("\nError: grep needs a file to search, or -r for the current directory")
+        return
+      counts = {"files": 0, "matches": 0, "binary": 0}
+      lines = self.search(terminal, task, regex, paths or ["."], flags, include, counts)
+      if lines is None:
+        return
+      task.write("")
+      for batch in batches(lines):
+        task.write("\n".join(batch))
+
+      if "l" in flags:
+        summary = f"\n{counts['files']} files matched"
+      else:
+        summary = f"\n{counts['matches']} matches in {counts['files']} files"
+      if counts["binary"]:
+        summary += f" ({counts['binary']} binary or unreadable files skipped)"
+      task.write(summary)
+    except Exception as e:
+      task.fail(f"\nError searching files: {e}")
+
+  def stream(self, terminal, task, args, lines):
+    """In a pipeline: the matching lines of the files, or of the previous stage."""
+    regex, paths, flags, include = args
+    if paths or lines is None:
+      found = self.search(terminal, task, regex, paths or ["."], flags, include, {"files": 0, "matches": 0, "binary": 0})
+      if found is not None:
+        yield from found
+      return
+    # Input lines are text, the file search works on bytes
+    text_regex = re.compile(regex.pattern.decode("utf-8"), regex.flags)
+    for number, line in enumerate(lines, 1):
+      if text_regex.search(line):
+        if "l" in flags:
+          yield "(standard input)"
+          return
+        yield f"{number}:{line}" if "n" in flags else line
+
+  def search(self, terminal, task, regex, paths, flags, include, counts):
+    """
+    Check the paths, then return a generator of output lines
+
+    counts is updated with the matched files, matches and skipped binary
+    files as the lines are generated. Returns None (after writing an
+    error) if a path can't be searched.
+    """
+    for path in paths:
+      full_path = terminal.current_directory / path
+      if not full_path.exists():
+        task.fail(f"\nError: '{path}' not found")
+        return None
+      if full_path.is_dir() and "r" not in flags:
+        task.fail(f"\nError: '{path}' is a directory (use -r to search it)")
+        return None
+    return self._search(terminal, task, regex, paths, flags, include, counts)
+
+  def _search(self, terminal, task, regex, paths, flags, include, counts):
+    targets = grep_targets([os.path.join(terminal.current_directory, path) for path in paths],
+                           "r" in flags, include, cancel=task.check_cancelled)
+    files_only = "l" in flags
+    show_names = len(paths) > 1 or "r" in flags
+    for path, found in grep(targets, regex, files_only, cancel=task.check_cancelled):
+      if found is None:
+        counts["binary"] += 1
+        continue
+      if not found:
+        continue
+      counts["files"] += 1
+      counts["matches"] += len(found)
+      name = os.path.relpath(path, terminal.current_directory)
+      if files_only:
+        yield name
+        continue
+      lead = f"{name}:" if show_names else ""
+      for number, line in found:
+        yield f"{lead}{number}:{line}" if "n" in flags else f"{lead}{line}"
+      if len(found) >= MAX_MATCHES_PER_FILE:
+        yield f"{lead} ... stopped after {MAX_MATCHES_PER_FILE} matches"
@@ -0,0 +1,247 @@
+from collections import deque
+from src.commands import Command, UsageError
+from src.metrics import METRICS, SAMPLE_LIMIT
+from src.scrollback import format_bytes, process_memory
+
+
+# SHOW HELP MESSAGE
+class HelpCommand(Command):
+  name = "help"
+  pipeable = True
+
+  def run(self, terminal, task, args):
+      help_text = """
+        Available Commands:
+        ------------------
+        clear or cls : Clear the terminal screen
+        cd <dir> : Change directory (use .. to go back)
+        ls : List files and directories in current directory
+        ls -l / -a : Show permissions and seconds / include hidden files
+        ls -S / -t / -r : Sort by size / by modification time / reversed
+                          (directory sizes show once du has counted them)
+        du [-s] [-h] [--max-depth <n>] [paths] : Show the disk space used by directories
+        pwd : Show current directory path
+        mkdir <name> : Create a new directory
+        rmdir <name> : Remove an empty directory
+        rmdir -r <name> : Remove directory and its contents (Ctrl+C stops it)
+        rmdir -f <name> : Force remove without confirmation
+        touch <name> : Create a new file
+        rm <name> : Delete a file
+        write <file> <content> : Write content to a file
+        append <file> <content> : Add a line to the end of a file
+        cat <files> [> | >> <file>] : Show files, or join them into a file
+        cp [-r] <source> <destination> : Copy a file, or a directory with -r
+        mv <source> <destination> : Move or rename a file or directory
+        read <file> : Display the content of a file, one page at a time
+        read --from <n> --lines <count> <file> : Display a range of lines
+        more : Show the next page of the last read
+        head [-n <count>] [file] : Show the first lines of a file (or of piped output)
+        tail [-n <count>] [file] : Show the last lines of a file (or of piped output)
+        tail -f <file> : Keep showing lines appended to a file until Ctrl+C
+        find [dir] [-name <glob>] [-type f|d] [-size +1M] [-mtime -2] : Find files
+        grep [-r] [-i] [-n] [-l] <pattern> [files] : Search files for a regular expression
+        history-output [text] : Show archived output older than the scrollback
+        scrollback [<lines>] : Show or set the scrollback limit
+        mem : Show memory used by the scrollback and the process
+        time <command> : Run a command and show how long it took
+        stats : Show p50/p95/p99 latencies of commands, output and prompt
+        stats --export <file> : Save the metrics as JSON (.json) or Prometheus text
+        stats --reset : Start collecting the metrics again
+        help : Show this help message
+        exit : Close the terminal
+        <program> [args] : Run any other command as an external program
+        <command> | <command> : Pass output on, e.g. read app.log | grep ERROR | head 20
+        <command> > <file> / >> <file> : Save output to a file / add it to the end
+                        (not clear, cd, mkdir, rmdir, touch, scrollback, mem, time or exit)
+
+        Shortcuts:
+        ---------
+        Ctrl+L : Clear screen
+        Ctrl+T / Ctrl+W : Open a new tab / close the current one
+        Ctrl+PgDown / Ctrl+PgUp : Switch to the next / previous tab
+        Ctrl+C : Cancel the running command
+        Ctrl+F : Find in the output (Enter / Shift+Enter for the next / previous match)
+        Up/Down Arrow : Navigate through command history (only commands
+                        starting with what's typed, if anything)
+        Ctrl+R : Search command history (Ctrl+R again for older matches)
+        Tab : Complete command names and paths (twice to list the choices)
+        Ctrl+Left/Right : Move by word (Ctrl+Backspace / Ctrl+Delete delete one)
+        Ctrl+U / Ctrl+K : Delete to the start / end of the line
+        Shift+Enter : Continue the command on a new line
+      """
+
+      task.write(help_text)
+
+      # Commands added by plugins only have a name to show
+      extra = terminal.commands.extra_names()
+      if extra:
+        task.write(f"        Plugin commands: {', '.join(extra)}")
+
+
+# CLEAR THE SCREEN
+class ClearCommand(Command):
+  name = "clear"
+
+  def run(self, terminal, task, args):
+    terminal.clear_screen()
+
+
+# CLOSE THE TERMINAL
+class ExitCommand(Command):
+  name = "exit"
+
+  def run(self, terminal, task, args):
+    # The main window closes itself when it sees the command
+    pass
+
+
+# ARCHIVED OUTPUT
+class HistoryOutputCommand(Command):
+  name = "history-output"
+  usage = "history-output [text]"
+  background = True
+
+  # Most recent matches shown
+  limit = 1000
+
+  def parse(self, args):
+    return ' '.join(args)
+
+  def run(self, terminal, task, text):
+    """Show the most recent archived lines, optionally only those containing text."""
+    if terminal.view is None:
+      task.fail("\nError: There is no scrollback in batch mode")
+      return
+    try:
+      archive = terminal.view.archive
+      if archive.line_count == 0:
+        task.write("\nNo output has been archived yet")
+        return
+      if text:
+        matches = archive.search(text, cancel=task.check_cancelled)
+      else:
+        matches = archive.iter_lines(cancel=task.check_cancelled)
+      # Only the last `limit` matches are kept in memory
+      recent = deque(matches, maxlen=self.limit)
+      if not recent:
+        task.write(f"\nNo archived output contains '{text}'")
+        return
+      task.write(f"\nArchived output ({len(recent)} most recent matching lines):")
+      task.write("----------------------------------------")
+      for start in range(0, len(recent), 256):
+        batch = [recent[i] for i in range(start, min(start + 256, len(recent)))]
+        task.write("\n".join(f"{number:8d}  {line}" for number, line in batch))
+      task.write("----------------------------------------")
+    except Exception as e:
+      task.fail(f"\nError reading archived output: {e}")
+
+
+# SCROLLBACK LIMIT
+class ScrollbackCommand(Command):
+  name = "scrollback"
+  usage = "scrollback [<lines>]"
+  examples = ("scrollback 50000",)
+
+  def parse(self, args):
+    if not args:
+      return None
+    if not args[0].isdigit():
+      raise UsageError("scrollback limit must be a number of lines")
+    return int(args[0])
+
+  def run(self, terminal, task, limit):
+    view = terminal.view
+    if view is None:
+      task.fail("\nError: There is no scrollback in batch mode")
+      return
+    if limit is None:
+      task.write(f"\nScrollback limit: {view.scrollback_limit} lines")
+      return
+    view.set_scrollback_limit(limit)
+    task.write(f"\nScrollback limit set to {view.scrollback_limit} lines")
+
+
+# MEMORY USAGE
+class MemoryCommand(Command):
+  name = "mem"
+
+  def run(self, terminal, task, args):
+    view = terminal.view
+    task.write("\nMemory usage:")
+    task.write("----------------------------------------")
+    # Batch mode has no scrollback to report
+    if view is not None:
+      lines, characters = view.scrollback_size()
+      task.write(f"Scrollback: {lines} lines (limit {view.scrollback_limit}), {characters} characters")
+      task.write(f"Archived: {view.archive.line_count} lines, "
+                 f"{format_bytes(view.archive.size_on_disk())} compressed on disk")
+    task.write(f"Command history: {len(terminal.history)} entries")
+    memory = process_memory()
+    if memory is not None:
+      task.write(f"{memory[0]}: {format_bytes(memory[1])}")
+    task.write("----------------------------------------")
+
+
+# TIME A COMMAND
+class TimeCommand(Command):
+  name = "time"
+  usage = "time <command>"
+  examples = ("time ls -l", "time read app.log | grep ERROR")
+  whole_line = True
+
+  def parse(self, command):
+    if not command:
+      raise UsageError("time command requires a command to run")
+    return command
+
+  def run(self, terminal, task, command):
+    """Run command as part of this line; its timing is reported when it finishes."""
+    terminal.report_timing = True
+    terminal.dispatch(command)
+
+
+# PERFORMANCE METRICS
+class StatsCommand(Command):
+  name = "stats"
+  pipeable = True
+  usage = "stats [--reset | --export <file>]"
+  examples = ("stats", "stats --export metrics.prom", "stats --export metrics.json")
+
+  def parse(self, args):
+    if not args:
+      return "show", None
+    if args == ["--reset"]:
+      return "reset", None
+    if len(args) == 2 and args[0] == "--export":
+      return "export", args[1]
+    raise UsageError("stats takes --reset or --export <file>")
+
+  def run(self, terminal, task, args):
+    action, file_name = args
+    if action == "reset":
+      METRICS.reset()
+      task.write("\nMetrics reset")
+      return
+    if action == "export":
+      file_path = terminal.current_directory / file_name
+      try:
+        METRICS.export(file_path)
+        task.write(f"\nMetrics written to '{file_path}'")
+      except OSError as e:
+        task.fail(f"\nError writing metrics: {e}")
+      return
+
+    timings, counters = METRICS.summary()
+    task.write(f"\nPerformance metrics (percentiles over the last {SAMPLE_LIMIT} samples):")
+    task.write("----------------------------------------")
+    task.write(f"{'Metric':32} {'Count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'Max ms':>9}")
+    for row in timings:
+      # command_seconds for ls shows as "command ls"
+      label = row["name"].replace("_seconds", "").replace("_", " ")
+      if row["command"]:
+        label += f" {row['command']}"
+      task.write(f"{label:32} {row['count']:7d} {row['p50'] * 1000:9.2f} {row['p95'] * 1000:9.2f} "
+                 f"{row['p99'] * 1000:9.2f} {row['max'] * 1000:9.2f}")
+    task.write("----------------------------------------")
+    task.write(f"Output: {counters.get('output_chars_total', 0)} characters in "
+               f"{counters.get('output_flushes_total', 0)} flushes")
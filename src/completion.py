@@ -0,0 +1,165 @@
+import os
+from bisect import bisect_left
+from collections import OrderedDict
+from itertools import chain, islice
+from pathlib import Path
+
+# Directories whose completion indexes are kept around
+MAX_CACHED_INDEXES = 32
+
+
+class NameIndex:
+  """
+  Prefix index over the names of one directory
+
+  The names are kept sorted, so every prefix covers one contiguous range
+  that two bisects find - the same question a trie answers, without a
+  dict per character for directories with 100k entries. The common
+  prefix of a range is the common prefix of its first and last names.
+  """
+
+  def __init__(self, names, is_dir):
+    # Sorted by name, is_dir[i] belongs to names[i]
+    self.names = names
+    self.is_dir = is_dir
+
+  @classmethod
+  def scan(cls, path):
+    """
+    Index a directory in one os.scandir pass
+
+    Only names and types are needed, which DirEntry has without a stat()
+    per entry (symbolic links aside), so this is much quicker than the
+    listing "ls" builds with sizes and times.
+    """
+    entries = []
+    with os.scandir(path) as it:
+      for entry in it:
+        try:
+          is_dir = entry.is_dir()
+        except OSError:
+          is_dir = False
+        entries.append((entry.name, is_dir))
+    entries.sort()
+    return cls([name for name, is_dir in entries], [is_dir for name, is_dir in entries])
+
+  def range(self, prefix):
+    start = bisect_left(self.names, prefix)
+    # "\U0010ffff" sorts after any character a name can continue with
+    end = bisect_left(self.names, prefix + "\U0010ffff", start)
+    return start, end
+
+  def lookup(self, prefix, limit=100):
+    """
+    Find the names starting with prefix
+
+    Hidden names are left out unless prefix itself starts with ".".
+
+    Returns:
+        (matches, total, common) - up to `limit` (name, is_dir) pairs, the
+        number of names that match and their longest common prefix
+    """
+    if prefix:
+      start, end = self.range(prefix)
+      spans = [(start, end)]
+    else:
+      # Hidden names sort together, so they are one range to skip
+      hidden_start, hidden_end = self.range(".")
+      spans = [(0, hidden_start), (hidden_end, len(self.names))]
+    spans = [(start, end) for start, end in spans if start < end]
+    if not spans:
+      return [], 0, prefix
+
+    ids = islice(chain.from_iterable(range(start, end) for start, end in spans), limit)
+    matches = [(self.names[i], self.is_dir[i]) for i in ids]
+    total = sum(end - start for start, end in spans)
+    common = os.path.commonprefix([self.names[spans[0][0]], self.names[spans[-1][1] - 1]])
+    return matches, total, common
+
+
+class IndexCache:
+  """
+  Name indexes of recently completed directories, shared by every session
+
+  An index is kept while its directory's mtime is unchanged, which is the
+  case until an entry is added, removed or renamed, and is dropped by
+  invalidate() when a session's file system watcher sees a change.
+  Completion only runs on the GUI thread, so no lock is needed.
+  """
+
+  def __init__(self, max_indexes=MAX_CACHED_INDEXES):
+    self.max_indexes = max_indexes
+    self._indexes = OrderedDict()
+
+  def index_for(self, directory):
+    key = os.fspath(directory)
+    mtime = os.stat(key).st_mtime_ns
+    cached = self._indexes.get(key)
+    if cached is not None and cached[0] == mtime:
+      self._indexes.move_to_end(key)
+      return cached[1]
+    index = NameIndex.scan(key)
+    self._indexes[key] = (mtime, index)
+    self._indexes.move_to_end(key)
+    while len(self._indexes) > self.max_indexes:
+      self._indexes.popitem(last=False)
+    return index
+
+  def invalidate(self, path=None):
+    """Forget one directory's index, or every index when path is None."""
+    if path is None:
+      self._indexes.clear()
+    else:
+      self._indexes.pop(os.fspath(path), None)
+
+
+class Completer:
+  """Completes command names and paths for the prompt."""
+
+  def __init__(self, index_cache, command_names):
+    self.index_cache = index_cache
+    self.command_names = command_names
+
+  def complete(self, line, current_directory):
+    """
+    Complete the last word of line
+
+    Returns:
+        (new_line, candidates, total) where candidates lists the possible
+        completions (at most 100) when the word is still ambiguous, and
+        total is how many there are in all.
+    """
+    words = line.split(" ")
+    word = words[-1]
+
+    if len(words) == 1:
+      names = [name for name in self.command_names() if name.startswith(word)]
+      if len(names) == 1:
+        return names[0] + " ", [], 1
+      completed = os.path.commonprefix(names) if names else word
+      return completed, names[:100], len(names)
+
+    # Split "some/dir/par" into the directory part and the partial name
+    slash = max(word.rfind("/"), word.rfind("\\"))
+    directory_part, partial = word[:slash + 1], word[slash + 1:]
+    directory = Path(os.path.expanduser(directory_part))
+    if not directory.is_absolute():
+      directory = current_directory / directory
+    # Same key as the directory cache and watcher use
+    directory = os.path.normpath(directory)
+
+    try:
+      index = self.index_cache.index_for(directory)
+    except OSError:
+      return line, [], 0
+
+    matches, total, common = index.lookup(partial)
+    prefix = " ".join(words[:-1]) + " " + directory_part
+    if total == 1:
+      name, is_dir = matches[0]
+      return prefix + name + ("/" if is_dir else " "), [], 1
+    return prefix + max(common, partial, key=len), [name + ("/" if is_dir else "") for name, is_dir in matches], total
+
+
+# Shared by every session in the process
+INDEX_CACHE = IndexCache()
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# Everything "ls" needs about an entry, taken from a single scandir pass
+EntryInfo = namedtuple("EntryInfo", ["name", "is_dir", "size", "mtime", "mode"])
+
+# Directories whose listings are kept around
+MAX_CACHED_DIRECTORIES = 64
+
+# Coarsest mtime resolution to expect, in seconds (FAT keeps 2). An entry
+# added in the same tick as the scan leaves the mtime as it was, so a
+# listing taken that close to the last change is only trusted once
+MTIME_GRANULARITY = 2.0
+
+
+class DirectoryCache:
+  """
+  Caches directory listings built with os.scandir
+
+  A listing is reused while the directory's mtime is unchanged, so a
+  repeated "ls" costs a single stat() call. A file system watcher or the
+  commands that modify files call invalidate() to drop listings early.
+  Only a listing taken within MTIME_GRANULARITY of the directory's last
+  change is scanned again, until one is taken after it.
+  Listings are built on worker threads, so access is guarded by a lock.
+  """
+
+  def __init__(self, max_directories=MAX_CACHED_DIRECTORIES):
+    self.max_directories = max_directories
+    self._listings = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def listing(self, path, cancel=None):
+    """Return the EntryInfo list for a directory, sorted by name."""
+    key = os.fspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    with self._lock:
+      cached = self._listings.get(key)
+      if cached is not None and cached[0] == mtime and cached[1]:
+        self._listings.move_to_end(key)
+        self.hits += 1
+        return cached[2]
+
+    # Whether the scan comes late enough after the last change to be
+    # trusted for as long as the mtime stays the same
+    settled = time.time() - mtime / 1e9 > MTIME_GRANULARITY
+    entries = scan_directory(key, cancel)
+    with self._lock:
+      self.misses += 1
+      self._listings[key] = (mtime, settled, entries)
+      self._listings.move_to_end(key)
+      while len(self._listings) > self.max_directories:
+        self._listings.popitem(last=False)
+    return entries
+
+  def invalidate(self, path=None):
+    """Forget one directory's listing, or every listing when path is None."""
+    with self._lock:
+      if path is None:
+        self._listings.clear()
+      else:
+        self._listings.pop(os.fspath(path), None)
+
+
+def scan_directory(path, cancel=None):
+  """
+  List a directory in one os.scandir pass
+
+  DirEntry already knows each entry's type, so the only extra syscall is
+  the stat() for size and mtime (which is free on Windows).
+  """
+  entries = []
+  with os.scandir(path) as it:
+    for count, entry in enumerate(it):
+      if cancel and count % 1000 == 0:
+        cancel()
+      try:
+        is_dir = entry.is_dir()
+        stats = entry.stat()
+      except OSError:
+        # Broken symlink: describe the link itself
+        is_dir = False
+        stats = entry.stat(follow_symlinks=False)
+      entries.append(EntryInfo(entry.name, is_dir, stats.st_size, stats.st_mtime, stats.st_mode))
+  entries.sort(key=lambda item: item.name)
+  return entries
+
+
+# Shared by every session in the process
+DIRECTORY_CACHE = DirectoryCache()
@@ -0,0 +1,216 @@
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from src.dir_cache import MTIME_GRANULARITY
+
+# Threads scanning directories at once; scandir and stat release the GIL
+USAGE_WORKERS = 8
+
+# Directories whose scans and totals are kept around
+MAX_CACHED_DIRECTORIES = 200000
+
+
+def usage(info):
+  """Bytes a stat result takes on disk (allocated blocks where the platform reports them)."""
+  blocks = getattr(info, "st_blocks", None)
+  return blocks * 512 if blocks is not None else info.st_size
+
+
+class DiskUsageCache:
+  """
+  What du learned about each directory, keyed by its inode and mtime
+
+  For every directory scanned it keeps the bytes of its own entries
+  (files, links, the directory itself) and its subdirectories. While a
+  directory's device, inode and mtime are unchanged its scan is reused,
+  so running du again only costs a stat() per directory plus a scandir
+  of the ones that changed. Subtree totals du worked out are kept too,
+  for ls to show as directory sizes.
+
+  Like DirectoryCache, a scan taken within MTIME_GRANULARITY of the
+  directory's last change is redone the next time it's needed. A
+  file growing in place doesn't change its directory's mtime, so the
+  commands appending to files call invalidate() for their directory.
+  """
+
+  def __init__(self, max_directories=MAX_CACHED_DIRECTORIES):
+    self.max_directories = max_directories
+    self._scans = OrderedDict()
+    self._totals = OrderedDict()
+    self._lock = threading.Lock()
+
+  def scan(self, path, info):
+    """
+    Returns:
+        (own_bytes, subdirectories, linked) for a directory, cached or from
+        a fresh scandir; linked holds (device, inode, bytes) of files with
+        more than one name, which own_bytes leaves out
+    """
+    key = (info.st_dev, info.st_ino, info.st_mtime_ns)
+    with self._lock:
+      cached = self._scans.get(path)
+      if cached is not None and cached[0] == key and cached[1]:
+        self._scans.move_to_end(path)
+        return cached[2]
+
+    settled = time.time() - info.st_mtime_ns / 1e9 > MTIME_GRANULARITY
+
+    own = usage(info)
+    subdirectories = []
+    linked = []
+    with os.scandir(path) as it:
+      for entry in it:
+        try:
+          if entry.is_dir(follow_symlinks=False):
+            subdirectories.append(entry.path)
+            continue
+          entry_info = entry.stat(follow_symlinks=False)
+          if entry_info.st_nlink > 1:
+            linked.append((entry_info.st_dev, entry_info.st_ino, usage(entry_info)))
+          else:
+            own += usage(entry_info)
+        except OSError:
+          pass
+    result = (own, subdirectories, linked)
+    with self._lock:
+      self._remember(self._scans, path, (key, settled, result))
+    return result
+
+  def store_total(self, path, info, total):
+    with self._lock:
+      self._remember(self._totals, path, ((info.st_dev, info.st_ino, info.st_mtime_ns), total))
+
+  def total(self, path):
+    """The subtree total du last found for path, or None if unknown or the directory changed since."""
+    path = os.fspath(path)
+    with self._lock:
+      cached = self._totals.get(path)
+    if cached is None:
+      return None
+    try:
+      info = os.stat(path, follow_symlinks=False)
+    except OSError:
+      return None
+    if cached[0] != (info.st_dev, info.st_ino, info.st_mtime_ns):
+      return None
+    return cached[1]
+
+  def invalidate(self, path=None):
+    """Forget the scan of one directory and the totals holding it, or everything when path is None."""
+    with self._lock:
+      if path is None:
+        self._scans.clear()
+        self._totals.clear()
+        return
+      path = os.fspath(path)
+      self._scans.pop(path, None)
+      while True:
+        self._totals.pop(path, None)
+        parent = os.path.dirname(path)
+        if parent == path:
+          break
+        path = parent
+
+  def _remember(self, table, path, value):
+    table[path] = value
+    table.move_to_end(path)
+    while len(table) > self.max_directories:
+      table.popitem(last=False)
+
+
+class _Node:
+  """A directory whose subtree total isn't complete yet."""
+
+  __slots__ = ("parent", "depth", "info", "total", "waiting", "scanned")
+
+  def __init__(self, parent, depth):
+    self.parent = parent
+    self.depth = depth
+    self.info = None
+    self.total = 0
+    # Subdirectories whose totals haven't come in
+    self.waiting = 0
+    self.scanned = False
+
+
+def disk_usage(root, cache, cancel=None, workers=USAGE_WORKERS):
+  """
+  Yield (path, total_bytes, depth) for every directory below root, root last
+
+  Directories are scanned on a thread pool and a directory is yielded as
+  soon as its whole subtree is done, so totals stream in while bigger
+  subtrees are still being walked. Symbolic links are counted, never
+  followed, and a file with several hard links only once, for the first
+  directory it's found in. Unreadable directories are yielded with a
+  total of None, then count as empty.
+  """
+  root = os.fspath(root)
+  done = queue.SimpleQueue()
+  nodes = {root: _Node(None, 0)}
+  # (device, inode) of the hard linked files already counted
+  counted = set()
+
+  def scan(path):
+    info = os.stat(path, follow_symlinks=False)
+    return info, cache.scan(path, info)
+
+  pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="du")
+  try:
+    def submit(path):
+      future = pool.submit(scan, path)
+      future.add_done_callback(lambda future: done.put((path, future)))
+
+    submit(root)
+    pending = 1
+    while pending:
+      try:
+        path, future = done.get(timeout=0.1)
+      except queue.Empty:
+        if cancel is not None:
+          cancel()
+        continue
+      pending -= 1
+      if cancel is not None:
+        cancel()
+
+      node = nodes[path]
+      node.scanned = True
+      try:
+        node.info, (own, subdirectories, linked) = future.result()
+      except OSError:
+        yield path, None, node.depth
+        own, subdirectories, linked = 0, [], []
+      for device, inode, size in linked:
+        if (device, inode) not in counted:
+          counted.add((device, inode))
+          own += size
+      node.total += own
+      node.waiting += len(subdirectories)
+      for subdirectory in subdirectories:
+        nodes[subdirectory] = _Node(path, node.depth + 1)
+        submit(subdirectory)
+        pending += 1
+
+      # A finished directory may finish its parent, and so on upwards
+      while node.scanned and node.waiting == 0:
+        del nodes[path]
+        if node.info is not None:
+          cache.store_total(path, node.info, node.total)
+        yield path, node.total, node.depth
+        if node.parent is None:
+          break
+        path = node.parent
+        parent = nodes[path]
+        parent.total += node.total
+        parent.waiting -= 1
+        node = parent
+  finally:
+    # Closed early (Ctrl+C, "du | head") - drop the scans not started yet
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by every session in the process
+DISK_USAGE_CACHE = DiskUsageCache()
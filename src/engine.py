@@ -0,0 +1,322 @@
+import time
+from functools import partial
+from pathlib import Path
+from src.commands import CommandRegistry, UsageError
+from src.dir_cache import DIRECTORY_CACHE
+from src.history import CommandHistory
+from src.metrics import METRICS, CommandTimer
+
+
+class CommandCancelled(BaseException):
+  """
+  Raised inside a running task once the user pressed Ctrl+C.
+
+  Like KeyboardInterrupt it derives from BaseException, so the
+  "except Exception" blocks in the handlers don't swallow it.
+  """
+
+
+class InlineTask:
+  """Stands in for CommandTask when a command runs on the GUI thread."""
+
+  def __init__(self, write):
+    self.write = write
+    # One task serves every command run here, so failures are counted
+    self.failures = 0
+
+  def fail(self, message=None):
+    self.failures += 1
+    if message is not None:
+      self.write(message)
+
+  def is_cancelled(self):
+    return False
+
+  def check_cancelled(self):
+    pass
+
+
+# OUTPUT WITHOUT A WINDOW
+class StreamSink:
+  """
+  Writes output to a text stream such as stdout
+
+  Has the write()/write_line() interface of the window's OutputSink, so
+  commands don't know whether their output ends up on screen or in a
+  pipe. The stream does the buffering.
+  """
+
+  def __init__(self, stream):
+    self.stream = stream
+    self._started = False
+
+  def write(self, text):
+    """Write text as-is."""
+    if text:
+      self.stream.write(text)
+      self._started = True
+
+  def write_line(self, text):
+    """Write text as a new line."""
+    self.stream.write("\n" + text if self._started else text)
+    self._started = True
+
+  def finish(self):
+    """End the last line and flush the stream."""
+    if self._started:
+      self.stream.write("\n")
+      self._started = False
+    self.stream.flush()
+
+
+class DirectTask:
+  """Stands in for CommandTask when DirectExecutor runs a background command."""
+
+  def __init__(self, output):
+    self.output = output
+    self.failed = False
+    self._cancelled = False
+    self._cancel_callbacks = []
+
+  def write(self, text):
+    self.output.write_line(text)
+
+  def fail(self, message=None):
+    self.failed = True
+    if message is not None:
+      self.write(message)
+
+  def write_text(self, text):
+    self.output.write(text)
+
+  def on_cancel(self, callback):
+    self._cancel_callbacks.append(callback)
+    if self._cancelled:
+      callback()
+
+  def cancel(self):
+    self._cancelled = True
+    for callback in list(self._cancel_callbacks):
+      callback()
+
+  def is_cancelled(self):
+    return self._cancelled
+
+  def check_cancelled(self):
+    if self._cancelled:
+      raise CommandCancelled()
+
+
+class DirectExecutor:
+  """
+  Runs background commands right away, on the calling thread
+
+  Batch mode's stand-in for CommandExecutor: with no window to keep
+  responsive a command simply runs to completion, writing straight to
+  the output. cancel() (from a SIGINT handler) stops it like Ctrl+C
+  does in the window.
+  """
+
+  def __init__(self, output):
+    self.output = output
+    self.current_task = None
+    # Commands that failed (see DirectTask.fail), for the exit status
+    self.failures = 0
+
+  def is_busy(self):
+    return self.current_task is not None
+
+  def submit(self, func, *args):
+    """Run func(task, *args) and return the finished task."""
+    task = DirectTask(self.output)
+    # A command may start another one (rmdir -f), which runs nested
+    previous, self.current_task = self.current_task, task
+    try:
+      func(task, *args)
+    except CommandCancelled:
+      pass
+    except Exception as e:
+      task.failed = True
+      self.output.write_line(f"\nError: {e}")
+    finally:
+      self.current_task = previous
+    if task.failed:
+      self.failures += 1
+    if task.is_cancelled():
+      self.output.write_line("\nCommand cancelled")
+    return task
+
+  def cancel(self):
+    if self.current_task is not None:
+      self.current_task.cancel()
+      return True
+    return False
+
+
+# SESSION
+class TerminalEngine:
+  """
+  One terminal session: its state and the running of command lines
+
+  Knows nothing about Qt, so the window and the batch mode share it.
+  Output goes to `output`, anything with write() and write_line() (the
+  window's OutputSink or a StreamSink), and background commands to
+  `executor` (the window's CommandExecutor worker pool, or a
+  DirectExecutor). Commands get the engine as their `terminal`.
+  """
+
+  def __init__(self, output, executor, view=None):
+    self.output = output
+    self.executor = executor
+    # The widget showing the session, None in batch mode
+    self.view = view
+
+    self.current_directory = Path.home()
+    # Read from disk on first use
+    self.history = CommandHistory()
+    # Shared by every session, see DIRECTORY_CACHE
+    self.dir_cache = DIRECTORY_CACHE
+    # Where the last paged "read" stopped
+    self.pager = None
+
+    # Commands are looked up by name and imported on first use
+    self.commands = CommandRegistry()
+    self.inline_task = InlineTask(output.write_line)
+
+    # Timing of the command line being run, reported by "time" if asked
+    self.command_timer = None
+    self.report_timing = False
+    # Command lines rejected with a usage error
+    self.usage_errors = 0
+
+  # COMMANDS PROCESSES
+  def execute(self, command):
+    """
+    Start a command line
+
+    Returns:
+        True while it still runs on the executor, in which case
+        finish_command_timing() is up to whoever sees it finish
+    """
+    parts = command.split()
+    if not parts:
+      return False
+
+    self.command_timer = CommandTimer(parts[0])
+    self.dispatch(command)
+    METRICS.record("dispatch_seconds", time.perf_counter() - self.command_timer.started)
+
+    if self.executor.is_busy():
+      return True
+    self.finish_command_timing()
+    return False
+
+  def dispatch(self, command):
+    """Find and start the command for a line."""
+    command = command.strip()
+    name = command.split()[0]
+    handler = self.commands.get(name)
+    if handler is not None and handler.whole_line:
+      # Takes the rest of the line, pipes and all ("time a | b")
+      self.command_timer.command = name
+      self.run_command(handler, command[len(name):].strip())
+      return
+
+    if "|" in command or ">" in command:
+      from src.pipeline import PipelineError, split_pipeline
+      try:
+        stages, redirect = split_pipeline(command)
+      except PipelineError as e:
+        self.usage_errors += 1
+        self.output.write_line(f"\nError: {e}")
+        return
+      if len(stages) > 1 or redirect is not None:
+        self.command_timer.command = "pipeline"
+        self.run_pipeline(stages, redirect)
+        return
+
+    self.command_timer.command = name if handler is not None else "external"
+    self.run_command(*self.resolve(command))
+
+  def resolve(self, command):
+    """Return (handler, raw arguments) for one command."""
+    name = command.split()[0]
+    handler = self.commands.get(name)
+    if handler is None:
+      # Anything else is an external program, given the whole line to split
+      return self.commands.external(), command
+    if handler.whole_line:
+      return handler, command[len(name):].strip()
+    return handler, command.split()[1:]
+
+  def finish_command_timing(self):
+    timer = self.command_timer
+    if timer is None:
+      return
+    self.command_timer = None
+    wall, user, system = timer.stop()
+    METRICS.record("command_seconds", wall, timer.command)
+    METRICS.record("command_user_cpu_seconds", user, timer.command)
+    METRICS.record("command_system_cpu_seconds", system, timer.command)
+    if self.report_timing:
+      self.report_timing = False
+      self.output.write_line(f"\nreal {wall:.3f}s  user {user:.3f}s  sys {system:.3f}s")
+
+  def run_command(self, handler, args):
+    """Parse the arguments and run a command here or on the executor."""
+    try:
+      options = handler.parse(args)
+    except UsageError as e:
+      self.show_usage(handler, e)
+      return
+    if handler.background:
+      self.run_in_background(handler.run, options)
+    else:
+      handler.run(self, self.inline_task, options)
+
+  def run_pipeline(self, stages, redirect):
+    """Parse every stage of a pipeline, then run them together on the executor."""
+    from src.pipeline import run_pipeline
+    parsed = []
+    for stage in stages:
+      handler, args = self.resolve(stage)
+      try:
+        # Clearing the screen, changing directory, asking y/n... must
+        # happen on the GUI thread, not on a worker running the pipeline
+        if not (handler.background or handler.pipeable):
+          raise UsageError(f"{stage.split()[0]} can't be used in a pipeline or with > and >>")
+        parsed.append((handler, handler.parse(args)))
+      except UsageError as e:
+        self.show_usage(handler, e)
+        return
+    self.run_in_background(run_pipeline, parsed, redirect)
+
+  def run_in_background(self, func, *args):
+    """Run func(terminal, task, *args) on the executor."""
+    self.executor.submit(partial(func, self), *args)
+
+  def show_usage(self, handler, error):
+    self.usage_errors += 1
+    self.output.write_line(f"\nError: {error}")
+    if handler.usage:
+      self.output.write_line(f"Usage: {handler.usage}")
+    if len(handler.examples) == 1:
+      self.output.write_line(f"Example: {handler.examples[0]}")
+    elif handler.examples:
+      self.output.write_line("Examples:")
+      for example in handler.examples:
+        self.output.write_line(f"  {example}")
+
+  # THINGS ONLY A WINDOW CAN DO
+  def ask_confirmation(self, message, operation):
+    """Ask a y/n question; operation runs if the answer is y."""
+    if self.view is not None:
+      self.view.ask_confirmation(message, operation)
+      return
+    # Nobody to answer in batch mode
+    self.output.write_line(f"\n{message} (y/n): n")
+    self.output.write_line("Operation cancelled (nothing to confirm in batch mode, use -f)")
+
+  def clear_screen(self):
+    if self.view is not None:
+      self.view.clear_screen()
@@ -0,0 +1,404 @@
+import errno
+import os
+import queue
+import secrets
+import stat
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Bytes per copy_file_range/sendfile call; the kernel moves them without
+# passing through Python, the size only sets how often cancel is checked
+KERNEL_CHUNK = 64 * 1024 * 1024
+
+# Buffer of the plain read/write fallback
+BUFFER_SIZE = 1024 * 1024
+
+# Threads copying files of a tree at once
+COPY_WORKERS = 8
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+# Errors meaning "this file system or platform can't do that", after which
+# the next, slower way of copying is tried
+_UNSUPPORTED = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                getattr(errno, "ENOTSUP", errno.EOPNOTSUPP), errno.ENOTSOCK, errno.EPERM, errno.EBADF}
+
+# Flags of the temporary files written before a rename
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0) | getattr(os, "O_CLOEXEC", 0)
+
+
+class CopyStats:
+  """Running totals of a copy."""
+
+  def __init__(self, total_bytes=0):
+    self.files = 0
+    self.bytes = 0
+    self.total_bytes = total_bytes
+    self.errors = []
+    # (path, error) of what a move across file systems couldn't delete
+    # from the source once it was copied
+    self.left_behind = []
+    self.started = time.perf_counter()
+    self._lock = threading.Lock()
+
+  def add_bytes(self, amount):
+    # Called from every copying thread
+    with self._lock:
+      self.bytes += amount
+
+  def elapsed(self):
+    return time.perf_counter() - self.started
+
+  def bytes_per_second(self):
+    elapsed = self.elapsed()
+    return self.bytes / elapsed if elapsed > 0 else 0.0
+
+
+def _copy_file_range(fd_in, fd_out, count):
+  return os.copy_file_range(fd_in, fd_out, count)
+
+
+def _sendfile(fd_in, fd_out, count):
+  return os.sendfile(fd_out, fd_in, None, count)
+
+
+def _kernel_methods():
+  methods = []
+  if hasattr(os, "copy_file_range"):
+    methods.append(_copy_file_range)
+  # Only Linux can sendfile() into a regular file
+  if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+    methods.append(_sendfile)
+  return methods
+
+
+def copy_data(fd_in, fd_out, cancel=None, on_bytes=None):
+  """
+  Copy everything from fd_in's position to fd_out
+
+  Tries copy_file_range (which lets the file system share or
+  server-side copy blocks), then sendfile, then a plain read/write loop
+  with one reused buffer. A method is only abandoned if it fails before
+  copying anything.
+
+  Args:
+      cancel (callable): Called between chunks, raises to stop
+      on_bytes (callable): Called with the byte count of every chunk
+
+  Returns:
+      Number of bytes copied
+  """
+  copied = 0
+  # Files reporting size 0 (e.g. in /proc) may still have content the
+  # kernel paths would see as end of file
+  if os.fstat(fd_in).st_size > 0:
+    for method in _kernel_methods():
+      try:
+        while True:
+          if cancel is not None:
+            cancel()
+          sent = method(fd_in, fd_out, KERNEL_CHUNK)
+          if sent == 0:
+            return copied
+          copied += sent
+          if on_bytes is not None:
+            on_bytes(sent)
+      except OSError as e:
+        if copied or e.errno not in _UNSUPPORTED:
+          raise
+
+  buffer = bytearray(BUFFER_SIZE)
+  view = memoryview(buffer)
+  with open(fd_in, "rb", buffering=0, closefd=False) as source:
+    while True:
+      if cancel is not None:
+        cancel()
+      read = source.readinto(buffer)
+      if not read:
+        return copied
+      written = 0
+      while written < read:
+        written += os.write(fd_out, view[written:read])
+      copied += read
+      if on_bytes is not None:
+        on_bytes(read)
+
+
+def _temp_file(destination, mode=0o600):
+  """
+  Create a hidden temporary file next to destination, so a rename can replace it
+
+  The kernel applies the umask to mode, as for any new file; reading the
+  umask would mean setting it, for every thread of the process at once.
+  """
+  directory, name = os.path.split(os.fspath(destination))
+  while True:
+    temp_path = os.path.join(directory or ".", f".{name}.{secrets.token_hex(4)}.tmp")
+    try:
+      return os.open(temp_path, _TEMP_FLAGS, mode), temp_path
+    except FileExistsError:
+      continue
+
+
+def _existing_mode(destination):
+  """Permissions of the file about to be replaced, None for a new one."""
+  try:
+    return os.stat(destination).st_mode
+  except OSError:
+    return None
+
+
+def _temp_file_for(destination):
+  """
+  A temporary file to replace destination with, and the mode to give it
+
+  One replacing a file stays private until it gets that file's mode; a
+  new file has the default permissions right away.
+  """
+  mode = _existing_mode(destination)
+  fd, temp_path = _temp_file(destination, 0o600 if mode is not None else 0o666)
+  return fd, temp_path, mode
+
+
+def _commit(temp_path, destination, mode=None, times=None):
+  if mode is not None:
+    os.chmod(temp_path, stat.S_IMODE(mode))
+  if times is not None:
+    os.utime(temp_path, ns=times)
+  os.replace(temp_path, destination)
+
+
+def _discard(temp_path):
+  try:
+    os.remove(temp_path)
+  except OSError:
+    pass
+
+
+def atomic_write(destination, chunks):
+  """
+  Replace destination with the given bytes chunks, all or nothing
+
+  The data goes to a temporary file in the same directory which is then
+  renamed over destination, so readers see the old or the new file and
+  never a half-written one.
+  """
+  fd, temp_path, mode = _temp_file_for(destination)
+  try:
+    with open(fd, "wb") as f:
+      for chunk in chunks:
+        f.write(chunk)
+    _commit(temp_path, destination, mode)
+  except BaseException:
+    _discard(temp_path)
+    raise
+
+
+def concatenate(sources, destination, append=False, cancel=None, on_bytes=None):
+  """
+  Write the sources one after another to destination (cat a b > c)
+
+  Overwriting is atomic, like atomic_write. Appending (cat a b >> c)
+  adds to the existing file in place, as a shell does; copying the whole
+  file for every append would make logs quadratic to grow.
+  """
+  if append:
+    fd = os.open(destination, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o666)
+    try:
+      for source in sources:
+        with open(source, "rb") as f:
+          copy_data(f.fileno(), fd, cancel, on_bytes)
+    finally:
+      os.close(fd)
+    return
+
+  fd, temp_path, mode = _temp_file_for(destination)
+  try:
+    try:
+      for source in sources:
+        with open(source, "rb") as f:
+          copy_data(f.fileno(), fd, cancel, on_bytes)
+    finally:
+      os.close(fd)
+    _commit(temp_path, destination, mode)
+  except BaseException:
+    _discard(temp_path)
+    raise
+
+
+def copy_file(source, destination, cancel=None, on_bytes=None, atomic=True):
+  """
+  Copy one file with its permission bits and modification time
+
+  Atomic unless told otherwise (copy_tree writes into a directory nobody
+  can see yet and skips the extra rename per file).
+  """
+  with open(source, "rb") as f:
+    info = os.fstat(f.fileno())
+    if atomic:
+      fd, temp_path = _temp_file(destination)
+    else:
+      temp_path = destination
+      fd = os.open(destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+      try:
+        copy_data(f.fileno(), fd, cancel, on_bytes)
+      finally:
+        os.close(fd)
+      _commit(temp_path, destination, info.st_mode, (info.st_atime_ns, info.st_mtime_ns))
+    except BaseException:
+      _discard(temp_path)
+      raise
+
+
+def tree_size(path, cancel=None):
+  """Total size of the regular files below path, for progress reports."""
+  total = 0
+  stack = [os.fspath(path)]
+  while stack:
+    if cancel is not None:
+      cancel()
+    try:
+      with os.scandir(stack.pop()) as it:
+        for entry in it:
+          try:
+            if entry.is_dir(follow_symlinks=False):
+              stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+              total += entry.stat(follow_symlinks=False).st_size
+          except OSError:
+            pass
+    except OSError:
+      pass
+  return total
+
+
+def copy_tree(source, destination, cancel=None, progress=None, workers=COPY_WORKERS):
+  """
+  Copy a directory tree, files in parallel
+
+  The copy is built in a hidden directory next to destination and
+  renamed into place at the end, so destination only ever appears
+  complete. Directories are created while walking, files are copied on
+  a thread pool (the kernel copy paths release the GIL) and symbolic
+  links are recreated, not followed.
+
+  Returns:
+      CopyStats; a copy with errors is still renamed into place
+  """
+  source = os.fspath(source)
+  destination = os.fspath(destination)
+  stats = CopyStats(tree_size(source, cancel))
+  parent, name = os.path.split(destination)
+  staging = tempfile.mkdtemp(prefix=f".{name}.", suffix=".tmp", dir=parent or ".")
+
+  done = queue.SimpleQueue()
+  pending = set()
+
+  def copy_one(source_path, target_path):
+    copy_file(source_path, target_path, cancel, stats.add_bytes, atomic=False)
+
+  try:
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copy") as pool:
+      try:
+        last_report = time.perf_counter()
+        directories = [(source, staging)]
+        while directories or pending:
+          if directories:
+            source_dir, target_dir = directories.pop()
+            try:
+              with os.scandir(source_dir) as it:
+                entries = list(it)
+            except OSError as e:
+              stats.errors.append((source_dir, e))
+              entries = []
+            for entry in entries:
+              target = os.path.join(target_dir, entry.name)
+              try:
+                if entry.is_symlink():
+                  os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                  os.mkdir(target)
+                  directories.append((entry.path, target))
+                else:
+                  future = pool.submit(copy_one, entry.path, target)
+                  pending.add(future)
+                  future.add_done_callback(lambda future, path=entry.path: done.put((path, future)))
+              except OSError as e:
+                stats.errors.append((entry.path, e))
+
+          # Collect what finished; block only when there is nothing left to walk
+          while pending:
+            try:
+              path, future = done.get(block=not directories, timeout=0.1)
+            except queue.Empty:
+              break
+            pending.discard(future)
+            error = future.exception()
+            if error is None:
+              stats.files += 1
+            elif isinstance(error, OSError):
+              stats.errors.append((path, error))
+            else:
+              raise error
+          if cancel is not None:
+            cancel()
+          if progress is not None and time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+            last_report = time.perf_counter()
+            progress(stats)
+      except BaseException:
+        for future in pending:
+          future.cancel()
+        raise
+    info = os.stat(source)
+    os.chmod(staging, stat.S_IMODE(info.st_mode))
+    os.rename(staging, destination)
+  except BaseException:
+    from src.tree_remover import remove_tree
+    remove_tree(staging)
+    raise
+  return stats
+
+
+def move(source, destination, cancel=None, progress=None):
+  """
+  Move a file or directory
+
+  A rename when both are on the same file system (atomic and instant),
+  otherwise a copy followed by deleting the source.
+
+  Returns:
+      CopyStats of the copy, or None when it was a rename; what couldn't
+      be deleted from the source afterwards is in its left_behind
+  """
+  try:
+    os.rename(source, destination)
+    return None
+  except OSError as e:
+    if e.errno != errno.EXDEV:
+      raise
+
+  if os.path.isdir(source) and not os.path.islink(source):
+    stats = copy_tree(source, destination, cancel, progress)
+    if stats.errors:
+      # Keep the source, the copy is incomplete
+      return stats
+    from src.tree_remover import remove_tree
+    stats.left_behind = remove_tree(source, cancel).errors
+    return stats
+
+  stats = CopyStats(os.lstat(source).st_size)
+  if os.path.islink(source):
+    os.symlink(os.readlink(source), destination)
+  else:
+    copy_file(source, destination, cancel, stats.add_bytes)
+  stats.files = 1
+  try:
+    os.remove(source)
+  except OSError as e:
+    stats.left_behind.append((source, e))
+  return stats
@@ -0,0 +1,235 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import sys
+import time
+from src.file_reader import CHUNK_SIZE, MAX_LINE_BYTES, _decode
+
+# Seconds between two checks of the file when inotify isn't available,
+# and the longest inotify wait, in case an event was missed (NFS, ...)
+POLL_INTERVAL = 0.5
+
+# Seconds between two batches of followed lines; a log written line by
+# line still reaches the screen in at most 10 updates per second
+BATCH_INTERVAL = 0.1
+
+# Bytes read per wake-up before the lines so far are handed on
+MAX_BATCH_BYTES = 4 * 1024 * 1024
+
+# Seconds the wait for a change is cut into, so Ctrl+C is seen quickly
+CANCEL_CHECK_INTERVAL = 0.1
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+# Watched on the file (appends, truncation, rotation) and on its directory
+# (a new file under the name)
+FILE_EVENTS = IN_MODIFY | IN_ATTRIB | IN_MOVE_SELF | IN_DELETE_SELF
+DIRECTORY_EVENTS = IN_CREATE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE
+
+
+class Inotify:
+  """
+  Wakes a follower up when a file or its directory changes (Linux only)
+
+  Called through ctypes, there's no inotify module in the standard
+  library. The events themselves aren't parsed: any event means "look
+  at the file again", which is all following needs.
+  """
+
+  def __init__(self, path):
+    self.libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    self.path = path
+    self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if self.fd < 0:
+      raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+    try:
+      self.file_watch = self.add_watch(path, FILE_EVENTS)
+      self.add_watch(os.path.dirname(path) or ".", DIRECTORY_EVENTS)
+    except BaseException:
+      os.close(self.fd)
+      raise
+
+  def add_watch(self, target, mask):
+    watch = self.libc.inotify_add_watch(self.fd, os.fsencode(target), mask)
+    if watch < 0:
+      raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {target}")
+    return watch
+
+  def watch_file(self):
+    """
+    Watch the file now under the name, after a rotation
+
+    A watch follows the inode, not the name, so the old one would only
+    report the rotated away file.
+    """
+    self.libc.inotify_rm_watch(self.fd, self.file_watch)
+    try:
+      self.file_watch = self.add_watch(self.path, FILE_EVENTS)
+    except OSError:
+      # Gone again already; the directory watch and POLL_INTERVAL remain
+      pass
+
+  def wait(self, timeout):
+    """Return True if something changed within timeout seconds."""
+    readable, _, _ = select.select([self.fd], [], [], timeout)
+    if not readable:
+      return False
+    # Drain the queued events
+    try:
+      while os.read(self.fd, 65536):
+        pass
+    except BlockingIOError:
+      pass
+    return True
+
+  def close(self):
+    os.close(self.fd)
+
+
+class Poller:
+  """Stand-in for Inotify where there's none: every wait times out, the file is stat()ed."""
+
+  def wait(self, timeout):
+    time.sleep(timeout)
+    return False
+
+  def watch_file(self):
+    pass
+
+  def close(self):
+    pass
+
+
+def watcher_for(path):
+  if sys.platform.startswith("linux"):
+    try:
+      return Inotify(path)
+    except (OSError, AttributeError):
+      # No inotify (old kernel, out of watches), fall back to polling
+      pass
+  return Poller()
+
+
+def follow(path, offset, cancel=None, notices=None):
+  """
+  Yield lists of lines appended to a file, forever (tail -f)
+
+  Starts at byte offset and only ever reads what was added since. A file
+  that shrinks was truncated and is read again from its start; when the
+  name comes to point at a new file (log rotation) the rest of the old
+  one is read, then the new one from its start. Waiting is done by
+  inotify where available, by stat() polling otherwise, in slices short
+  enough for cancel to be called regularly.
+
+  Args:
+      cancel (callable): Called while waiting, raises to stop
+      notices (callable): Called with a message on truncation and rotation
+  """
+  path = os.fspath(path)
+  watcher = watcher_for(path)
+  f = open(path, "rb")
+  try:
+    f.seek(offset)
+    pending = b""
+    last_batch = 0.0
+    while True:
+      if cancel is not None:
+        cancel()
+      # Rate limit: hand on at most one batch per BATCH_INTERVAL
+      pause = last_batch + BATCH_INTERVAL - time.monotonic()
+      if pause > 0:
+        time.sleep(pause)
+
+      lines, pending = read_lines(f, pending)
+      if lines:
+        last_batch = time.monotonic()
+        yield lines
+        continue
+
+      replaced, truncated = check_file(path, f)
+      if truncated:
+        if notices is not None:
+          notices(f"tail: '{os.path.basename(path)}' was truncated")
+        f.seek(0)
+        pending = b""
+        continue
+      if replaced:
+        # Everything of the old file has been read by now
+        if pending:
+          yield [_decode(pending)]
+          pending = b""
+        f.close()
+        f = open(path, "rb")
+        watcher.watch_file()
+        if notices is not None:
+          notices(f"tail: '{os.path.basename(path)}' was replaced, following the new file")
+        continue
+
+      # Nothing new: sleep until inotify says something changed, or for
+      # POLL_INTERVAL, checking for cancel in between
+      waited = 0.0
+      while waited < POLL_INTERVAL:
+        if cancel is not None:
+          cancel()
+        if watcher.wait(CANCEL_CHECK_INTERVAL):
+          break
+        waited += CANCEL_CHECK_INTERVAL
+  finally:
+    f.close()
+    watcher.close()
+
+
+def read_lines(f, pending):
+  """
+  Read what's been appended, up to MAX_BATCH_BYTES
+
+  Returns:
+      (lines, pending) - the complete lines, and the start of an
+      unfinished last line to prepend next time
+  """
+  lines = []
+  read = 0
+  while read < MAX_BATCH_BYTES:
+    chunk = f.read(CHUNK_SIZE)
+    if not chunk:
+      break
+    read += len(chunk)
+    parts = (pending + chunk).split(b"\n")
+    pending = parts.pop()
+    lines.extend(_decode(raw) for raw in parts)
+    # A writer that never sends a newline mustn't be buffered whole
+    if len(pending) > MAX_LINE_BYTES:
+      lines.append(_decode(pending))
+      pending = b""
+  return lines, pending
+
+
+def check_file(path, f):
+  """
+  Returns:
+      (replaced, truncated) - whether path is now another file (rotated,
+      or deleted and created again), and whether the open one shrank
+  """
+  opened = os.fstat(f.fileno())
+  try:
+    current = os.stat(path)
+  except OSError as e:
+    if e.errno != errno.ENOENT:
+      raise
+    # Renamed away and not created again yet: keep reading the old one
+    return False, opened.st_size < f.tell()
+  if (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+    return True, False
+  return False, opened.st_size < f.tell()
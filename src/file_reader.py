@@ -0,0 +1,111 @@
+import mmap
+import os
+
+# Bytes read from disk per step. Together with the page size this is
+# what bounds memory, whatever the size of the file.
+CHUNK_SIZE = 64 * 1024
+
+# Longest run of bytes without a newline that is kept as a single line
+MAX_LINE_BYTES = 1024 * 1024
+
+# Lines rendered by a plain "read" before it pauses for paging
+PAGE_LINES = 1000
+
+
+class ReadPager:
+  """Remembers where a paged read stopped so 'more' can continue it."""
+
+  def __init__(self, path, offset, line_number):
+    self.path = path
+    self.offset = offset
+    self.line_number = line_number
+
+
+def iter_lines(path, offset=0, skip=0, cancel=None):
+  """
+  Lazily yield (line, end_offset) pairs from a file
+
+  The file is read in CHUNK_SIZE pieces and each line is decoded as soon
+  as its newline arrives, so only one chunk plus the current line is ever
+  held in memory. Newlines never occur inside a UTF-8 sequence, which
+  keeps the byte offsets exact for resuming.
+
+  Args:
+      path (Path): File to read
+      offset (int): Byte offset to start at (must be a line start)
+      skip (int): Number of lines to skip before yielding
+      cancel (callable): Called between chunks, may raise to abort
+  """
+  with open(path, 'rb') as f:
+    f.seek(offset)
+    position = offset
+
+    # Skipping only needs newline counts, so don't decode those bytes
+    while skip > 0:
+      if cancel:
+        cancel()
+      chunk = f.read(CHUNK_SIZE)
+      if not chunk:
+        return
+      newlines = chunk.count(b'\n')
+      if newlines < skip:
+        skip -= newlines
+        position += len(chunk)
+        continue
+      index = -1
+      for _ in range(skip):
+        index = chunk.index(b'\n', index + 1)
+      position += index + 1
+      f.seek(position)
+      skip = 0
+
+    pending = b""
+    while True:
+      if cancel:
+        cancel()
+      chunk = f.read(CHUNK_SIZE)
+      if not chunk:
+        break
+      lines = (pending + chunk).split(b'\n')
+      pending = lines.pop()
+      for raw in lines:
+        position += len(raw) + 1
+        yield _decode(raw), position
+      # A file without newlines must not be buffered whole
+      if len(pending) > MAX_LINE_BYTES:
+        position += len(pending)
+        yield _decode(pending), position
+        pending = b""
+
+    if pending:
+      position += len(pending)
+      yield _decode(pending), position
+
+
+def _decode(raw):
+  return raw.decode('utf-8', errors='replace').rstrip('\r')
+
+
+def tail_offset(path, count):
+  """
+  Return the byte offset where the last `count` lines of a file begin
+
+  The file is memory-mapped and scanned backwards for newlines, so only
+  the pages holding the tail are actually touched.
+  """
+  size = os.path.getsize(path)
+  if size == 0 or count <= 0:
+    return size
+
+  with open(path, 'rb') as f:
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+      end = size
+      # A trailing newline terminates the last line, it doesn't start a new one
+      if mapped[end - 1:end] == b'\n':
+        end -= 1
+      for _ in range(count):
+        index = mapped.rfind(b'\n', 0, end)
+        if index == -1:
+          return 0
+        end = index
+      return end + 1
@@ -0,0 +1,102 @@
+from PyQt6.QtWidgets import QFrame, QHBoxLayout, QLabel, QLineEdit, QToolButton
+from PyQt6.QtCore import Qt, pyqtSignal
+
+
+class FindBar(QFrame):
+  """
+  The Ctrl+F bar floating over the top right of a terminal
+
+  Only collects the query and options and shows the result; the terminal
+  does the searching. Enter / Shift+Enter go to the next / previous
+  match, Escape closes the bar.
+  """
+
+  # The query or an option changed
+  searchChanged = pyqtSignal()
+  # True to go to the previous match
+  stepped = pyqtSignal(bool)
+  closed = pyqtSignal()
+
+  def __init__(self, parent=None):
+    super().__init__(parent)
+    self.setObjectName("findBar")
+
+    self.query = QLineEdit()
+    self.query.setPlaceholderText("Find in output")
+    self.query.setMinimumWidth(220)
+    self.query.textChanged.connect(self.searchChanged)
+    self.query.installEventFilter(self)
+
+    self.case_button = self.toggle_button("Aa", "Match case")
+    self.regex_button = self.toggle_button(".*", "Regular expression")
+
+    self.count_label = QLabel("")
+    self.count_label.setMinimumWidth(90)
+
+    layout = QHBoxLayout(self)
+    layout.setContentsMargins(6, 4, 6, 4)
+    layout.setSpacing(4)
+    layout.addWidget(self.query)
+    layout.addWidget(self.case_button)
+    layout.addWidget(self.regex_button)
+    layout.addWidget(self.count_label)
+    for text, tip, handler in (("↑", "Previous match (Shift+Enter)", lambda: self.stepped.emit(True)),
+                               ("↓", "Next match (Enter)", lambda: self.stepped.emit(False)),
+                               ("×", "Close (Escape)", self.close_bar)):
+      button = QToolButton()
+      button.setText(text)
+      button.setToolTip(tip)
+      button.clicked.connect(handler)
+      layout.addWidget(button)
+    self.hide()
+
+  def toggle_button(self, text, tip):
+    button = QToolButton()
+    button.setText(text)
+    button.setToolTip(tip)
+    button.setCheckable(True)
+    button.toggled.connect(self.searchChanged)
+    return button
+
+  def text(self):
+    return self.query.text()
+
+  def regex(self):
+    return self.regex_button.isChecked()
+
+  def case_sensitive(self):
+    return self.case_button.isChecked()
+
+  def open_bar(self):
+    self.show()
+    self.raise_()
+    self.query.setFocus()
+    self.query.selectAll()
+
+  def close_bar(self):
+    self.hide()
+    self.closed.emit()
+
+  def show_count(self, current, total, capped=False, error=None):
+    if error is not None:
+      self.count_label.setText("Invalid pattern")
+      self.count_label.setToolTip(error)
+      return
+    self.count_label.setToolTip("")
+    if not self.query.text():
+      self.count_label.setText("")
+    elif total == 0:
+      self.count_label.setText("No results")
+    else:
+      shown = f"{total}+" if capped else str(total)
+      self.count_label.setText(f"{current + 1} of {shown}" if current is not None else shown)
+
+  def eventFilter(self, watched, event):
+    if watched is self.query and event.type() == event.Type.KeyPress:
+      if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+        self.stepped.emit(bool(event.modifiers() & Qt.KeyboardModifier.ShiftModifier))
+        return True
+      if event.key() == Qt.Key.Key_Escape:
+        self.close_bar()
+        return True
+    return super().eventFilter(watched, event)
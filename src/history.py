@@ -0,0 +1,205 @@
+import os
+import re
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+HISTORY_FILE = Path.home() / ".team_d_terminal_history"
+
+# Distinct commands kept, on disk and in memory
+MAX_HISTORY_ENTRIES = 200000
+
+# Commands per search segment (see CommandHistory)
+SEGMENT_SIZE = 4096
+
+# Never typed at the prompt, so it can separate commands in a segment
+SEPARATOR = "\0"
+
+
+def _escape(command):
+  return command.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+# A backslash and the character it escapes, in a line of the log
+_ESCAPED = re.compile(r"\\(.)")
+
+
+def _unescape(line):
+  # In one pass, so an escaped backslash followed by "n" stays a backslash and an n
+  if "\\" not in line:
+    return line
+  return _ESCAPED.sub(lambda m: "\n" if m.group(1) == "n" else m.group(1), line)
+
+
+class CommandHistory:
+  """
+  Persistent, deduplicated command history with a search index
+
+  Commands are appended to a plain text log, one per line, so recording
+  one never rewrites the file. The log is only read the first time the
+  history is used, and compacted then if duplicates made it grow well
+  past the number of distinct commands.
+
+  Entries are kept in a list where re-run commands leave a None behind
+  (their old slot) and move to the end. For searching, entries are also
+  joined into NUL-separated text segments of SEGMENT_SIZE commands with
+  a table of where each command starts. A substring or prefix search is
+  then a str.rfind()/find() over a few large strings, which runs in C,
+  and a bisect on the table turns a hit back into an entry.
+  """
+
+  def __init__(self, path=HISTORY_FILE, max_entries=MAX_HISTORY_ENTRIES):
+    self.path = Path(path)
+    self.max_entries = max_entries
+    self._entries = None
+    self._positions = {}
+    self._segments = {}
+    self._live = 0
+
+  def __len__(self):
+    self._ensure_loaded()
+    return self._live
+
+  # RECORDING
+  def append(self, command):
+    """Record a command, moving it to the end if it was already known."""
+    self._ensure_loaded()
+    if self._positions.get(command) == len(self._entries) - 1:
+      return
+    self._add(command)
+    try:
+      with open(self.path, "a", encoding="utf-8") as f:
+        f.write(_escape(command) + "\n")
+    except OSError:
+      # History is a convenience, a read-only home mustn't break commands
+      pass
+    if len(self._entries) > self.max_entries * 3 // 2:
+      self._compact()
+
+  def _add(self, command):
+    old = self._positions.get(command)
+    if old is not None:
+      self._entries[old] = None
+      self._live -= 1
+    entry_id = len(self._entries)
+    self._entries.append(command)
+    self._positions[command] = entry_id
+    self._live += 1
+
+  # SEARCHING
+  def search(self, text, before=None):
+    """
+    Find the newest command containing text
+
+    Args:
+        text (str): Substring to look for
+        before (int): Only consider entries older than this id (None = all)
+
+    Returns:
+        (entry_id, command) or None
+    """
+    return self._find_backwards(text, before)
+
+  def previous(self, prefix, before=None):
+    """Find the newest command older than `before` starting with prefix."""
+    return self._find_backwards(SEPARATOR + prefix, before)
+
+  def next(self, prefix, after):
+    """Find the oldest command newer than `after` starting with prefix (None = nothing is newer)."""
+    if after is None:
+      return None
+    self._ensure_loaded()
+    needle = SEPARATOR + prefix
+    for first_id, text, offsets in self._iter_segments(after + 1, -1):
+      start = offsets[max(after + 1 - first_id, 0)]
+      while True:
+        position = text.find(needle, start)
+        if position == -1:
+          break
+        entry_id = first_id + bisect_right(offsets, position) - 1
+        if self._entries[entry_id] is not None:
+          return entry_id, self._entries[entry_id]
+        start = offsets[entry_id - first_id + 1]
+    return None
+
+  def _find_backwards(self, needle, before):
+    self._ensure_loaded()
+    if before is None:
+      before = len(self._entries)
+    for first_id, text, offsets in self._iter_segments(before - 1, 1):
+      end = offsets[min(before - first_id, len(offsets) - 1)]
+      while True:
+        position = text.rfind(needle, 0, end)
+        if position == -1:
+          break
+        entry_id = first_id + bisect_right(offsets, position) - 1
+        if self._entries[entry_id] is not None:
+          return entry_id, self._entries[entry_id]
+        # The hit was a command that has been re-run since, skip it
+        end = offsets[entry_id - first_id]
+    return None
+
+  def _iter_segments(self, entry_id, direction):
+    """
+    Yield (first_id, text, offsets) segments starting at the one holding
+    entry_id, going towards older (direction 1) or newer (-1) entries.
+
+    offsets[i] is where entry first_id + i starts in text; one extra
+    offset marks the end of the text.
+    """
+    count = (len(self._entries) + SEGMENT_SIZE - 1) // SEGMENT_SIZE
+    number = min(max(entry_id, 0) // SEGMENT_SIZE, count - 1)
+    while 0 <= number < count:
+      yield self._segment(number)
+      number -= direction
+
+  def _segment(self, number):
+    first_id = number * SEGMENT_SIZE
+    commands = self._entries[first_id:first_id + SEGMENT_SIZE]
+    # Full segments never change; the last one is rebuilt when it grew
+    segment = self._segments.get(number)
+    if segment is not None and len(segment[2]) == len(commands) + 1:
+      return segment
+    text = "".join(SEPARATOR + (command or "") for command in commands)
+    offsets = array("I", [0])
+    for command in commands:
+      offsets.append(offsets[-1] + len(SEPARATOR) + len(command or ""))
+    segment = (first_id, text, offsets)
+    self._segments[number] = segment
+    return segment
+
+  # LOADING
+  def _ensure_loaded(self):
+    if self._entries is not None:
+      return
+    self._entries = []
+    lines = 0
+    try:
+      with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+          lines += 1
+          self._add(_unescape(line.rstrip("\n")))
+    except OSError:
+      return
+    if self._live > self.max_entries or lines > 2 * self._live + 1000:
+      self._compact()
+
+  def _compact(self):
+    """Drop duplicates and the oldest entries, in memory and on disk."""
+    commands = [command for command in self._entries if command is not None][-self.max_entries:]
+    self._entries = []
+    self._positions = {}
+    self._segments = {}
+    self._live = 0
+    for command in commands:
+      self._add(command)
+
+    # Write the new log next to the old one and swap them atomically
+    temp_path = self.path.with_name(self.path.name + ".tmp")
+    try:
+      with open(temp_path, "w", encoding="utf-8") as f:
+        for command in commands:
+          f.write(_escape(command) + "\n")
+      os.replace(temp_path, self.path)
+    except OSError:
+      pass
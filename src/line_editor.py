@@ -0,0 +1,128 @@
+class LineEditor:
+  """
+  The command being typed: its text and cursor, apart from the document
+
+  Every edit works on this buffer only, so a keystroke or a recalled
+  command costs the length of the command, however much output the
+  terminal holds. The view then redraws the input after the prompt.
+
+  The text may span several lines (Shift+Enter). Home / End and Up / Down
+  move within the current line and between lines; the view only recalls
+  history when the cursor is already on the first / last line.
+  """
+
+  def __init__(self):
+    self.text = ""
+    # Index in text the next character is inserted at
+    self.cursor = 0
+
+  def __len__(self):
+    return len(self.text)
+
+  def set_text(self, text):
+    """Replace the whole input, cursor at the end (history recall, completion)."""
+    self.text = text
+    self.cursor = len(text)
+
+  def clear(self):
+    self.set_text("")
+
+  # EDITING
+  def insert(self, text):
+    self.text = self.text[:self.cursor] + text + self.text[self.cursor:]
+    self.cursor += len(text)
+
+  def backspace(self):
+    if self.cursor > 0:
+      self.text = self.text[:self.cursor - 1] + self.text[self.cursor:]
+      self.cursor -= 1
+
+  def delete(self):
+    self.text = self.text[:self.cursor] + self.text[self.cursor + 1:]
+
+  def delete_word_before(self):
+    start = self.word_start()
+    self.text = self.text[:start] + self.text[self.cursor:]
+    self.cursor = start
+
+  def delete_word_after(self):
+    self.text = self.text[:self.cursor] + self.text[self.word_end():]
+
+  def delete_to_line_start(self):
+    start = self.line_start()
+    self.text = self.text[:start] + self.text[self.cursor:]
+    self.cursor = start
+
+  def delete_to_line_end(self):
+    self.text = self.text[:self.cursor] + self.text[self.line_end():]
+
+  # CURSOR MOTIONS
+  def move_left(self):
+    self.cursor = max(self.cursor - 1, 0)
+
+  def move_right(self):
+    self.cursor = min(self.cursor + 1, len(self.text))
+
+  def move_word_left(self):
+    self.cursor = self.word_start()
+
+  def move_word_right(self):
+    self.cursor = self.word_end()
+
+  def move_home(self):
+    self.cursor = self.line_start()
+
+  def move_end(self):
+    self.cursor = self.line_end()
+
+  def move_up(self):
+    """Move to the line above, same column where it's long enough; False on the first line."""
+    start = self.line_start()
+    if start == 0:
+      return False
+    above = self.text.rfind("\n", 0, start - 1) + 1
+    self.cursor = min(above + self.cursor - start, start - 1)
+    return True
+
+  def move_down(self):
+    """Move to the line below, same column where it's long enough; False on the last line."""
+    end = self.line_end()
+    if end == len(self.text):
+      return False
+    below = end + 1
+    below_end = self.text.find("\n", below)
+    if below_end == -1:
+      below_end = len(self.text)
+    self.cursor = min(below + self.cursor - self.line_start(), below_end)
+    return True
+
+  # POSITIONS
+  def line_start(self):
+    return self.text.rfind("\n", 0, self.cursor) + 1
+
+  def line_end(self):
+    end = self.text.find("\n", self.cursor)
+    return len(self.text) if end == -1 else end
+
+  def word_start(self):
+    """Start of the word before the cursor, skipping the separators in between."""
+    position = self.cursor
+    while position > 0 and not is_word_character(self.text[position - 1]):
+      position -= 1
+    while position > 0 and is_word_character(self.text[position - 1]):
+      position -= 1
+    return position
+
+  def word_end(self):
+    """End of the word after the cursor, skipping the separators in between."""
+    position = self.cursor
+    while position < len(self.text) and not is_word_character(self.text[position]):
+      position += 1
+    while position < len(self.text) and is_word_character(self.text[position]):
+      position += 1
+    return position
+
+
+def is_word_character(char):
+  # Like readline: "/", "." and "-" split a path into words
+  return char.isalnum() or char == "_"
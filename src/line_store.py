@@ -0,0 +1,108 @@
+import re
+from array import array
+from itertools import accumulate, count
+from operator import add
+
+# Where QTextDocument also breaks a line: a bare CR and the Unicode line
+# and paragraph separators
+LINE_BREAKS = re.compile("\r\n?|[\u2028\u2029]")
+
+
+def normalize_line_breaks(text):
+  """Turn every line break into a newline, the only one LineStore splits at."""
+  return LINE_BREAKS.sub("\n", text)
+
+
+class LineStore:
+  """
+  Lines of output kept as UTF-8 bytes in one buffer
+
+  A Python string per line would cost ~50 bytes of object overhead each;
+  here a line costs its bytes plus one 8-byte offset in `starts`, so ten
+  million lines of output take a predictable amount of memory. Lines are
+  decoded only when asked for, which the view does for the few it shows.
+
+  Offsets are absolute positions in everything ever appended; `base` is
+  the position of data[0], so dropping the oldest lines is a memmove of
+  both arrays and no offset has to be rewritten.
+  """
+
+  def __init__(self):
+    self.data = bytearray()
+    # starts[i] is where line i begins; the last line runs to the end of data
+    self.starts = array('Q', [0])
+    self.base = 0
+    # Bytes in the longest line, for the horizontal scrollbar
+    self.longest = 0
+    self.characters = 0
+
+  def __len__(self):
+    return len(self.starts)
+
+  def is_empty(self):
+    return not self.data
+
+  def append(self, text):
+    """Append text as-is; a text without a trailing newline leaves the last line open."""
+    if not text:
+      return
+    encoded = text.encode("utf-8", "replace")
+    end = self.base + len(self.data)
+    open_line = end - self.starts[-1]
+    self.data += encoded
+    self.characters += len(text)
+
+    parts = encoded.split(b"\n")
+    lengths = list(map(len, parts))
+    if len(parts) > 1:
+      # Line k starts after the first k parts and their k newlines; all of
+      # it runs in C, which matters when a batch holds 100k lines
+      self.starts.extend(map(add, accumulate(lengths[:-1]), count(end + 1)))
+    self.longest = max(self.longest, open_line + lengths[0], max(lengths))
+
+  def replace_last(self, text):
+    """Replace the open last line, e.g. with the command typed after a prompt."""
+    begin = self.starts[-1] - self.base
+    removed = self.data[begin:].decode("utf-8", "replace")
+    del self.data[begin:]
+    self.characters -= len(removed)
+    self.append(text)
+
+  def _span(self, start, stop):
+    """Byte range in data of lines start to stop (exclusive), without the last newline."""
+    begin = self.starts[start] - self.base
+    if stop < len(self.starts):
+      return begin, self.starts[stop] - self.base - 1
+    return begin, len(self.data)
+
+  def line(self, index):
+    begin, end = self._span(index, index + 1)
+    return self.data[begin:end].decode("utf-8", "replace")
+
+  def lines(self, start, stop):
+    """Return lines start to stop (exclusive) as strings, decoded in one go."""
+    stop = min(stop, len(self.starts))
+    if start >= stop:
+      return []
+    begin, end = self._span(start, stop)
+    return self.data[begin:end].decode("utf-8", "replace").split("\n")
+
+  def drop(self, amount):
+    """Remove the oldest lines and return them, e.g. for the scrollback archive."""
+    amount = min(amount, len(self.starts) - 1)
+    if amount <= 0:
+      return []
+    removed = self.lines(0, amount)
+    size = self.starts[amount] - self.base
+    del self.data[:size]
+    del self.starts[:amount]
+    self.base += size
+    self.characters -= sum(map(len, removed)) + amount
+    return removed
+
+  def clear(self):
+    self.data = bytearray()
+    self.starts = array('Q', [0])
+    self.base = 0
+    self.longest = 0
+    self.characters = 0
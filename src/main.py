@@ -1,18 +1,51 @@
 import sys
-from PyQt6.QtWidgets import QApplication
-from PyQt6.QtCore import Qt
-from src.main_window import MainWindow
+import time
+# When run as "python -m src.main"; index.py takes its own, earlier one
+_started = (time.perf_counter(), len(sys.modules))
+
+from src import startup
+
+def main(started=None):
+  """
+  Args:
+      started: (perf_counter(), number of modules loaded) at the very top
+          of the entry point, where --profile-startup starts counting
+  """
+  # Batch mode runs commands without a window, Qt is never imported
+  if "--batch" in sys.argv or "--stdin" in sys.argv:
+    from src.batch import main as run_batch
+    sys.exit(run_batch(sys.argv[1:]))
+
+  # Recorded phases are printed once the first prompt is shown
+  if "--profile-startup" in sys.argv:
+    sys.argv.remove("--profile-startup")
+    startup.enable(_started if started is None else started)
+    startup.mark("import src.main")
+
+  # Sessions show their output in the virtualized view, see VirtualTerminal
+  virtual_output = "--virtual-output" in sys.argv
+  if virtual_output:
+    sys.argv.remove("--virtual-output")
+
+  # Qt is imported here rather than at the top, so the flag above is
+  # handled (and the timing starts) before the heaviest import
+  from PyQt6.QtWidgets import QApplication
+  startup.mark("import PyQt6 widgets")
+  from src.main_window import MainWindow
+  startup.mark("import window and terminal")
 
-def main():
   app = QApplication(sys.argv)
   
   # Set application-wide style
   app.setStyle("Fusion")
+  startup.mark("create application")
   
-  window = MainWindow()
+  window = MainWindow(virtual_output=virtual_output)
+  startup.mark("create window")
   window.show()
+  startup.mark("show window")
   
   sys.exit(app.exec())
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
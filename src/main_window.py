@@ -1,11 +1,87 @@
-from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit
+from PyQt6.QtWidgets import QMainWindow, QWidget, QVBoxLayout, QLabel, QLineEdit, QTabWidget
 from PyQt6.QtGui import QKeySequence, QShortcut
 from src.terminal_widget import TerminalWidget
 import os
+from functools import partial
+
+# The whole window is styled by this one sheet, set once before the first
+# paint: every setStyleSheet() call has Qt parse a sheet and restyle the
+# widget and all its children again
+STYLESHEET = """
+    QMainWindow {
+        background-color: #252526;
+    }
+    QLabel#titleLabel {
+        color: #f0f0f0;
+        font-size: 16px;
+        font-weight: bold;
+        padding: 10px;
+    }
+    QLineEdit#currentDirectory, QPlainTextEdit, QAbstractScrollArea#outputView, QWidget#inputRow {
+        background-color: #1e1e1e;
+        color: #f0f0f0;
+        border: 1px solid #2d2d2d;
+        border-radius: 6px;
+        padding: 8px;
+    }
+    QLabel#promptLabel, QLineEdit#commandLine {
+        background-color: #1e1e1e;
+        color: #f0f0f0;
+        border: none;
+        padding: 0px;
+    }
+    QFrame#findBar {
+        background-color: #2d2d2d;
+        border: 1px solid #3c3c3c;
+        border-radius: 6px;
+    }
+    QFrame#findBar QLabel {
+        color: #9d9d9d;
+    }
+    QFrame#findBar QLineEdit {
+        background-color: #1e1e1e;
+        color: #f0f0f0;
+        border: 1px solid #3c3c3c;
+        border-radius: 4px;
+        padding: 2px 4px;
+    }
+    QFrame#findBar QToolButton {
+        background-color: transparent;
+        color: #f0f0f0;
+        border: none;
+        padding: 2px 6px;
+    }
+    QFrame#findBar QToolButton:checked {
+        background-color: #0e639c;
+        border-radius: 4px;
+    }
+    QTabWidget::pane {
+        border: none;
+    }
+    QTabBar::tab {
+        background-color: #2d2d2d;
+        color: #9d9d9d;
+        padding: 6px 14px;
+        margin-right: 2px;
+        border-top-left-radius: 6px;
+        border-top-right-radius: 6px;
+    }
+    QTabBar::tab:selected {
+        background-color: #1e1e1e;
+        color: #f0f0f0;
+    }
+"""
 
 class MainWindow(QMainWindow):
-  def __init__(self):
+  def __init__(self, virtual_output=False):
     super().__init__()
+    # Sessions are TerminalWidgets, or VirtualTerminals (output drawn a
+    # screenful at a time, for huge outputs) with --virtual-output
+    if virtual_output:
+      from src.virtual_terminal import VirtualTerminal
+      self.session_class = VirtualTerminal
+    else:
+      self.session_class = TerminalWidget
     self.setWindowTitle("Team D Awesome Terminal")
     self.setMinimumSize(800, 600)
     
@@ -16,59 +92,114 @@ class MainWindow(QMainWindow):
     layout.setContentsMargins(0, 0, 0, 0)
     
     # Create title bar
-    title_label = QLabel("Team D Terminal")
-    title_label.setStyleSheet("""
-        QLabel {
-            color: #f0f0f0;
-            font-size: 16px;
-            font-weight: bold;
-            padding: 10px;
-        }
-    """)
+    self.title_label = QLabel("Team D Terminal")
+    self.title_label.setObjectName("titleLabel")
     
     # Create current directory label
     self.current_dir_label = QLineEdit()
     self.current_dir_label.setReadOnly(True)
-    self.current_dir_label.setStyleSheet("""
-        QLineEdit {
-            background-color: #1e1e1e;
-            color: #f0f0f0;
-            border: 1px solid #2d2d2d;
-            border-radius: 6px;
-            padding: 8px;
-        }
-    """)
+    self.current_dir_label.setObjectName("currentDirectory")
     self.update_current_dir_label(os.path.expanduser("~"))
 
-    # Create terminal widget
-    self.terminal = TerminalWidget()
-    self.terminal.commandEntered.connect(self.handle_command)
+    # One tab per session, each with its own directory, history and
+    # worker pool; the tab bar only shows once there are two
+    self.tabs = QTabWidget()
+    self.tabs.setDocumentMode(True)
+    self.tabs.setTabsClosable(True)
+    self.tabs.setMovable(True)
+    self.tabs.setTabBarAutoHide(True)
+    self.tabs.tabCloseRequested.connect(lambda index: self.close_session(self.tabs.widget(index)))
+    self.tabs.currentChanged.connect(self.session_changed)
+    self.new_session()
     
     # Add widgets to layout
-    layout.addWidget(title_label)
-    layout.addWidget(self.terminal)
+    layout.addWidget(self.title_label)
+    layout.addWidget(self.tabs)
     
     # Set window styling
-    self.setStyleSheet("""
-        QMainWindow {
-            background-color: #252526;
-        }
-    """)
+    self.setStyleSheet(STYLESHEET)
     
     # Set up shortcuts
     QShortcut(QKeySequence("Ctrl+L"), self).activated.connect(self.clear_terminal)
-      
-  def handle_command(self, command):
-    if command.lower() == "clear" or command.lower() == "cls":
-      self.clear_terminal()
-    elif command.lower() == "exit":
+    QShortcut(QKeySequence("Ctrl+T"), self).activated.connect(self.new_session)
+    QShortcut(QKeySequence("Ctrl+W"), self).activated.connect(lambda: self.close_session(self.terminal))
+    QShortcut(QKeySequence("Ctrl+PgDown"), self).activated.connect(lambda: self.switch_session(1))
+    QShortcut(QKeySequence("Ctrl+PgUp"), self).activated.connect(lambda: self.switch_session(-1))
+
+  @property
+  def terminal(self):
+    """The session in the current tab."""
+    return self.tabs.currentWidget()
+
+  def sessions(self):
+    return [self.tabs.widget(index) for index in range(self.tabs.count())]
+
+  # SESSIONS
+  def new_session(self):
+    """Open a session in a new tab, starting in the current session's directory."""
+    terminal = self.session_class()
+    if self.terminal is not None:
+      terminal.current_directory = self.terminal.current_directory
+    terminal.commandEntered.connect(partial(self.handle_command, terminal))
+    terminal.executor.busyChanged.connect(partial(self.update_busy_state, terminal))
+    index = self.tabs.addTab(terminal, self.session_title(terminal))
+    self.tabs.setCurrentIndex(index)
+    terminal.setFocus()
+    return terminal
+
+  def close_session(self, terminal):
+    """Stop the session's command and close its tab; closing the last one closes the window."""
+    if terminal is None:
+      return
+    terminal.shutdown()
+    self.tabs.removeTab(self.tabs.indexOf(terminal))
+    terminal.deleteLater()
+    if self.tabs.count() == 0:
       self.close()
+
+  def switch_session(self, step):
+    if self.tabs.count() > 1:
+      self.tabs.setCurrentIndex((self.tabs.currentIndex() + step) % self.tabs.count())
+
+  def session_changed(self, index):
+    terminal = self.terminal
+    if terminal is None:
+      return
+    terminal.setFocus()
+    self.update_current_dir_label(terminal.current_directory)
+    self.update_busy_state(terminal, terminal.executor.is_busy())
+
+  def session_title(self, terminal, busy=False):
+    name = terminal.current_directory.name or str(terminal.current_directory)
+    return f"{name} (running)" if busy else name
+      
+  def handle_command(self, terminal, command):
+    if command.lower() == "exit":
+      self.close_session(terminal)
     else:
-      self.update_current_dir_label(self.terminal.current_directory)
+      self.tabs.setTabText(self.tabs.indexOf(terminal), self.session_title(terminal))
+      if terminal is self.terminal:
+        self.update_current_dir_label(terminal.current_directory)
           
   def clear_terminal(self):
+    self.terminal.output.discard()
     self.terminal.clear()
     self.terminal.insert_prompt()
 
   def update_current_dir_label(self, directory):
-    self.current_dir_label.setText(f"$ {directory}")
\ No newline at end of file
+    self.current_dir_label.setText(f"$ {directory}")
+
+  def update_busy_state(self, terminal, busy):
+    self.tabs.setTabText(self.tabs.indexOf(terminal), self.session_title(terminal, busy))
+    if terminal is not self.terminal:
+      return
+    if busy:
+      self.title_label.setText("Team D Terminal (running... press Ctrl+C to cancel)")
+    else:
+      self.title_label.setText("Team D Terminal")
+
+  def closeEvent(self, event):
+    # Stop any running commands before the worker pools are torn down
+    for terminal in self.sessions():
+      terminal.shutdown()
+    super().closeEvent(event)
@@ -0,0 +1,162 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# Most recent samples kept per timing, for the percentiles
+SAMPLE_LIMIT = 10000
+
+# Prefix of the exported metric names
+PREFIX = "team_d_terminal"
+
+# Set to a .json or .prom file to export the metrics when the terminal closes
+METRICS_FILE_ENV = "TEAM_D_TERMINAL_METRICS"
+
+DESCRIPTIONS = {
+  "command_seconds": "Wall time of a command line, from Enter to the next prompt",
+  "command_user_cpu_seconds": "User CPU time used while a command ran, programs it started included",
+  "command_system_cpu_seconds": "System CPU time (system calls) used while a command ran, programs it started included",
+  "dispatch_seconds": "Time the GUI thread spent parsing and starting a command",
+  "flush_seconds": "Time the GUI thread spent putting a batch of output on screen",
+  "prompt_seconds": "Time taken to show a new prompt",
+  "output_flushes_total": "Batches of output put on screen",
+  "output_chars_total": "Characters of output put on screen",
+}
+
+
+def percentile(ordered, fraction):
+  """Nearest-rank percentile of a sorted, non-empty list."""
+  return ordered[max(math.ceil(len(ordered) * fraction) - 1, 0)]
+
+
+class Timing:
+  def __init__(self):
+    self.samples = deque(maxlen=SAMPLE_LIMIT)
+    self.count = 0
+    self.total = 0.0
+
+
+class Metrics:
+  """
+  Timings and counters collected while the terminal runs
+
+  Timings are kept per (name, command) with their last SAMPLE_LIMIT
+  samples, so percentiles reflect recent behaviour, plus an all-time
+  count and sum. Recording is cheap and thread safe, commands running on
+  the worker pool can record too.
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._timings = {}
+    self._counters = {}
+
+  def record(self, name, seconds, command=None):
+    with self._lock:
+      timing = self._timings.get((name, command))
+      if timing is None:
+        timing = self._timings[(name, command)] = Timing()
+      timing.samples.append(seconds)
+      timing.count += 1
+      timing.total += seconds
+
+  def count(self, name, amount=1):
+    with self._lock:
+      self._counters[name] = self._counters.get(name, 0) + amount
+
+  def reset(self):
+    with self._lock:
+      self._timings = {}
+      self._counters = {}
+
+  def summary(self):
+    """
+    Returns:
+        (timings, counters) - timings is a sorted list of dicts with name,
+        command, count, sum and the p50/p95/p99/max of the recent samples
+        in seconds; counters maps names to totals
+    """
+    with self._lock:
+      timings = [(key, sorted(timing.samples), timing.count, timing.total)
+                 for key, timing in self._timings.items()]
+      counters = dict(self._counters)
+    rows = []
+    for (name, command), ordered, count, total in sorted(timings, key=lambda item: (item[0][0], item[0][1] or "")):
+      rows.append({
+        "name": name, "command": command, "count": count, "sum": total,
+        "p50": percentile(ordered, 0.50), "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99), "max": ordered[-1],
+      })
+    return rows, counters
+
+  # EXPORT
+  def to_json(self):
+    import json
+    timings, counters = self.summary()
+    return json.dumps({"timestamp": time.time(), "timings": timings, "counters": counters}, indent=2)
+
+  def to_prometheus(self):
+    """Prometheus text format: timings as summaries, counters as counters."""
+    timings, counters = self.summary()
+    lines = []
+    described = set()
+    for row in timings:
+      metric = f"{PREFIX}_{row['name']}"
+      if metric not in described:
+        described.add(metric)
+        lines.append(f"# HELP {metric} {DESCRIPTIONS.get(row['name'], row['name'])}")
+        lines.append(f"# TYPE {metric} summary")
+      label = f'command="{row["command"]}"' if row["command"] else ""
+      for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+        lines.append(f'{metric}{{{label + "," if label else ""}quantile="{quantile}"}} {row[key]!r}')
+      labels = f"{{{label}}}" if label else ""
+      lines.append(f"{metric}_sum{labels} {row['sum']!r}")
+      lines.append(f"{metric}_count{labels} {row['count']}")
+    for name, value in sorted(counters.items()):
+      metric = f"{PREFIX}_{name}"
+      lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name)}")
+      lines.append(f"# TYPE {metric} counter")
+      lines.append(f"{metric} {value}")
+    return "\n".join(lines) + "\n"
+
+  def export(self, path):
+    """Write the metrics to path, as JSON for *.json and Prometheus text otherwise."""
+    path = os.fspath(path)
+    text = self.to_json() if path.endswith(".json") else self.to_prometheus()
+    # Dashboards may read the file at any time, never show them half of it
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+      f.write(text)
+    os.replace(temp_path, path)
+
+
+class CommandTimer:
+  """Wall and CPU time of one command line, programs it started included."""
+
+  def __init__(self, command):
+    self.command = command
+    self.started = time.perf_counter()
+    self.times = os.times()
+
+  def stop(self):
+    """Returns (wall, user, system) seconds since the timer was created."""
+    wall = time.perf_counter() - self.started
+    now = os.times()
+    user = now.user - self.times.user + now.children_user - self.times.children_user
+    system = now.system - self.times.system + now.children_system - self.times.children_system
+    return wall, user, system
+
+
+# Shared by everything in the process
+METRICS = Metrics()
+
+
+def export_if_requested():
+  """Export METRICS to the file named by METRICS_FILE_ENV, if it's set."""
+  metrics_file = os.environ.get(METRICS_FILE_ENV)
+  if metrics_file:
+    try:
+      METRICS.export(metrics_file)
+    except OSError:
+      pass
@@ -0,0 +1,185 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+
+# Matches kept per search; the find bar shows "10000+" beyond that
+MAX_MATCHES = 10000
+
+
+class OutputSearch:
+  """
+  Matches of one query in a LineStore, kept up to date as output arrives
+
+  The store is searched as UTF-8 bytes with a compiled regular
+  expression (a literal query is escaped), so no line is decoded to look
+  for a match. Matches are byte offsets in two arrays. Output appended
+  later is searched on its own by update(), and typing one more
+  character of a literal query only re-checks the matches already
+  found, so a keystroke never rescans the whole scrollback.
+
+  re's IGNORECASE is ten times slower than a plain search, so a literal
+  query that ignores case is looked for in a lowercased copy of the
+  bytes instead (which only folds ASCII letters).
+
+  Only complete lines are searched; the last line is the prompt being
+  typed. A match never spans two lines.
+  """
+
+  def __init__(self, store):
+    self.store = store
+    self.query = ""
+    self.regex = False
+    self.case_sensitive = False
+    self.pattern = None
+    # Whether pattern is meant for lowercased bytes
+    self.folded = False
+    self.error = None
+    # Absolute byte offsets (see LineStore.base) of each match
+    self.starts = array('Q')
+    self.ends = array('Q')
+    self.capped = False
+    # Everything before this absolute offset has been searched
+    self._searched = 0
+
+  def __len__(self):
+    return len(self.starts)
+
+  def set_query(self, query, regex=False, case_sensitive=False):
+    """Search for a new query; returns False if it isn't a valid regular expression."""
+    # A longer literal can only match where the shorter one does. Those
+    # are all among the matches found if the shorter one can't overlap
+    # itself: with "aa" in "xaaab", the "aa" at 2 was never listed, and
+    # "aab" is there
+    previous = self.query.encode("utf-8")
+    narrowing = (
+      self.pattern is not None and not self.capped and not regex and not self.regex
+      and case_sensitive == self.case_sensitive and query.startswith(self.query)
+      and not self_overlapping(previous.lower() if self.folded else previous)
+    )
+    self.query, self.regex, self.case_sensitive = query, regex, case_sensitive
+    self.error = None
+    self.folded = not regex and not case_sensitive
+    encoded = query.encode("utf-8")
+    try:
+      if not query:
+        self.pattern = None
+      elif regex:
+        self.pattern = re.compile(encoded, re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE)
+      else:
+        self.pattern = re.compile(re.escape(encoded.lower() if self.folded else encoded))
+    except re.error as e:
+      self.error = str(e)
+      self.pattern = None
+
+    if self.pattern is None:
+      self.starts, self.ends = array('Q'), array('Q')
+      self.capped = False
+      return self.error is None
+
+    if narrowing:
+      # A longer literal can only match where the shorter one did
+      data, base = self.store.data, self.store.base
+      literal = encoded.lower() if self.folded else encoded
+      starts, ends = array('Q'), array('Q')
+      for start in self.starts:
+        # Matches don't overlap, as finditer() finds them
+        if ends and start < ends[-1]:
+          continue
+        candidate = data[start - base:start - base + len(literal)]
+        if (candidate.lower() if self.folded else candidate) == literal:
+          starts.append(start)
+          ends.append(start + len(literal))
+      self.starts, self.ends = starts, ends
+      return True
+
+    self.starts, self.ends = array('Q'), array('Q')
+    self.capped = False
+    self._searched = self.store.base
+    self.update()
+    return True
+
+  def update(self):
+    """Search the lines completed since the last call."""
+    if self.pattern is None or self.capped:
+      return
+    store = self.store
+    base = store.base
+    begin = max(self._searched, base) - base
+    end = store.starts[-1] - base
+    if end <= begin:
+      return
+    data = store.data
+    if self.folded:
+      # Offsets in the lowercased copy are offsets from begin
+      haystack, shift = data[begin:end].lower(), begin + base
+      matches = self.pattern.finditer(haystack)
+    else:
+      haystack, shift = data, base
+      matches = self.pattern.finditer(data, begin, end)
+    for found in matches:
+      start, stop = found.span()
+      if start == stop or haystack.find(b"\n", start, stop) != -1:
+        continue
+      self.starts.append(start + shift)
+      self.ends.append(stop + shift)
+      if len(self.starts) >= MAX_MATCHES:
+        self.capped = True
+        break
+    self._searched = end + base
+
+  def forget_dropped(self):
+    """Drop the matches in lines the store no longer has; returns how many."""
+    gone = bisect_left(self.starts, self.store.base)
+    if gone:
+      del self.starts[:gone]
+      del self.ends[:gone]
+    return gone
+
+  def clear(self):
+    self.starts, self.ends = array('Q'), array('Q')
+    self.capped = False
+    self._searched = 0
+
+  def between(self, first_line, last_line):
+    """Indexes of the matches in lines first_line to last_line, for highlighting what's on screen."""
+    store = self.store
+    last_line = min(last_line, len(store.starts) - 1)
+    low = bisect_left(self.starts, store.starts[first_line])
+    high = len(self.starts) if last_line + 1 >= len(store.starts) else bisect_left(self.starts, store.starts[last_line + 1])
+    return range(low, high)
+
+  def nearest(self, line, backwards=False):
+    """Index of the first match at or after line (before it when backwards), wrapping around."""
+    if not self.starts:
+      return None
+    offset = self.store.starts[min(line, len(self.store.starts) - 1)]
+    if backwards:
+      index = bisect_left(self.starts, offset) - 1
+      return index % len(self.starts)
+    index = bisect_left(self.starts, offset)
+    return index if index < len(self.starts) else 0
+
+  def locate(self, index):
+    """
+    Returns:
+        (line, column, length) of a match, column and length in UTF-16
+        code units as QTextDocument counts positions
+    """
+    store = self.store
+    start, end = self.starts[index], self.ends[index]
+    line = bisect_right(store.starts, start) - 1
+    data, base = store.data, store.base
+    before = data[store.starts[line] - base:start - base].decode("utf-8", "replace")
+    text = data[start - base:end - base].decode("utf-8", "replace")
+    return line, utf16_length(before), utf16_length(text)
+
+
+def utf16_length(text):
+  if text.isascii():
+    return len(text)
+  return len(text.encode("utf-16-le")) // 2
+
+
+def self_overlapping(literal):
+  """Whether two occurrences of literal can overlap ("aa", "abab"): some proper prefix is also a suffix."""
+  return any(literal[:size] == literal[-size:] for size in range(1, len(literal)))
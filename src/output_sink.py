@@ -0,0 +1,73 @@
+import time
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+from src.metrics import METRICS
+
+# Minimum time between two flushes, ~60 per second
+FLUSH_INTERVAL_MS = 16
+
+
+class OutputSink(QObject):
+  """
+  Buffers terminal output and writes it to the editor in batches
+
+  Every write used to be its own appendPlainText call, and each call
+  relaid out the document. Writes are now queued and flushed at most
+  once per FLUSH_INTERVAL_MS through a single append_output() call.
+
+  The editor is the widget showing the output: it has append_output(text)
+  and output_is_empty(), see TerminalWidget and OutputView.
+  """
+
+  # Emitted whenever queued output has been written (or discarded)
+  flushed = pyqtSignal()
+
+  def __init__(self, editor):
+    super().__init__(editor)
+    self.editor = editor
+    self._pending = []
+    self.chars_written = 0
+
+    self.timer = QTimer(self)
+    self.timer.setSingleShot(True)
+    self.timer.setInterval(FLUSH_INTERVAL_MS)
+    self.timer.timeout.connect(self.flush)
+
+  def write(self, text):
+    """Queue text to be added at the end of the output as-is."""
+    if not text:
+      return
+    self._pending.append(text)
+    if not self.timer.isActive():
+      self.timer.start()
+
+  def write_line(self, text):
+    """Queue text as a new paragraph, like appendPlainText."""
+    if self._pending or not self.editor.output_is_empty():
+      text = "\n" + text
+    self._pending.append(text)
+    if not self.timer.isActive():
+      self.timer.start()
+
+  def has_pending(self):
+    return bool(self._pending)
+
+  def discard(self):
+    """Drop queued output, e.g. when the screen is cleared."""
+    self._pending = []
+    self.timer.stop()
+    self.flushed.emit()
+
+  def flush(self):
+    """Hand everything queued so far to the editor in one call."""
+    self.timer.stop()
+    if not self._pending:
+      return
+    started = time.perf_counter()
+    text = "".join(self._pending)
+    self._pending = []
+    self.editor.append_output(text)
+    self.chars_written += len(text)
+    METRICS.record("flush_seconds", time.perf_counter() - started)
+    METRICS.count("output_flushes_total")
+    METRICS.count("output_chars_total", len(text))
+    self.flushed.emit()
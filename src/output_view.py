@@ -0,0 +1,253 @@
+from PyQt6.QtWidgets import QAbstractScrollArea, QApplication
+from PyQt6.QtGui import QFont, QPainter, QPalette
+from PyQt6.QtCore import Qt, pyqtSignal
+from src.ansi import DEFAULT_STYLE, AnsiParser
+from src.line_store import LineStore, normalize_line_breaks
+from src.text_formats import FORMATS
+
+# Space between the viewport edge and the text, in pixels
+MARGIN = 8
+
+# Columns a tab advances to
+TAB_WIDTH = 8
+
+
+class OutputView(QAbstractScrollArea):
+  """
+  Read-only output view that only lays out the lines on screen
+
+  QPlainTextEdit keeps a layout for every block, so scrolling and
+  appending get slower as the document grows. This view keeps its lines
+  in a LineStore and, on every paint, decodes and draws just the ones in
+  the viewport: scrolling costs the same with a thousand lines or ten
+  million. The vertical scrollbar counts lines, lines aren't wrapped.
+
+  Selection is by whole lines (drag with the mouse); copy_selection()
+  puts them on the clipboard.
+
+  The store holds plain text; colours are kept beside it, as runs of
+  (start, end, Style) columns for the lines that have any. Uncoloured
+  output, most of it, costs nothing extra.
+  """
+
+  # Wheel scrolled down while already at the bottom
+  scrolledPastEnd = pyqtSignal()
+
+  def __init__(self, parent=None):
+    super().__init__(parent)
+    self.store = LineStore()
+    # Splits program output into text and the styles its escapes set
+    self.ansi = AnsiParser()
+    # {line number: [(start, end, Style), ...]} for coloured lines, numbered
+    # from the first line ever appended; dropped lines are counted in dropped
+    self.styles = {}
+    self.dropped = 0
+    # (anchor, current) line numbers of a mouse selection
+    self._selection = None
+    self.setObjectName("outputView")
+    self.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+    self.viewport().setCursor(Qt.CursorShape.IBeamCursor)
+    self.verticalScrollBar().setSingleStep(1)
+
+  # OUTPUT (called by the OutputSink)
+  def append_output(self, text):
+    scrollbar = self.verticalScrollBar()
+    at_bottom = scrollbar.value() == scrollbar.maximum()
+    spans = self.ansi.feed(normalize_line_breaks(text))
+    if any(style != DEFAULT_STYLE for span, style in spans):
+      self.record_styles(spans)
+    self.store.append("".join(span for span, style in spans))
+    self.update_scrollbars()
+    # Keep following the output unless the user scrolled up to read
+    if at_bottom:
+      scrollbar.setValue(scrollbar.maximum())
+    self.viewport().update()
+
+  def record_styles(self, spans):
+    """Remember where the coloured spans about to be appended will be."""
+    line = self.dropped + len(self.store) - 1
+    # The spans continue the open last line
+    column = len(self.store.line(len(self.store) - 1))
+    for span, style in spans:
+      for number, piece in enumerate(span.split("\n")):
+        if number:
+          line += 1
+          column = 0
+        if piece and style != DEFAULT_STYLE:
+          self.styles.setdefault(line, []).append((column, column + len(piece), style))
+        column += len(piece)
+
+  def output_is_empty(self):
+    return self.store.is_empty()
+
+  def drop_lines(self, amount):
+    """Remove the oldest lines, keeping the ones on screen where they are."""
+    scrollbar = self.verticalScrollBar()
+    at_bottom = scrollbar.value() == scrollbar.maximum()
+    first = scrollbar.value()
+    removed = self.store.drop(amount)
+    self.dropped += len(removed)
+    # Lines are added in order, so the dropped ones come first
+    while self.styles:
+      line = next(iter(self.styles))
+      if line >= self.dropped:
+        break
+      del self.styles[line]
+    self._selection = None
+    self.update_scrollbars()
+    scrollbar.setValue(scrollbar.maximum() if at_bottom else first - len(removed))
+    self.viewport().update()
+    return removed
+
+  def clear(self):
+    self.store.clear()
+    self.ansi.reset()
+    self.styles = {}
+    self.dropped = 0
+    self._selection = None
+    self.update_scrollbars()
+    self.viewport().update()
+
+  # GEOMETRY
+  def line_height(self):
+    return self.fontMetrics().lineSpacing()
+
+  def visible_lines(self):
+    return max((self.viewport().height() - MARGIN) // self.line_height(), 1)
+
+  def line_at(self, y):
+    """Line number under a viewport y coordinate, clamped to the lines there are."""
+    line = self.verticalScrollBar().value() + (y - MARGIN) // self.line_height()
+    return min(max(line, 0), len(self.store) - 1)
+
+  def update_scrollbars(self):
+    visible = self.visible_lines()
+    vertical = self.verticalScrollBar()
+    vertical.setPageStep(visible)
+    vertical.setRange(0, max(len(self.store) - visible, 0))
+
+    # Bytes are an upper bound for the characters of the longest line
+    width = self.store.longest * self.fontMetrics().horizontalAdvance("M") + 2 * MARGIN
+    horizontal = self.horizontalScrollBar()
+    horizontal.setPageStep(self.viewport().width())
+    horizontal.setRange(0, max(width - self.viewport().width(), 0))
+
+  def resizeEvent(self, event):
+    super().resizeEvent(event)
+    vertical = self.verticalScrollBar()
+    at_bottom = vertical.value() == vertical.maximum()
+    self.update_scrollbars()
+    if at_bottom:
+      vertical.setValue(vertical.maximum())
+
+  def scrollContentsBy(self, dx, dy):
+    self.viewport().update()
+
+  def scroll_pages(self, pages):
+    scrollbar = self.verticalScrollBar()
+    scrollbar.setValue(scrollbar.value() + pages * scrollbar.pageStep())
+
+  # PAINTING
+  def paintEvent(self, event):
+    painter = QPainter(self.viewport())
+    palette = self.palette()
+    height = self.line_height()
+    ascent = self.fontMetrics().ascent()
+    first = self.verticalScrollBar().value()
+    lines = self.store.lines(first, first + self.visible_lines() + 1)
+    x = MARGIN - self.horizontalScrollBar().value()
+    width = self.viewport().width()
+
+    selected = range(0)
+    if self._selection is not None:
+      start, end = sorted(self._selection)
+      selected = range(start, end + 1)
+
+    text_color = palette.color(QPalette.ColorRole.Text)
+    painter.setPen(text_color)
+    for offset, line in enumerate(lines):
+      top = MARGIN + offset * height
+      if first + offset in selected:
+        painter.fillRect(0, top, width, height, palette.color(QPalette.ColorRole.Highlight))
+      runs = self.styles.get(self.dropped + first + offset)
+      if runs is not None:
+        self.paint_styled_line(painter, x, top, line, runs, text_color)
+      elif line:
+        painter.drawText(x, top + ascent, line.expandtabs(TAB_WIDTH))
+    painter.end()
+
+  def paint_styled_line(self, painter, x, top, line, runs, text_color):
+    """Draw a line piece by piece, each coloured piece as its Style says."""
+    metrics = self.fontMetrics()
+    height = self.line_height()
+    pieces = []
+    position = 0
+    for start, end, style in runs:
+      if start > position:
+        pieces.append((line[position:start], DEFAULT_STYLE))
+      pieces.append((line[start:end], style))
+      position = end
+    if position < len(line):
+      pieces.append((line[position:], DEFAULT_STYLE))
+
+    column = 0
+    for text, style in pieces:
+      # Tabs stop at multiples of TAB_WIDTH from the start of the line
+      pad = column % TAB_WIDTH
+      shown = (" " * pad + text).expandtabs(TAB_WIDTH)[pad:]
+      advance = metrics.horizontalAdvance(shown)
+      text_format = FORMATS.get(style)
+      if text_format.background().style() != Qt.BrushStyle.NoBrush:
+        painter.fillRect(x, top, advance, height, text_format.background())
+      foreground = text_format.foreground()
+      painter.setPen(foreground.color() if foreground.style() != Qt.BrushStyle.NoBrush else text_color)
+      font = QFont(self.font())
+      font.setBold(style.bold)
+      font.setItalic(style.italic)
+      font.setUnderline(style.underline)
+      font.setStrikeOut(style.strike)
+      painter.setFont(font)
+      painter.drawText(x, top + metrics.ascent(), shown)
+      x += advance
+      column += len(shown)
+    painter.setPen(text_color)
+    painter.setFont(self.font())
+
+  # SELECTION
+  def mousePressEvent(self, event):
+    if event.button() == Qt.MouseButton.LeftButton and len(self.store):
+      line = self.line_at(int(event.position().y()))
+      self._selection = (line, line)
+      self.viewport().update()
+
+  def mouseMoveEvent(self, event):
+    if self._selection is None or not event.buttons() & Qt.MouseButton.LeftButton:
+      return
+    y = int(event.position().y())
+    # Dragging past the top or bottom edge scrolls
+    if y < 0:
+      self.verticalScrollBar().setValue(self.verticalScrollBar().value() - 1)
+    elif y > self.viewport().height():
+      self.verticalScrollBar().setValue(self.verticalScrollBar().value() + 1)
+    self._selection = (self._selection[0], self.line_at(y))
+    self.viewport().update()
+
+  def has_selection(self):
+    return self._selection is not None
+
+  def selected_text(self):
+    if self._selection is None:
+      return ""
+    start, end = sorted(self._selection)
+    return "\n".join(self.store.lines(start, end + 1))
+
+  def copy_selection(self):
+    if self._selection is not None:
+      QApplication.clipboard().setText(self.selected_text())
+
+  # LAZY PAGING ON SCROLL
+  def wheelEvent(self, event):
+    super().wheelEvent(event)
+    scrollbar = self.verticalScrollBar()
+    if event.angleDelta().y() < 0 and scrollbar.value() == scrollbar.maximum():
+      self.scrolledPastEnd.emit()
@@ -0,0 +1,163 @@
+"""
+Pipelines and output redirection
+
+"read big.log | grep ERROR | head 20 > errors.txt" is split into stages
+that are chained as generators: each stage's Command.stream() yields
+lines and reads the lines of the stage before it. Nothing is read ahead,
+so once "head" has its 20 lines the whole chain is closed and "read"
+stops reading the file.
+"""
+
+from src.disk_usage import DISK_USAGE_CACHE
+from src.file_copy import atomic_write
+
+# Lines per output signal / per write to a redirection target
+BATCH_LINES = 256
+
+
+class PipelineError(Exception):
+  """Raised by split_pipeline for lines that can't be run as a pipeline."""
+
+
+def split_pipeline(line):
+  """
+  Split a command line at | and take off a trailing > or >> redirection
+
+  A | or > inside "..." or '...' is ordinary text.
+
+  Returns:
+      (stages, redirect) - the text of each stage and (file_name, append),
+      or None when the output isn't redirected
+  """
+  stages = []
+  current = []
+  redirect = None
+  quote = None
+  index = 0
+  while index < len(line):
+    char = line[index]
+    if quote is not None:
+      if char == quote:
+        quote = None
+      current.append(char)
+    elif char in "\"'":
+      quote = char
+      current.append(char)
+    elif char == "|":
+      stages.append("".join(current).strip())
+      current = []
+    elif char == ">":
+      append = line.startswith(">>", index)
+      target = line[index + (2 if append else 1):].strip()
+      if not target or "|" in target or ">" in target or len(target.split()) > 1:
+        raise PipelineError("'>' and '>>' must be followed by one file name, at the end of the line")
+      redirect = (target.strip("\"'"), append)
+      break
+    else:
+      current.append(char)
+    index += 1
+  stages.append("".join(current).strip())
+  if quote is not None:
+    raise PipelineError("unterminated quote")
+  if not all(stages):
+    raise PipelineError("empty command in pipeline")
+  return stages, redirect
+
+
+class CaptureTask:
+  """
+  Collects the output of a command that can't stream
+
+  Wraps the pipeline's task, so cancelling still works; what the command
+  writes becomes lines instead of screen output.
+  """
+
+  def __init__(self, task):
+    self.task = task
+    self.lines = []
+
+  def write(self, text):
+    # Messages start with "\n" to leave a blank line on screen, in a pipe
+    # that would just be an empty line
+    if text.startswith("\n"):
+      text = text[1:]
+    self.lines.extend(text.split("\n"))
+
+  def write_text(self, text):
+    self.write(text)
+
+  def fail(self, message=None):
+    self.task.fail()
+    if message is not None:
+      self.write(message)
+
+  def on_cancel(self, callback):
+    self.task.on_cancel(callback)
+
+  def is_cancelled(self):
+    return self.task.is_cancelled()
+
+  def check_cancelled(self):
+    self.task.check_cancelled()
+
+
+def run_pipeline(terminal, task, stages, redirect):
+  """
+  Run parsed stages, each a (Command, args) pair, as one pipeline
+
+  The last stage's lines are written to the screen or, with redirect,
+  to a file: replaced atomically for ">", appended to for ">>". A single
+  command whose write_to() can produce the file itself (cat) does so.
+  """
+  if redirect is not None:
+    file_name, append = redirect
+    path = terminal.current_directory / file_name
+    if path.is_dir():
+      task.fail(f"\nError: '{file_name}' is a directory")
+      return
+    if len(stages) == 1:
+      handler, args = stages[0]
+      if handler.write_to(terminal, task, args, path, append):
+        return
+
+  streams = []
+  lines = None
+  try:
+    for handler, args in stages:
+      lines = handler.stream(terminal, task, args, lines)
+      streams.append(lines)
+
+    if redirect is None:
+      task.write("")
+      for batch in batches(lines):
+        task.write("\n".join(batch))
+      return
+
+    chunks = ("".join(line + "\n" for line in batch).encode("utf-8") for batch in batches(lines))
+    try:
+      if append:
+        with open(path, "ab") as f:
+          for chunk in chunks:
+            f.write(chunk)
+      else:
+        atomic_write(path, chunks)
+    finally:
+      terminal.dir_cache.invalidate(path.parent)
+      if append:
+        DISK_USAGE_CACHE.invalidate(path.parent)
+  finally:
+    # Last stage first: each one stops reading from the one before it,
+    # then that one closes its file or stops its program
+    for stream in reversed(streams):
+      stream.close()
+
+
+def batches(lines):
+  batch = []
+  for line in lines:
+    batch.append(line)
+    if len(batch) >= BATCH_LINES:
+      yield batch
+      batch = []
+  if batch:
+    yield batch
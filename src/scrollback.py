@@ -0,0 +1,105 @@
+import os
+import sys
+
+# Lines kept in the terminal document before the oldest are archived
+DEFAULT_SCROLLBACK_LIMIT = 10000
+
+# Smallest limit accepted, so the prompt and recent output always fit
+MIN_SCROLLBACK_LIMIT = 100
+
+
+class ScrollbackArchive:
+  """
+  Compressed on-disk store for lines evicted from the terminal
+
+  The file is only created, and gzip only imported, once the first lines
+  are evicted; most sessions never get that far.
+  """
+
+  def __init__(self):
+    self.path = None
+    self.line_count = 0
+
+  def append(self, lines):
+    """Append a batch of lines as one more gzip member."""
+    if not lines:
+      return
+    import gzip
+    if self.path is None:
+      import tempfile
+      fd, self.path = tempfile.mkstemp(prefix="team_d_scrollback_", suffix=".gz")
+      os.close(fd)
+    with gzip.open(self.path, 'at', encoding='utf-8', compresslevel=6) as f:
+      f.write("\n".join(lines))
+      f.write("\n")
+    self.line_count += len(lines)
+
+  def iter_lines(self, cancel=None):
+    """Yield (line_number, line) for every archived line, oldest first."""
+    if self.path is None:
+      return
+    import gzip
+    try:
+      with gzip.open(self.path, 'rt', encoding='utf-8', errors='replace') as f:
+        for number, line in enumerate(f, 1):
+          if cancel and number % 1000 == 0:
+            cancel()
+          yield number, line.rstrip('\n')
+    except EOFError:
+      # The GUI thread is appending a member right now; it will be
+      # readable on the next call.
+      return
+
+  def search(self, text, cancel=None):
+    """Yield archived lines containing text (case-insensitive)."""
+    needle = text.lower()
+    for number, line in self.iter_lines(cancel):
+      if needle in line.lower():
+        yield number, line
+
+  def size_on_disk(self):
+    if self.path is None:
+      return 0
+    try:
+      return os.path.getsize(self.path)
+    except OSError:
+      return 0
+
+  def close(self):
+    if self.path is None:
+      return
+    try:
+      os.remove(self.path)
+    except OSError:
+      pass
+
+
+def process_memory():
+  """
+  Return a (label, bytes) pair describing this process' memory use
+
+  Uses the current resident set on Linux and falls back to the peak
+  resident set elsewhere. Returns None where neither is available.
+  """
+  try:
+    with open("/proc/self/statm") as f:
+      resident_pages = int(f.read().split()[1])
+    return "Resident memory", resident_pages * os.sysconf("SC_PAGE_SIZE")
+  except (OSError, ValueError, IndexError, AttributeError):
+    pass
+  try:
+    import resource
+  except ImportError:
+    return None
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+  return "Peak resident memory", peak if sys.platform == "darwin" else peak * 1024
+
+
+def format_bytes(size):
+  if size < 1024:
+    return f"{size} B"
+  for unit in ["KB", "MB", "GB"]:
+    size /= 1024
+    if size < 1024 or unit == "GB":
+      return f"{size:.1f} {unit}"
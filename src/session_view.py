@@ -0,0 +1,359 @@
+from PyQt6.QtGui import QFont, QKeySequence
+from PyQt6.QtCore import Qt, QFileSystemWatcher, QTimer
+import sys
+from src.command_executor import CommandExecutor
+from src.completion import INDEX_CACHE, Completer
+from src.engine import TerminalEngine
+from src.metrics import export_if_requested
+from src.output_sink import OutputSink
+from src.scrollback import DEFAULT_SCROLLBACK_LIMIT, MIN_SCROLLBACK_LIMIT, ScrollbackArchive
+from src import startup
+
+
+class SessionView:
+  """
+  What TerminalWidget and VirtualTerminal have in common
+
+  Both are a session: an executor and an engine, a watched directory, a
+  scrollback archive, history recall, Ctrl+R search, Tab completion and
+  y/n confirmations. This mixin holds all of that; the widgets only show
+  the output and edit the command, each in its own way. A widget calls
+  setup_session() from its __init__ and provides:
+
+      command_text()                   what has been typed
+      replace_current_command(text)    put text in the input
+      echo_command(text)               leave prompt and command in the output
+      insert_prompt()                  show a fresh, empty prompt
+      lock_input(busy)                 lock the input while a command runs
+      show_reverse_search(failed)      show the Ctrl+R query and match
+      show_completions(line, candidates, total)
+      copy_selection()
+      trim_scrollback()                archive lines beyond scrollback_limit
+      scrollback_size()                (lines, characters) on screen
+      clear()
+
+  and a commandEntered signal (a mixin can't declare Qt signals).
+  """
+
+  def setup_session(self, output_target):
+    """
+    Args:
+        output_target: The widget OutputSink writes to
+    """
+    # History browsing state (the history itself belongs to the engine)
+    self._history_position = None
+    self._history_prefix = None
+    # Ctrl+R search state, None when not searching
+    self._search = None
+    # Operation waiting for a y/n answer
+    self._pending_operation = None
+
+    self.prompt = "$ "
+
+    # All output is queued and written in batches
+    self.output = OutputSink(output_target)
+
+    # Blocking handlers run on a worker pool so the GUI never freezes
+    self.executor = CommandExecutor(self)
+    self.executor.output.connect(self.output.write_line)
+    self.executor.text.connect(self.output.write)
+    # Workers wait while too much of their output is still unwritten
+    self.executor.acknowledge_on(self.output.flushed)
+    self.executor.failed.connect(self.show_command_error)
+    self.executor.finished.connect(self.command_finished)
+    self.executor.busyChanged.connect(self.lock_input)
+    self._running_command = None
+
+    # Directory, history and running of commands are the engine's; the
+    # widget shows its output and edits the command line
+    self.engine = TerminalEngine(self.output, self.executor, view=self)
+
+    # Directory listings are cached and dropped when a watcher sees a change.
+    # The cache is shared by all sessions, each watches its own directory.
+    self.watcher = QFileSystemWatcher(self)
+    self.watcher.directoryChanged.connect(self.engine.dir_cache.invalidate)
+    self.watcher.directoryChanged.connect(INDEX_CACHE.invalidate)
+
+    # Bounded scrollback: the oldest lines are spilled to a compressed archive
+    self.scrollback_limit = DEFAULT_SCROLLBACK_LIMIT
+    self.archive = ScrollbackArchive()
+    self._trim_scheduled = False
+
+    # Tab completion of command names and paths
+    self.completer = Completer(INDEX_CACHE, self.engine.commands.names)
+    self._last_completion = None
+
+  @property
+  def current_directory(self):
+    return self.engine.current_directory
+
+  @current_directory.setter
+  def current_directory(self, directory):
+    self.engine.current_directory = directory
+
+  # INITIAL SETUP
+  def initial_setup(self):
+    self.show_welcome_message()
+    self.insert_prompt()
+    startup.mark("first prompt")
+    startup.report()
+
+  # STYLINGS
+  def setup_styling(self):
+    # Set font (colors come from the main window's stylesheet)
+    font = QFont("Consolas" if sys.platform == "win32" else "Menlo")
+    # Where the family is missing, pick a monospace font straight away
+    font.setStyleHint(QFont.StyleHint.Monospace)
+    font.setPointSize(11)
+    self.setFont(font)
+
+  # SHOW WELCOME MESSAGE
+  def show_welcome_message(self):
+    welcome_text = """
+      ╔════════════════════════════════════════════════════════════════════════════╗
+      ║                     Welcome to Team D Terminal v1.0                        ║
+      ║                                                                            ║
+      ║    Type 'help' to see available commands and their descriptions            ║
+      ║    Press Ctrl+L to clear the screen                                        ║
+      ║    Type 'exit' to close the terminal                                       ║
+      ╚════════════════════════════════════════════════════════════════════════════╝
+    """
+
+    self.output.write_line(welcome_text)
+
+  # FILE SYSTEM WATCHER
+  def watch_directory(self, directory):
+    """Let the file system watcher invalidate the listing of the directory being used."""
+    watched = self.watcher.directories()
+    if watched != [str(directory)]:
+      if watched:
+        self.watcher.removePaths(watched)
+      self.watcher.addPath(str(directory))
+
+  # BACKGROUND COMMANDS
+  def command_finished(self, cancelled):
+    if cancelled:
+      self.output.write_line("\nCommand cancelled")
+    self.engine.finish_command_timing()
+    self.insert_prompt()
+    if self._running_command is not None:
+      command = self._running_command
+      self._running_command = None
+      self.commandEntered.emit(command)
+
+  def show_command_error(self, message):
+    self.output.write_line(f"\nError: {message}")
+
+  # SCROLLBACK LIMIT
+  def schedule_scrollback_trim(self, *args):
+    # Coalesce: a burst of output is trimmed once, after it lands
+    if self.scrollback_size()[0] > self.scrollback_limit and not self._trim_scheduled:
+      self._trim_scheduled = True
+      QTimer.singleShot(0, self.run_scrollback_trim)
+
+  def run_scrollback_trim(self):
+    self._trim_scheduled = False
+    self.trim_scrollback()
+
+  def set_scrollback_limit(self, limit):
+    self.scrollback_limit = max(limit, MIN_SCROLLBACK_LIMIT)
+    self.schedule_scrollback_trim()
+
+  # SHUTDOWN
+  def shutdown(self):
+    """Stop any running command, remove the scrollback archive and export the metrics if asked to."""
+    self.executor.cancel()
+    if not self.executor.wait(2000):
+      # A second cancel kills external programs ignoring the first
+      self.executor.cancel()
+      self.executor.wait(2000)
+    self.archive.close()
+    export_if_requested()
+
+  # HISTORY RECALL
+  def recall_previous(self):
+    # The text typed before the first Up press filters the recalled commands
+    prefix = self.command_text() if self._history_prefix is None else self._history_prefix
+    found = self.engine.history.previous(prefix, before=self._history_position)
+    if found is not None:
+      self._history_prefix = prefix
+      self._history_position, command = found
+      self.replace_current_command(command)
+
+  def recall_next(self):
+    # Nothing recalled yet: the typed text stays
+    if self._history_position is None:
+      return
+    found = self.engine.history.next(self._history_prefix, after=self._history_position)
+    if found is not None:
+      self._history_position, command = found
+      self.replace_current_command(command)
+    else:
+      # Past the newest match: back to what was typed
+      self.replace_current_command(self._history_prefix)
+      self._history_position = None
+      self._history_prefix = None
+
+  # REVERSE HISTORY SEARCH (Ctrl+R)
+  def start_reverse_search(self):
+    self._search = {"query": "", "match": None, "position": None, "original": self.command_text()}
+    self.show_reverse_search()
+
+  def update_reverse_search(self, query, older=False):
+    search = self._search
+    before = search["position"] if older else None
+    found = self.engine.history.search(query, before=before) if query else None
+    search["query"] = query
+    # On failure the previous match stays, as in bash
+    if found is not None:
+      search["position"], search["match"] = found
+    self.show_reverse_search(failed=bool(query) and found is None)
+
+  def finish_reverse_search(self, accept):
+    search = self._search
+    self._search = None
+    if accept and search["match"] is not None:
+      self.replace_current_command(search["match"])
+    else:
+      self.replace_current_command(search["original"])
+
+  def handle_reverse_search_key(self, event):
+    """
+    Keys typed while Ctrl+R search is active
+
+    Returns:
+        False for a key that ends the search and should then do what it
+        normally does (moving the cursor, ...)
+    """
+    key = event.key()
+    control = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+    query = self._search["query"]
+    if key == Qt.Key.Key_R and control:
+      self.update_reverse_search(query, older=True)
+    elif key == Qt.Key.Key_Escape or (key == Qt.Key.Key_G and control):
+      self.finish_reverse_search(accept=False)
+    elif key == Qt.Key.Key_Backspace:
+      self.update_reverse_search(query[:-1])
+    elif key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+      self.finish_reverse_search(accept=True)
+      self.submit_current_command()
+    elif event.text() and event.text().isprintable() and not control:
+      self.update_reverse_search(query + event.text())
+    else:
+      # Any other key keeps the match on the line for editing
+      self.finish_reverse_search(accept=True)
+      return False
+    return True
+
+  # KEY PRESS EVENTS
+  def handle_session_key(self, event):
+    """
+    Keys that mean the same in both widgets, before any editing
+
+    Returns:
+        True if the key was handled, False to let the widget edit with it
+    """
+    key = event.key()
+    control = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+
+    # While a command is running only Ctrl+C (cancel) is accepted
+    if self.executor.is_busy():
+      if key == Qt.Key.Key_C and control:
+        if self.executor.cancel():
+          self.output.write_line("^C")
+      return True
+
+    if event.matches(QKeySequence.StandardKey.Copy):
+      self.copy_selection()
+      return True
+
+    # Confirmation prompts take a single y or n
+    if self._pending_operation is not None:
+      answer = event.text().lower()
+      if answer in ('y', 'n'):
+        operation = self._pending_operation
+        self._pending_operation = None
+        self.output.write_line(answer)
+        if answer == 'y':
+          operation()
+        else:
+          self.output.write_line("\nOperation cancelled")
+        # A confirmed operation may still be running in the background
+        if not self.executor.is_busy():
+          self.insert_prompt()
+      return True
+
+    if self._search is not None and self.handle_reverse_search_key(event):
+      return True
+
+    # Any key other than Up/Down ends history browsing
+    if key not in (Qt.Key.Key_Up, Qt.Key.Key_Down):
+      self._history_position = None
+      self._history_prefix = None
+
+    if key == Qt.Key.Key_R and control:
+      self.start_reverse_search()
+      return True
+
+    if key == Qt.Key.Key_Tab:
+      self.complete_current_command()
+      return True
+    self._last_completion = None
+    return False
+
+  def submit_current_command(self):
+    command_line = self.command_text()
+    self.echo_command(command_line)
+    # Lines of a multi-line command are joined, like lines ending in "\"
+    command = command_line.replace("\n", " ").strip()
+    if command:
+      self.engine.history.append(command_line.strip())
+    self.process_command(command)
+
+  # TAB COMPLETION
+  def complete_current_command(self):
+    """Complete the last word; a second Tab lists the candidates."""
+    line = self.command_text()
+    completed, candidates, total = self.completer.complete(line, self.current_directory)
+    if completed != line:
+      self.replace_current_command(completed)
+      self._last_completion = None
+      return
+
+    if candidates and self._last_completion == line:
+      self.show_completions(line, candidates, total)
+    self._last_completion = line
+
+  # LAZY PAGING ON SCROLL
+  def page_on_scroll(self):
+    # Scrolling down past the end of a paged read loads the next page
+    if (self.engine.pager is not None and not self.executor.is_busy()
+        and self._pending_operation is None and not self.command_text().strip()):
+      self.echo_command("more")
+      self.process_command("more")
+
+  # COMMANDS PROCESSES
+  def process_command(self, command):
+    if not command.split():
+      self.insert_prompt()
+      return
+
+    # Background commands show the prompt again once they finish
+    if self.engine.execute(command):
+      self._running_command = command
+      return
+
+    self.insert_prompt()
+    self.commandEntered.emit(command)
+
+  # CONFIRMATION PROMPTS
+  def ask_confirmation(self, message, operation):
+    """Ask a y/n question; operation runs if the answer is y."""
+    self.output.write_line(f"\n{message} (y/n): ")
+    self._pending_operation = operation
+
+  # CLEAR SCREEN
+  def clear_screen(self):
+    self.output.discard()
+    self.clear()
+    self.show_welcome_message()
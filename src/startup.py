@@ -0,0 +1,41 @@
+import sys
+import time
+
+# Set by enable(); marks are no-ops otherwise, so they cost nothing
+_profile = None
+
+
+def enable(started=None):
+  """
+  Start recording startup phases (index.py --profile-startup)
+
+  Args:
+      started: (perf_counter(), len(sys.modules)) taken at the top of the
+          entry point, so the imports before enable() are counted too;
+          None to start counting now
+  """
+  global _profile
+  moment, modules = (time.perf_counter(), len(sys.modules)) if started is None else started
+  _profile = [("start", moment, modules)]
+
+
+def mark(label):
+  """Record that the phase named label just finished."""
+  if _profile is not None:
+    _profile.append((label, time.perf_counter(), len(sys.modules)))
+
+
+def report(stream=None):
+  """Print the recorded phases once, with their time and new imports."""
+  global _profile
+  if _profile is None:
+    return
+  phases, _profile = _profile, None
+  stream = stream or sys.stderr
+  started = phases[0][1]
+  print("Startup profile:", file=stream)
+  print(f"  {'Phase':36} {'ms':>8} {'total ms':>9} {'modules':>8}", file=stream)
+  for (_, previous, previous_modules), (label, moment, modules) in zip(phases, phases[1:]):
+    print(f"  {label:36} {(moment - previous) * 1000:8.1f} {(moment - started) * 1000:9.1f} "
+          f"{modules - previous_modules:+8d}", file=stream)
+  print("  (python -X importtime index.py breaks the imports down per module)", file=stream)
@@ -1,12 +1,36 @@
-from PyQt6.QtWidgets import QPlainTextEdit
-from PyQt6.QtGui import QFont, QKeySequence, QTextCharFormat, QTextCursor
+from PyQt6.QtWidgets import QApplication, QPlainTextEdit, QTextEdit
+from PyQt6.QtGui import QColor, QKeySequence, QTextCharFormat, QTextCursor
 from PyQt6.QtCore import Qt, pyqtSignal, QTimer
-import platform
-from pathlib import Path
-import shutil
-from datetime import datetime
+import time
+from src.metrics import METRICS
+from src.ansi import DEFAULT_STYLE, AnsiParser
+from src.find_bar import FindBar
+from src.line_editor import LineEditor
+from src.line_store import LineStore, normalize_line_breaks
+from src.output_search import OutputSearch, utf16_length
+from src.session_view import SessionView
+from src.text_formats import FORMATS
+
+# Matches highlighted at once; only those on screen are
+MAX_HIGHLIGHTS = 500
+
+# A regular expression is searched for once typing pauses this long
+REGEX_SEARCH_DELAY_MS = 150
+
+# Backgrounds of search matches and of the current one
+MATCH_COLOR = QColor("#613214")
+CURRENT_MATCH_COLOR = QColor("#9e6a03")
+
+
+class TerminalWidget(SessionView, QPlainTextEdit):
+  """
+  A session showing its output in the document it's typed into
+
+  The command is typed after the prompt at the end of the document, as
+  in a shell; see VirtualTerminal for the view meant for very large
+  outputs.
+  """
 
-class TerminalWidget(QPlainTextEdit):
   commandEntered = pyqtSignal(str)
   
   def __init__(self, parent=None):
@@ -14,17 +38,37 @@ class TerminalWidget(QPlainTextEdit):
     
     # Set up custom styling
     self.setup_styling()
-    
-    # Initialize command history
-    self.command_history = []
-    self.history_index = 0
 
-    # Track the last prompt position
-    self.last_prompt_position = 0
-    
-    # Set up prompt
-    self.prompt = "$ "
-    self.current_directory = Path.home()
+    self.setup_session(self)
+    self.document().blockCountChanged.connect(self.schedule_scrollback_trim)
+
+    # The prompt on screen, empty until the first one is shown
+    self.current_prompt = ""
+
+    # The command being typed is edited here and redrawn at the end of
+    # the document; _input_length is how many positions it takes there
+    self.editor = LineEditor()
+    self._input_length = 0
+
+    # Colours in program output, parsed as it's appended
+    self.ansi = AnsiParser()
+    # Plain text copy of the document, one line per block, that Ctrl+F
+    # searches without asking the document for its text
+    self.output_index = LineStore()
+    self.search = OutputSearch(self.output_index)
+    self._current_match = None
+    self.find_bar = FindBar(self)
+    self.find_bar.searchChanged.connect(self.schedule_search)
+    self._search_timer = QTimer(self)
+    self._search_timer.setSingleShot(True)
+    self._search_timer.setInterval(REGEX_SEARCH_DELAY_MS)
+    self._search_timer.timeout.connect(self.run_search)
+    self.find_bar.stepped.connect(self.step_match)
+    self.find_bar.closed.connect(self.close_search)
+    self.verticalScrollBar().valueChanged.connect(self.highlight_matches)
+
+    # Output is never undone, and an undo stack would grow as fast as the document
+    self.setUndoRedoEnabled(False)
 
     # Make widget read-only initially
     self.setReadOnly(True)
@@ -35,483 +79,326 @@ class TerminalWidget(QPlainTextEdit):
     # Show welcome message and initial prompt
     # this runs after widget is fully initialized
     QTimer.singleShot(0, self.initial_setup)
-  
-  # INITIAL SETUP
-  def initial_setup(self):
-    self.show_welcome_message()
-    self.insert_prompt()
 
-  # STYLINGS
-  def setup_styling(self):
-    # Set font
-    font = QFont("Consolas" if platform.system() == "Windows" else "Menlo")
-    font.setPointSize(11)
-    self.setFont(font)
-    
-    # Set colors and styling
-    self.setStyleSheet("""
-        QPlainTextEdit {
-            background-color: #1e1e1e;
-            color: #f0f0f0;
-            border: 1px solid #2d2d2d;
-            border-radius: 6px;
-            padding: 8px;
-        }
-    """)
-  
-  # SHOW WELCOME MESSAGE
-  def show_welcome_message(self):
-    welcome_text = """
-      ╔════════════════════════════════════════════════════════════════════════════╗
-      ║                     Welcome to Team D Terminal v1.0                        ║
-      ║                                                                            ║
-      ║    Type 'help' to see available commands and their descriptions            ║
-      ║    Press Ctrl+L to clear the screen                                        ║
-      ║    Type 'exit' to close the terminal                                       ║
-      ╚════════════════════════════════════════════════════════════════════════════╝
-    """
+  # OUTPUT (called by the OutputSink)
+  def append_output(self, text):
+    """Insert text, coloured as its escape sequences say, at the end of the document in one edit block."""
+    scrollbar = self.verticalScrollBar()
+    at_bottom = scrollbar.value() == scrollbar.maximum()
 
-    self.appendPlainText(welcome_text)
-    self.last_prompt_position = self.textCursor().position()
-
-  # SHOW HELP MESSAGE
-  def show_help_message(self):
-      help_text = """
-        Available Commands:
-        ------------------
-        clear or cls : Clear the terminal screen
-        cd <dir> : Change directory (use .. to go back)
-        ls : List files and directories in current directory
-        pwd : Show current directory path
-        mkdir <name> : Create a new directory
-        rmdir <name> : Remove an empty directory
-        rmdir -r <name> : Remove directory and its contents
-        rmdir -f <name> : Force remove without confirmation
-        touch <name> : Create a new file
-        rm <name> : Delete a file
-        write <file> <content> : Write content to a file
-        read <file> : Display the content of a file
-        help : Show this help message
-        exit : Close the terminal
-
-        Shortcuts:
-        ---------
-        Ctrl+L : Clear screen
-        Up/Down Arrow : Navigate through command history
-      """
-
-      self.appendPlainText(help_text)
-      self.last_prompt_position = self.textCursor().position()
-
-  # CREATE A FILE
-  def create_file(self, file_name):
-    try:
-        new_file = self.current_directory / file_name
-        
-        # Check if file already exists
-        if new_file.exists():
-            self.appendPlainText(f"\nError: File '{file_name}' already exists")
-            return
-            
-        # Check if the file extension is valid (optional)
-        valid_extensions = ['.txt', '.py', '.md', '.json', '.csv']  # Add more as needed
-        if not any(file_name.lower().endswith(ext) for ext in valid_extensions):
-            self.appendPlainText(f"\nError: Invalid file type. Please use one of these extensions: {', '.join(valid_extensions)}")
-            return
-            
-        # If all checks pass, create the file
-        new_file.touch()
-        self.appendPlainText(f"\nFile created: {new_file}")
-        
-    except Exception as e:
-        self.appendPlainText(f"\nError creating file: {e}")
-
-  # CREATE OR UPDATE EXISTING FILE
-  def write_to_file(self, file_name, content):
-    """Write content to a file in the current directory."""
-    try:
-      file_path = self.current_directory / file_name
-      # Remove surrounding quotes if present
-      content = content.strip('"\'')
-      with open(file_path, 'w', encoding='utf-8') as f:
-          f.write(content)
-      self.appendPlainText(f"\nContent written to '{file_name}' successfully")
-    except Exception as e:
-      self.appendPlainText(f"\nError writing to file: {e}")
-
-  # READ FILE
-  def read_file(self, file_name):
-    """Read and display the content of a file."""
-    try:
-      file_path = self.current_directory / file_name
-      if not file_path.exists():
-        self.appendPlainText(f"\nError: File '{file_name}' not found")
-        return
-      if file_path.is_dir():
-        self.appendPlainText(f"\nError: '{file_name}' is a directory")
-        return
-      with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-      self.appendPlainText(f"\nContent of '{file_name}':")
-      self.appendPlainText("----------------------------------------")
-      self.appendPlainText(content)
-      self.appendPlainText("----------------------------------------")
-    except Exception as e:
-      self.appendPlainText(f"\nError reading file: {e}")
-
-  # DELETE FILE
-  def delete_file(self, file_name):
-    """Delete a file from the current directory."""
-
-    try:
-      file_path = self.current_directory / file_name
-      if not file_path.exists():
-        self.appendPlainText(f"\nError: File '{file_name}' not found")
-        return
-      if file_path.is_dir():
-        shutil.rmtree(file_path)
-        self.appendPlainText(f"\nDirectory '{file_name}' and its contents deleted successfully")
-      else:
-        file_path.unlink()
-        self.appendPlainText(f"\nFile '{file_name}' deleted successfully")
-    except Exception as e:
-      self.appendPlainText(f"\nError deleting file: {e}")
-
-  # DIRECTORY CREATION
-  def create_directory(self, directory_name):
-    try:
-        # Check for invalid characters in directory name
-        invalid_chars = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']
-        if any(char in directory_name for char in invalid_chars):
-            self.appendPlainText(f"\nError: Directory name contains invalid characters. Cannot use: {' '.join(invalid_chars)}")
-            return
-
-        new_dir = self.current_directory / directory_name
-        
-        # Check if directory already exists
-        if new_dir.exists():
-            self.appendPlainText(f"\nError: Directory '{directory_name}' already exists")
-            return
-            
-        # If checks pass, create the directory
-        new_dir.mkdir()
-        self.appendPlainText(f"\nDirectory created: {new_dir}")
-        
-    except Exception as e:
-        self.appendPlainText(f"\nError creating directory: {e}")
-
-  # SHOW REMOVE DIRECTORY HELP
-  def show_rmdir_help(self):
-    """Show help for rmdir command"""
-    help_text = """
-    rmdir - Remove directory command
-
-    Usage: rmdir [options] <directory_name>
-
-    Options:
-      -r, --recursive  : Remove directory and its contents recursively
-      -f, --force     : Force removal without confirmation
-
-    Examples:
-      rmdir empty_dir          : Remove an empty directory
-      rmdir -r project_dir     : Remove directory and all its contents
-      rmdir -f old_dir         : Force remove without confirmation
-      rmdir -rf temp_dir       : Force remove recursively without confirmation
-    """
-    self.appendPlainText(help_text)
+    cursor = QTextCursor(self.document())
+    cursor.movePosition(QTextCursor.MoveOperation.End)
+    # The document and the search index must agree on where lines end
+    spans = self.ansi.feed(normalize_line_breaks(text))
+    cursor.beginEditBlock()
+    for span, style in spans:
+      cursor.insertText(span, FORMATS.get(style))
+    cursor.endEditBlock()
+    self.output_index.append("".join(span for span, style in spans))
 
-  # REMOVE DIRECTORY
-  def remove_directory(self, dir_name, force=False, recursive=False):
-    """
-    Remove a directory with various options
-    
-    Args:
-        dir_name (str): Name of directory to remove
-        force (bool): If True, skip confirmation
-        recursive (bool): If True, remove directory and all contents
-    """
-    try:
-      dir_path = self.current_directory / dir_name
-      
-      # Check if directory exists
-      if not dir_path.exists():
-        self.appendPlainText(f"\nError: Directory '{dir_name}' does not exist")
-        return
-          
-      # Check if it's actually a directory
-      if not dir_path.is_dir():
-        self.appendPlainText(f"\nError: '{dir_name}' is not a directory")
-        return
-          
-      # Check if directory is empty when not using recursive
-      if not recursive and any(dir_path.iterdir()):
-        self.appendPlainText(f"\nError: Directory '{dir_name}' is not empty")
-        self.appendPlainText("Use 'rmdir -r' to remove directory and its contents")
-        return
-          
-      # Safety check: prevent removing important directories
-      if dir_path == Path.home() or dir_path == Path("/"):
-        self.appendPlainText(f"\nError: Cannot remove critical directory '{dir_name}'")
-        return
-          
-      # Get confirmation if not force mode
-      if not force:
-        msg = f"Remove {'directory and its contents' if recursive else 'empty directory'}: {dir_name}?"
-        self.appendPlainText(f"\n{msg} (y/n): ")
-        # Store the confirmation state
-        self._awaiting_confirmation = True
-        self._pending_operation = lambda: self._complete_remove_directory(dir_path, recursive)
-        return
-          
-      # If force mode, proceed directly
-      self._complete_remove_directory(dir_path, recursive)
-        
-    except Exception as e:
-      self.appendPlainText(f"\nError removing directory: {e}")
-
-  def _complete_remove_directory(self, dir_path, recursive):
-    """Complete the directory removal operation"""
-    try:
-      if recursive:
-        shutil.rmtree(dir_path)
-        self.appendPlainText(f"\nDirectory '{dir_path.name}' and its contents removed successfully")
-      else:
-        dir_path.rmdir()
-        self.appendPlainText(f"\nEmpty directory '{dir_path.name}' removed successfully")
-    except Exception as e:
-        self.appendPlainText(f"\nError completing directory removal: {e}")
-
-  # CHANGE DIRECTORY
-  def change_directory(self, directory):
-    try:
-      # Handle multiple dots for going back multiple levels
-      if directory.startswith('.'):
-        dot_count = directory.count('.')
-        # Get the parent directory for the number of dots
-        new_dir = self.current_directory
-        for _ in range(dot_count):
-          new_dir = new_dir.parent
-          # Prevent going above root directory
-          if new_dir == new_dir.parent:
-              break
-      else:
-        # Normalize path separators and handle absolute/relative paths
-        normalized_path = directory.replace('\\', '/')
-        if normalized_path.startswith('/'):
-          # Absolute path
-          new_dir = Path(normalized_path)
-        else:
-          # Relative path
-          new_dir = self.current_directory / normalized_path
-
-      # Resolve the path to handle . and .. references
-      new_dir = new_dir.resolve()
-
-      if new_dir.is_dir():
-        self.current_directory = new_dir
-        self.appendPlainText(f"\nChanged directory to: {new_dir}")
-      else:
-        self.appendPlainText(f"\nDirectory not found: {new_dir}")
-    except Exception as e:
-      self.appendPlainText(f"\nError changing directory: {e}")
-
-  # FILES AND DIRECTORIES LISTINGS
-  def list_files(self):
-    """Enhanced list_files method with more details."""
-    try:
-      self.appendPlainText("\nDirectory contents:")
-      self.appendPlainText("----------------------------------------")
-      self.appendPlainText("Type       Size        Modified         Name")
-      self.appendPlainText("----------------------------------------")
-        
-      for item in sorted(self.current_directory.iterdir()):
-        item_type = "DIR " if item.is_dir() else "FILE"
-        stats = item.stat()
-        size = "-" if item.is_dir() else f"{stats.st_size:8d}B"
-        modified = datetime.fromtimestamp(stats.st_mtime).strftime("%Y-%m-%d %H:%M")
-        self.appendPlainText(f"{item_type:9} {size:10} {modified:15} {item.name}")
-      
-      self.appendPlainText("----------------------------------------")
-    except Exception as e:
-      self.appendPlainText(f"\nError listing files: {e}")
+    # Keep following the output unless the user scrolled up to read
+    if at_bottom:
+      scrollbar.setValue(scrollbar.maximum())
+
+    if self.find_bar.isVisible():
+      self.update_search()
+
+  def output_is_empty(self):
+    return self.document().isEmpty()
+
+  def clear(self):
+    super().clear()
+    self.output_index.clear()
+    self.search.clear()
+    self._current_match = None
+
+  # BACKGROUND COMMANDS
+  def lock_input(self, busy):
+    # The prompt stays locked while a command runs on the worker pool
+    if busy:
+      self.setReadOnly(True)
+
+  # SCROLLBACK LIMIT
+  def trim_scrollback(self):
+    """Move the oldest blocks beyond the scrollback limit into the archive."""
+    document = self.document()
+    excess = document.blockCount() - self.scrollback_limit
+    if excess <= 0:
+      return
+
+    # Evict some headroom too, so trimming doesn't run for every new line
+    excess = min(excess + self.scrollback_limit // 10, document.blockCount() - 1)
+    cursor = QTextCursor(document)
+    # findBlockByNumber() is a lookup, moving the cursor block by block isn't
+    cursor.setPosition(document.findBlockByNumber(excess).position(), QTextCursor.MoveMode.KeepAnchor)
+    # Qt returns blocks separated by U+2029 (paragraph separator)
+    lines = cursor.selectedText().split("\u2029")[:excess]
+    cursor.removeSelectedText()
+    self.archive.append(lines)
+    self.output_index.drop(excess)
+    forgotten = self.search.forget_dropped()
+    if self._current_match is not None:
+      self._current_match = self._current_match - forgotten if self._current_match >= forgotten else None
+    if self.find_bar.isVisible():
+      self.update_search()
+
+  def scrollback_size(self):
+    """Returns (lines, characters) currently on screen."""
+    document = self.document()
+    return document.blockCount(), document.characterCount()
 
   # PROMPT INSERTION
   def insert_prompt(self):
+    started = time.perf_counter()
     self.setReadOnly(False)
+    # Colours a program left switched on end with its output
+    self.output.flush()
+    self.ansi.reset()
     prompt_text = f"{self.prompt}{self.current_directory}>"
-    self.appendPlainText("" if self.document().isEmpty() else "\n")
-    self.insertPlainText(prompt_text + "")
-    self.last_prompt_position = self.textCursor().position()
+    is_empty = self.document().isEmpty() and not self.output.has_pending()
+    self.output.write_line("" if is_empty else "\n")
+    self.output.write(prompt_text)
+    # Input starts right after the prompt, so it has to be on screen now
+    self.output.flush()
+    self.current_prompt = prompt_text
+    self.editor.clear()
+    self._input_length = 0
+    self.watch_directory(self.current_directory)
     self.moveCursor(QTextCursor.MoveOperation.End)
     self.setReadOnly(False)
+    METRICS.record("prompt_seconds", time.perf_counter() - started)
  
   # CURRENT COMMAND UPDATE
   def replace_current_command(self, new_command):
-    self.setReadOnly(False)
-    cursor = self.textCursor()
+    self.editor.set_text(new_command)
+    self.render_input()
+
+  def render_input(self, shown=None):
+    """
+    Redraw the input after the prompt: the editor's text, or shown instead
+
+    Only the input at the end of the document is replaced, located by its
+    length, so this costs the length of the input and not of the output.
+    """
+    self.output.flush()
+    text = self.editor.text if shown is None else shown
+    cursor = QTextCursor(self.document())
     cursor.movePosition(QTextCursor.MoveOperation.End)
-    cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock, QTextCursor.MoveMode.KeepAnchor)
-    cursor.removeSelectedText()
-    
-    prompt_text = f"{self.prompt}{self.current_directory}>"
-    cursor.insertText(prompt_text + new_command)
-    self.setReadOnly(False)
-  
+    cursor.setPosition(cursor.position() - self._input_length, QTextCursor.MoveMode.KeepAnchor)
+    cursor.insertText(text, FORMATS.get(DEFAULT_STYLE))
+    self._input_length = utf16_length(text)
+    if shown is None:
+      cursor.setPosition(cursor.position() - utf16_length(text[self.editor.cursor:]))
+    self.setTextCursor(cursor)
+    self.ensureCursorVisible()
+
+  def command_text(self):
+    """Return what has been typed after the prompt."""
+    return self.editor.text
+
+  # REVERSE HISTORY SEARCH (Ctrl+R)
+  def show_reverse_search(self, failed=False):
+    search = self._search
+    label = "failed reverse-i-search" if failed else "reverse-i-search"
+    self.render_input(f"({label})`{search['query']}': {search['match'] or ''}")
+
+  # FIND IN OUTPUT (Ctrl+F)
+  def open_search(self):
+    self.position_find_bar()
+    self.find_bar.open_bar()
+    self.run_search()
+
+  def close_search(self):
+    self._search_timer.stop()
+    self._current_match = None
+    self.setExtraSelections([])
+    self.moveCursor(QTextCursor.MoveOperation.End)
+    self.setFocus()
+
+  def position_find_bar(self):
+    bar = self.find_bar
+    bar.adjustSize()
+    bar.move(max(self.viewport().width() - bar.width() - 8, 0), 8)
+
+  def resizeEvent(self, event):
+    super().resizeEvent(event)
+    if self.find_bar.isVisible():
+      self.position_find_bar()
+
+  def schedule_search(self):
+    # Literal queries narrow the previous matches and are quick; a regular
+    # expression rescans the whole index, so not for every key
+    if self.find_bar.regex():
+      self._search_timer.start()
+    else:
+      self._search_timer.stop()
+      self.run_search()
+
+  def run_search(self):
+    """Search for what the find bar holds and go to the first match from the top of the screen."""
+    valid = self.search.set_query(self.find_bar.text(), self.find_bar.regex(), self.find_bar.case_sensitive())
+    self._current_match = None
+    if valid and len(self.search):
+      self.go_to_match(self.search.nearest(self.firstVisibleBlock().blockNumber()))
+    else:
+      self.show_search_result()
+
+  def update_search(self):
+    # Search only the output that came in since the last search
+    self.search.update()
+    self.show_search_result()
+
+  def step_match(self, backwards):
+    if not len(self.search):
+      return
+    if self._current_match is None:
+      index = self.search.nearest(self.firstVisibleBlock().blockNumber(), backwards)
+    else:
+      index = (self._current_match + (-1 if backwards else 1)) % len(self.search)
+    self.go_to_match(index)
+
+  def go_to_match(self, index):
+    self._current_match = index
+    self.setTextCursor(self.match_cursor(index))
+    self.centerCursor()
+    self.show_search_result()
+
+  def match_cursor(self, index):
+    line, column, length = self.search.locate(index)
+    block = self.document().findBlockByNumber(line)
+    cursor = QTextCursor(block)
+    cursor.setPosition(block.position() + column)
+    cursor.setPosition(block.position() + column + length, QTextCursor.MoveMode.KeepAnchor)
+    return cursor
+
+  def show_search_result(self):
+    search = self.search
+    self.find_bar.show_count(self._current_match, len(search), search.capped, search.error)
+    self.highlight_matches()
+
+  def highlight_matches(self):
+    """Highlight the matches on screen, the current one brighter."""
+    if not self.find_bar.isVisible() or not len(self.search):
+      self.setExtraSelections([])
+      return
+    first = self.firstVisibleBlock().blockNumber()
+    last = self.cursorForPosition(self.viewport().rect().bottomLeft()).blockNumber()
+    selections = []
+    for index in self.search.between(first, last)[:MAX_HIGHLIGHTS]:
+      selection = QTextEdit.ExtraSelection()
+      selection.cursor = self.match_cursor(index)
+      highlight = QTextCharFormat()
+      highlight.setBackground(CURRENT_MATCH_COLOR if index == self._current_match else MATCH_COLOR)
+      selection.format = highlight
+      selections.append(selection)
+    self.setExtraSelections(selections)
+
   # KEY PRESS EVENTS
   def keyPressEvent(self, event):
-    cursor = self.textCursor()
-
-    # Handle confirmation prompts first
-    if hasattr(self, '_awaiting_confirmation'):
-      if event.text().lower() in ['y', 'n']:
-        self.appendPlainText(event.text())
-        if event.text().lower() == 'y':
-          if hasattr(self, '_pending_operation'):
-              self._pending_operation()
-        else:
-          self.appendPlainText("\nOperation cancelled")
-        
-        # Clean up confirmation state
-        delattr(self, '_awaiting_confirmation')
-        if hasattr(self, '_pending_operation'):
-          delattr(self, '_pending_operation')
-        
-        self.insert_prompt()
-        return
-      elif event.key() not in [Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down]:
-        return
-    
-    # Always allow copying
-    if event.matches(QKeySequence.StandardKey.Copy):
+    # Searching the output and scrolling work while a command runs too
+    if event.matches(QKeySequence.StandardKey.Find):
+      self.open_search()
+      return
+    if event.key() in (Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
       super().keyPressEvent(event)
       return
-        
-    # Prevent editing prompt area
-    if cursor.position() < self.last_prompt_position and not event.matches(QKeySequence.StandardKey.Copy):
-      if event.key() not in [Qt.Key.Key_Left, Qt.Key.Key_Right, Qt.Key.Key_Up, Qt.Key.Key_Down]:
-        return
-            
-    if event.key() == Qt.Key.Key_Return:
-      cursor = self.textCursor()
-      cursor.movePosition(QTextCursor.MoveOperation.StartOfBlock)
-      cursor.movePosition(QTextCursor.MoveOperation.EndOfBlock, QTextCursor.MoveMode.KeepAnchor)
-      command_line = cursor.selectedText()
-      command = command_line[command_line.find(self.prompt) + len(self.prompt) + str(self.current_directory).__len__() + 1:].strip()
-      
-      if command:
-        self.command_history.append(command)
-        self.history_index = len(self.command_history)
-        self.process_command(command)
-      else:
-        self.insert_prompt()
-            
-    elif event.key() == Qt.Key.Key_Up:
-      if self.history_index > 0:
-        self.history_index -= 1
-        self.replace_current_command(self.command_history[self.history_index])
-            
-    elif event.key() == Qt.Key.Key_Down:
-      if self.history_index < len(self.command_history) - 1:
-        self.history_index += 1
-        self.replace_current_command(self.command_history[self.history_index])
-      else:
-        self.history_index = len(self.command_history)
-        self.replace_current_command("")
-            
-    elif event.key() == Qt.Key.Key_Left:
-      if cursor.position() > self.last_prompt_position:
-        super().keyPressEvent(event)
-            
-    elif event.key() == Qt.Key.Key_Backspace:
-      if cursor.position() > self.last_prompt_position:
-        super().keyPressEvent(event)
-            
-    elif event.key() == Qt.Key.Key_Home:
-      cursor.setPosition(self.last_prompt_position)
-      self.setTextCursor(cursor)
-        
-    else:
+
+    if self.handle_session_key(event):
+      return
+
+    # Selecting and scrolling work on the whole document
+    if event.matches(QKeySequence.StandardKey.SelectAll):
       super().keyPressEvent(event)
+      return
 
-  # COMMANDS PROCESSES
-  def process_command(self, command):
-    parts = command.split()
-    if not parts:
-      self.insert_prompt()
+    if event.matches(QKeySequence.StandardKey.Paste):
+      self.insert_input(QApplication.clipboard().text())
       return
-        
-    if parts[0] == "help":
-      self.show_help_message()
-    elif parts[0] == "mkdir":
-      if len(parts) < 2:
-        self.appendPlainText("\nError: mkdir command requires a directory name")
-        self.appendPlainText("Usage: mkdir <directory_name>")
-        self.appendPlainText("Example: mkdir project")
-      else:
-        self.create_directory(parts[1])
-    elif parts[0] == "rmdir":
-      if len(parts) < 2:
-        self.show_rmdir_help()
-      else:
-        force = "-f" in parts or "--force" in parts
-        recursive = "-r" in parts or "--recursive" in parts
-        # Get the directory name (last argument)
-        dir_name = parts[-1]
-        self.remove_directory(dir_name, force=force, recursive=recursive)
-    elif parts[0] == "ls":
-      self.list_files()
-    elif parts[0] == "touch":
-      if len(parts) < 2:
-        self.appendPlainText("\nError: touch command requires a file name")
-        self.appendPlainText("Usage: touch <file_name>")
-        self.appendPlainText("Example: touch index.ts")
-      else:
-        self.create_file(parts[1])
-    elif parts[0] == "cd":
-      if len(parts) < 2:
-        self.appendPlainText("\nError: cd command requires a directory path")
-        self.appendPlainText("Usage: cd <directory_path>")
-        self.appendPlainText("Examples:")
-        self.appendPlainText("  cd project")
-        self.appendPlainText("  cd ..")
-        self.appendPlainText("  cd ../..")
-      else:
-        self.change_directory(parts[1])
-    elif parts[0] == "pwd":
-      self.show_current_directory()
-    elif parts[0] == "rm":
-      if len(parts) < 2:
-        self.appendPlainText("\nError: rm command requires a file name")
-        self.appendPlainText("Usage: rm <file_name>")
-        self.appendPlainText("Example: rm test.txt")
-      else:
-        self.delete_file(parts[1])
-    elif parts[0] == "write":
-      if len(parts) < 3:
-        self.appendPlainText("\nError: write command requires a file name and content")
-        self.appendPlainText("Usage: write <file_name> <content>")
-        self.appendPlainText('Example: write test.txt "Hello, World!"')
-      else:
-        content = ' '.join(parts[2:])
-        self.write_to_file(parts[1], content)
-    elif parts[0] == "read":
-      if len(parts) < 2:
-        self.appendPlainText("\nError: read command requires a file name")
-        self.appendPlainText("Usage: read <file_name>")
-        self.appendPlainText("Example: read test.txt")
+
+    key = event.key()
+    modifiers = event.modifiers()
+    control = modifiers & Qt.KeyboardModifier.ControlModifier
+    editor = self.editor
+
+    if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+      # Shift+Enter goes on typing the command on a new line
+      if modifiers & Qt.KeyboardModifier.ShiftModifier:
+        editor.insert("\n")
       else:
-        self.read_file(parts[1])
-    elif parts[0] == "clear" or parts[0] == "cls":
-      self.clear()
-      self.show_welcome_message()
-      self.insert_prompt()
-      return
+        self.submit_current_command()
+        return
+    elif key == Qt.Key.Key_Up:
+      if not editor.move_up():
+        self.recall_previous()
+        return
+    elif key == Qt.Key.Key_Down:
+      if not editor.move_down():
+        self.recall_next()
+        return
+    elif key == Qt.Key.Key_Left:
+      editor.move_word_left() if control else editor.move_left()
+    elif key == Qt.Key.Key_Right:
+      editor.move_word_right() if control else editor.move_right()
+    elif key == Qt.Key.Key_Home:
+      editor.move_home()
+    elif key == Qt.Key.Key_End:
+      editor.move_end()
+    elif key == Qt.Key.Key_Backspace:
+      editor.delete_word_before() if control else editor.backspace()
+    elif key == Qt.Key.Key_Delete:
+      editor.delete_word_after() if control else editor.delete()
+    elif key == Qt.Key.Key_U and control:
+      editor.delete_to_line_start()
+    elif key == Qt.Key.Key_K and control:
+      editor.delete_to_line_end()
+    elif event.text() and event.text().isprintable() and not control:
+      editor.insert(event.text())
     else:
-      self.appendPlainText(f"\nCommand not found: {command}")
-        
+      # Nothing else edits the document
+      return
+    self.render_input()
+
+  def insert_input(self, text):
+    """Insert pasted or dropped text into the command, only while it can be typed."""
+    if (not text or self.isReadOnly() or self.executor.is_busy()
+        or self._search is not None or self._pending_operation is not None):
+      return
+    # Line endings from other platforms become plain new lines
+    self.editor.insert(text.replace("\r\n", "\n").replace("\r", "\n"))
+    self.render_input()
+
+  def insertFromMimeData(self, source):
+    # Drag and drop and middle click paste
+    self.insert_input(source.text())
+
+  def inputMethodEvent(self, event):
+    # Text composed with an input method (accented and CJK characters)
+    self.insert_input(event.commitString())
+    event.accept()
+
+  def copy_selection(self):
+    self.copy()
+
+  def echo_command(self, command):
+    """Leave the command after its prompt, and in the index, as it was run."""
+    self.replace_current_command(command)
+    # The index only saw the prompt, the command was typed after it
+    self.output_index.replace_last(self.current_prompt + command)
+    self.editor.clear()
+    self._input_length = 0
+    self.moveCursor(QTextCursor.MoveOperation.End)
+
+  # TAB COMPLETION
+  def show_completions(self, line, candidates, total):
+    self.output.write_line("\n" + "  ".join(candidates))
+    if total > len(candidates):
+      self.output.write_line(f"... and {total - len(candidates)} more")
     self.insert_prompt()
-    self.commandEntered.emit(command)
+    self.replace_current_command(line)
 
-  # SHOW THE CURRENT DIRECTORY
-  def show_current_directory(self):
-    self.appendPlainText(f"\n{self.current_directory}")
\ No newline at end of file
+  # LAZY PAGING ON SCROLL
+  def wheelEvent(self, event):
+    super().wheelEvent(event)
+    scrollbar = self.verticalScrollBar()
+    if event.angleDelta().y() < 0 and scrollbar.value() == scrollbar.maximum():
+      self.page_on_scroll()
@@ -0,0 +1,52 @@
+from PyQt6.QtGui import QColor, QFont, QTextCharFormat
+from src.ansi import DEFAULT_BACKGROUND, DEFAULT_FOREGROUND, DEFAULT_STYLE, color_rgb
+
+# Formats kept by FormatCache before it starts over
+MAX_FORMATS = 1024
+
+
+class FormatCache:
+  """
+  One QTextCharFormat per ANSI Style, shared by every session
+
+  A coloured 100k line listing has a few distinct styles and hundreds
+  of thousands of spans; each span gets the cached format for its style
+  instead of a new one. TerminalWidget inserts text with these formats,
+  OutputView paints with their colours and font attributes.
+  """
+
+  def __init__(self):
+    self._formats = {}
+
+  def get(self, style):
+    text_format = self._formats.get(style)
+    if text_format is None:
+      if len(self._formats) >= MAX_FORMATS:
+        self._formats = {}
+      text_format = self._formats[style] = self.build(style)
+    return text_format
+
+  def build(self, style):
+    text_format = QTextCharFormat()
+    if style == DEFAULT_STYLE:
+      # No properties: the widget's own colours and font
+      return text_format
+    foreground = color_rgb(style.foreground) if style.foreground is not None else None
+    background = color_rgb(style.background) if style.background is not None else None
+    if style.inverse:
+      foreground, background = background or DEFAULT_BACKGROUND, foreground or DEFAULT_FOREGROUND
+    if style.dim:
+      foreground = tuple(value * 2 // 3 for value in foreground or DEFAULT_FOREGROUND)
+    if foreground is not None:
+      text_format.setForeground(QColor(*foreground))
+    if background is not None:
+      text_format.setBackground(QColor(*background))
+    if style.bold:
+      text_format.setFontWeight(QFont.Weight.Bold)
+    text_format.setFontItalic(style.italic)
+    text_format.setFontUnderline(style.underline)
+    text_format.setFontStrikeOut(style.strike)
+    return text_format
+
+
+FORMATS = FormatCache()
@@ -0,0 +1,183 @@
+import os
+import queue
+import stat
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads unlinking at once; deleting is bound by file system metadata
+# updates, which overlap well even on one core
+REMOVE_WORKERS = 8
+
+# Files handed to a worker at a time
+FILE_BATCH = 256
+
+# Seconds between two progress reports
+PROGRESS_INTERVAL = 1.0
+
+
+class RemovalStats:
+  """Running totals of a tree removal."""
+
+  def __init__(self):
+    self.files = 0
+    self.directories = 0
+    self.bytes = 0
+    self.errors = []
+    self.started = time.perf_counter()
+
+  def elapsed(self):
+    return time.perf_counter() - self.started
+
+  def files_per_second(self):
+    elapsed = self.elapsed()
+    return self.files / elapsed if elapsed > 0 else 0.0
+
+
+def _unlink(path):
+  try:
+    os.unlink(path)
+  except PermissionError:
+    if os.name != "nt":
+      raise
+    # Windows refuses to delete read-only files
+    os.chmod(path, stat.S_IWRITE)
+    os.unlink(path)
+
+
+def _scan(path):
+  """
+  List one directory for removal
+
+  Returns (subdirectories, files, errors) where files are (path, size)
+  pairs. Symbolic links are files here, they are removed, never followed.
+  """
+  directories, files, errors = [], [], []
+  try:
+    with os.scandir(path) as it:
+      for entry in it:
+        try:
+          if entry.is_dir(follow_symlinks=False):
+            directories.append(entry.path)
+          else:
+            files.append((entry.path, entry.stat(follow_symlinks=False).st_size))
+        except OSError as e:
+          errors.append((entry.path, e))
+  except OSError as e:
+    errors.append((path, e))
+  return directories, files, errors
+
+
+def _unlink_batch(files):
+  removed = 0
+  size = 0
+  errors = []
+  for path, file_size in files:
+    try:
+      _unlink(path)
+      removed += 1
+      size += file_size
+    except FileNotFoundError:
+      pass
+    except OSError as e:
+      errors.append((path, e))
+  return removed, size, errors
+
+
+def _rmdir(path):
+  try:
+    os.rmdir(path)
+    return None
+  except FileNotFoundError:
+    return None
+  except OSError as e:
+    return (path, e)
+
+
+def remove_tree(path, cancel=None, progress=None, workers=REMOVE_WORKERS):
+  """
+  Delete a directory and everything below it, using a pool of threads
+
+  Directories are listed with os.scandir on the pool and their files are
+  unlinked in batches there too, so listing and deleting overlap across
+  the tree. Emptied directories are then removed level by level, deepest
+  first. Entries that can't be removed are collected and skipped rather
+  than stopping everything, like "rm -rf".
+
+  Args:
+      path: Directory to delete; a symbolic link is removed, not followed
+      cancel (callable): Called regularly, raises to stop the removal
+      progress (callable): Called with the RemovalStats about every
+          PROGRESS_INTERVAL seconds
+      workers (int): Number of threads
+
+  Returns:
+      RemovalStats with the totals and a list of (path, error)
+  """
+  path = os.fspath(path)
+  stats = RemovalStats()
+  if os.path.islink(path):
+    _unlink(path)
+    stats.files += 1
+    return stats
+
+  levels = [[path]]
+  # Finished work arrives here; waiting on thousands of futures at once
+  # would cost a pass over all of them for every one that completes
+  done = queue.SimpleQueue()
+  pending = set()
+
+  def submit(kind, depth, func, argument):
+    future = pool.submit(func, argument)
+    pending.add(future)
+    future.add_done_callback(lambda future: done.put((kind, depth, future)))
+
+  with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="remove") as pool:
+    try:
+      submit("scan", 0, _scan, path)
+      last_report = time.perf_counter()
+      while pending:
+        try:
+          kind, depth, future = done.get(timeout=0.1)
+        except queue.Empty:
+          kind = None
+        if kind == "scan":
+          pending.discard(future)
+          directories, files, errors = future.result()
+          stats.errors.extend(errors)
+          if directories:
+            if len(levels) <= depth + 1:
+              levels.append([])
+            levels[depth + 1].extend(directories)
+            for directory in directories:
+              submit("scan", depth + 1, _scan, directory)
+          for start in range(0, len(files), FILE_BATCH):
+            submit("unlink", depth, _unlink_batch, files[start:start + FILE_BATCH])
+        elif kind == "unlink":
+          pending.discard(future)
+          removed, size, errors = future.result()
+          stats.files += removed
+          stats.bytes += size
+          stats.errors.extend(errors)
+
+        if cancel is not None:
+          cancel()
+        if progress is not None and time.perf_counter() - last_report >= PROGRESS_INTERVAL:
+          last_report = time.perf_counter()
+          progress(stats)
+
+      # Every file is gone, now the directories, children before parents
+      for level in reversed(levels):
+        for start in range(0, len(level), FILE_BATCH):
+          if cancel is not None:
+            cancel()
+          for error in pool.map(_rmdir, level[start:start + FILE_BATCH]):
+            if error is None:
+              stats.directories += 1
+            else:
+              stats.errors.append(error)
+    except BaseException:
+      # Cancelled: drop the queued work, the running batches finish quickly
+      for future in pending:
+        future.cancel()
+      raise
+  return stats
@@ -0,0 +1,277 @@
+import atexit
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+import stat
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Files per grep batch sent to a worker process, and the bytes that end
+# a batch early, so one batch is never much more than a few ms of work
+BATCH_FILES = 64
+BATCH_BYTES = 8 * 1024 * 1024
+
+# Batches in flight per worker process, bounding memory while streaming
+BATCHES_PER_WORKER = 2
+
+# Matches kept per file, lines shown up to this many characters
+MAX_MATCHES_PER_FILE = 10000
+MAX_LINE_CHARS = 500
+
+# A NUL byte in the first block marks a file as binary, like grep
+BINARY_CHECK_BYTES = 8192
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def walk(root, cancel=None):
+  """
+  Yield (relative_path, os.DirEntry) for everything below root
+
+  Directories are listed with os.scandir, each sorted by name, and
+  symbolic links are reported but never followed. Unreadable
+  directories are skipped.
+  """
+  stack = [("", os.fspath(root))]
+  while stack:
+    if cancel is not None:
+      cancel()
+    prefix, path = stack.pop()
+    try:
+      with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+      continue
+    subdirectories = []
+    for entry in entries:
+      relative = prefix + entry.name
+      yield relative, entry
+      try:
+        if entry.is_dir(follow_symlinks=False):
+          subdirectories.append((relative + os.sep, entry.path))
+      except OSError:
+        pass
+    # Reversed so the stack hands them out in name order
+    stack.extend(reversed(subdirectories))
+
+
+# FIND
+def parse_size(text):
+  """
+  Parse a find -size filter: [+|-]N[k|M|G]
+
+  Returns:
+      (sign, count, unit) where sign is "+", "-" or ""
+  """
+  match = re.fullmatch(r"([+-]?)(\d+)([kKmMgGc]?)", text)
+  if match is None:
+    raise ValueError(f"invalid size '{text}'")
+  units = {"": 1, "c": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+  return match.group(1), int(match.group(2)), units[match.group(3).lower()]
+
+
+def compare(sign, value, limit):
+  if sign == "+":
+    return value > limit
+  if sign == "-":
+    return value < limit
+  return value == limit
+
+
+def find(root, name=None, ignore_case=False, kind=None, size=None, mtime=None, now=None, cancel=None):
+  """
+  Yield the relative paths below root that pass every filter
+
+  Args:
+      name (str): Glob the file name has to match
+      ignore_case (bool): Match name case-insensitively
+      kind (str): "f" for files, "d" for directories
+      size (tuple): parse_size() result; sizes are rounded up to the unit, like find
+      mtime (tuple): (sign, days) - modified more (+), less (-) or exactly
+          that many whole days ago
+      now (float): Reference time for mtime
+  """
+  if name is not None and ignore_case:
+    name = name.lower()
+  for relative, entry in walk(root, cancel):
+    if name is not None:
+      entry_name = entry.name.lower() if ignore_case else entry.name
+      if not fnmatch.fnmatchcase(entry_name, name):
+        continue
+    try:
+      if kind is not None and entry.is_dir(follow_symlinks=False) != (kind == "d"):
+        continue
+      if size is not None or mtime is not None:
+        info = entry.stat(follow_symlinks=False)
+        if size is not None:
+          sign, count, unit = size
+          if not compare(sign, -(-info.st_size // unit), count):
+            continue
+        if mtime is not None:
+          sign, days = mtime
+          if not compare(sign, int((now - info.st_mtime) // 86400), days):
+            continue
+    except OSError:
+      continue
+    yield relative
+
+
+# GREP
+def grep_file(path, regex, files_only=False):
+  """
+  Search one file for regex, reading it through mmap
+
+  Returns:
+      None for binary or unreadable files, otherwise a list of
+      (line_number, line) - or [(0, "")] for a match when files_only
+  """
+  try:
+    with open(path, "rb") as f:
+      size = os.fstat(f.fileno()).st_size
+      if size == 0:
+        return []
+      with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if data.find(b"\0", 0, min(size, BINARY_CHECK_BYTES)) != -1:
+          return None
+        matches = []
+        position = 0
+        line_number = 1
+        counted_to = 0
+        while len(matches) < MAX_MATCHES_PER_FILE:
+          match = regex.search(data, position)
+          if match is None:
+            break
+          if files_only:
+            return [(0, "")]
+          start = data.rfind(b"\n", 0, match.start()) + 1
+          end = data.find(b"\n", match.start())
+          if end == -1:
+            end = size
+          line_number += data[counted_to:start].count(b"\n")
+          counted_to = start
+          line = data[start:end].rstrip(b"\r").decode("utf-8", errors="replace")
+          matches.append((line_number, line[:MAX_LINE_CHARS]))
+          # One hit per line, carry on after it
+          position = end + 1
+        return matches
+  except (OSError, ValueError):
+    return None
+
+
+def grep_batch(paths, pattern, flags, files_only):
+  """Worker process entry point: grep a batch of files."""
+  regex = re.compile(pattern, flags)
+  results = []
+  for path in paths:
+    results.append((path, grep_file(path, regex, files_only)))
+  return results
+
+
+def compile_pattern(pattern, ignore_case=False, fixed=False):
+  """Compile a grep pattern for bytes; raises re.error if it's invalid."""
+  source = re.escape(pattern) if fixed else pattern
+  flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+  return re.compile(source.encode("utf-8"), flags)
+
+
+def _batches(files):
+  batch = []
+  batch_bytes = 0
+  for path, size in files:
+    batch.append(path)
+    batch_bytes += size
+    if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+      yield batch
+      batch = []
+      batch_bytes = 0
+  if batch:
+    yield batch
+
+
+def process_pool():
+  """The shared worker processes, started on first use."""
+  global _pool
+  with _pool_lock:
+    if _pool is None:
+      # Forking a process running Qt threads isn't safe, start fresh ones
+      context = multiprocessing.get_context("spawn")
+      _pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=context)
+      atexit.register(_pool.shutdown, wait=False, cancel_futures=True)
+    return _pool
+
+
+def grep(files, regex, files_only=False, cancel=None):
+  """
+  Search (path, size) pairs for regex in parallel, streaming the results
+
+  Batches of files are searched in worker processes, at most a few per
+  worker at once, and results are yielded as each batch completes. A
+  search that fits in one batch runs right here instead, as starting a
+  process would cost more than it saves.
+
+  Yields:
+      (path, matches) as returned by grep_file
+  """
+  batches = _batches(files)
+  first = next(batches, None)
+  if first is None:
+    return
+  second = next(batches, None)
+  if second is None:
+    for path in first:
+      if cancel is not None:
+        cancel()
+      yield path, grep_file(path, regex, files_only)
+    return
+
+  pool = process_pool()
+  limit = (os.cpu_count() or 1) * BATCHES_PER_WORKER
+  queued = iter([first, second])
+  pending = set()
+  try:
+    while True:
+      while len(pending) < limit:
+        batch = next(queued, None) or next(batches, None)
+        if batch is None:
+          break
+        pending.add(pool.submit(grep_batch, batch, regex.pattern, regex.flags, files_only))
+      if not pending:
+        break
+      done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+      for future in done:
+        yield from future.result()
+      if cancel is not None:
+        cancel()
+  finally:
+    for future in pending:
+      future.cancel()
+
+
+def grep_targets(paths, recursive, include=None, cancel=None):
+  """
+  Yield (path, size) of the regular files to search
+
+  Directories are only descended into when recursive is set; include is
+  an optional glob file names have to match there.
+  """
+  for path in paths:
+    try:
+      info = os.stat(path)
+    except OSError:
+      continue
+    if not stat.S_ISDIR(info.st_mode):
+      yield path, info.st_size
+      continue
+    if not recursive:
+      continue
+    for relative, entry in walk(path, cancel):
+      if include is not None and not fnmatch.fnmatch(entry.name, include):
+        continue
+      try:
+        if entry.is_file(follow_symlinks=False):
+          yield entry.path, entry.stat(follow_symlinks=False).st_size
+      except OSError:
+        pass
@@ -0,0 +1,201 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer
+import time
+from src.line_editor import LineEditor
+from src.output_view import OutputView
+from src.output_search import utf16_length
+from src.metrics import METRICS
+from src.session_view import SessionView
+
+# Lines kept in memory before the oldest are archived; a line costs its
+# bytes plus 8, so this is far more than the text editor can hold
+VIRTUAL_SCROLLBACK_LIMIT = 1000000
+
+
+class CommandLine(QLineEdit):
+  """The input line; keys the terminal handles never reach QLineEdit."""
+
+  def __init__(self, terminal):
+    super().__init__(terminal)
+    self.terminal = terminal
+    self.setObjectName("commandLine")
+
+  def keyPressEvent(self, event):
+    if not self.terminal.handle_key(event):
+      super().keyPressEvent(event)
+
+  def focusNextPrevChild(self, next):
+    # Tab completes instead of moving the focus
+    return False
+
+
+class VirtualTerminal(SessionView, QWidget):
+  """
+  A session showing its output in an OutputView, typed into a separate line
+
+  The alternative to TerminalWidget for very large outputs (index.py
+  --virtual-output): the output is a LineStore drawn a screenful at a
+  time, and the command is edited in a QLineEdit below it rather than
+  after a prompt inside the document. It has the same interface for the
+  window and the engine as TerminalWidget.
+  """
+
+  commandEntered = pyqtSignal(str)
+
+  def __init__(self, parent=None):
+    super().__init__(parent)
+
+    self.output_view = OutputView()
+    self.prompt_label = QLabel()
+    self.prompt_label.setObjectName("promptLabel")
+    self.input = CommandLine(self)
+    self.setup_layout()
+    self.setup_styling()
+
+    self.setup_session(self.output_view)
+    self.scrollback_limit = VIRTUAL_SCROLLBACK_LIMIT
+    self.output.flushed.connect(self.schedule_scrollback_trim)
+
+    self.output_view.scrolledPastEnd.connect(self.page_on_scroll)
+
+    QTimer.singleShot(0, self.initial_setup)
+
+  # INITIAL SETUP
+  def setup_layout(self):
+    input_row = QWidget()
+    input_row.setObjectName("inputRow")
+    row = QHBoxLayout(input_row)
+    row.setContentsMargins(8, 4, 8, 4)
+    row.setSpacing(0)
+    row.addWidget(self.prompt_label)
+    row.addWidget(self.input)
+
+    layout = QVBoxLayout(self)
+    layout.setContentsMargins(0, 0, 0, 0)
+    layout.setSpacing(4)
+    layout.addWidget(self.output_view)
+    layout.addWidget(input_row)
+    # Clicking the session anywhere types into the input line
+    self.setFocusProxy(self.input)
+
+  # BACKGROUND COMMANDS
+  def lock_input(self, busy):
+    # The input line stays locked while a command runs on the worker pool
+    if busy:
+      self.input.setReadOnly(True)
+
+  # SCROLLBACK LIMIT
+  def trim_scrollback(self):
+    """Move the oldest lines beyond the scrollback limit into the archive."""
+    excess = len(self.output_view.store) - self.scrollback_limit
+    if excess <= 0:
+      return
+    # Evict some headroom too, so trimming doesn't run for every flush
+    self.archive.append(self.output_view.drop_lines(excess + self.scrollback_limit // 10))
+
+  def scrollback_size(self):
+    """Returns (lines, characters) currently on screen."""
+    store = self.output_view.store
+    return len(store), store.characters
+
+  # PROMPT
+  def prompt_text(self):
+    return f"{self.prompt}{self.current_directory}>"
+
+  def insert_prompt(self):
+    started = time.perf_counter()
+    # Colours a program left switched on end with its output
+    self.output.flush()
+    self.output_view.ansi.reset()
+    self.prompt_label.setText(self.prompt_text())
+    self.input.clear()
+    self.input.setReadOnly(False)
+    self.watch_directory(self.current_directory)
+    METRICS.record("prompt_seconds", time.perf_counter() - started)
+
+  def echo_command(self, command):
+    """Put the prompt and the command into the output, as they'd read in a shell."""
+    is_empty = self.output_view.output_is_empty() and not self.output.has_pending()
+    self.output.write_line(("" if is_empty else "\n") + self.prompt_text() + command)
+
+  def replace_current_command(self, command):
+    # Also ends a Ctrl+R search, which showed its query in the label
+    self.prompt_label.setText(self.prompt_text())
+    self.input.setText(command)
+
+  def command_text(self):
+    return self.input.text()
+
+  # REVERSE HISTORY SEARCH (Ctrl+R)
+  def show_reverse_search(self, failed=False):
+    search = self._search
+    label = "failed reverse-i-search" if failed else "reverse-i-search"
+    self.prompt_label.setText(f"({label})`{search['query']}': ")
+    self.input.setText(search["match"] or "")
+
+  # KEY PRESS EVENTS
+  def handle_key(self, event):
+    """
+    Keys of the input line that mean more than editing it
+
+    Returns:
+        True if the key was handled, False to let QLineEdit edit the line
+    """
+    key = event.key()
+    control = event.modifiers() & Qt.KeyboardModifier.ControlModifier
+
+    # The output scrolls whatever else is going on
+    if key in (Qt.Key.Key_PageUp, Qt.Key.Key_PageDown):
+      self.output_view.scroll_pages(-1 if key == Qt.Key.Key_PageUp else 1)
+      return True
+
+    if self.handle_session_key(event):
+      return True
+
+    if key in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+      self.submit_current_command()
+    elif key == Qt.Key.Key_Up:
+      self.recall_previous()
+    elif key == Qt.Key.Key_Down:
+      self.recall_next()
+    elif key == Qt.Key.Key_U and control:
+      self.edit_input(LineEditor.delete_to_line_start)
+    elif key == Qt.Key.Key_K and control:
+      self.edit_input(LineEditor.delete_to_line_end)
+    else:
+      return False
+    return True
+
+  def edit_input(self, edit):
+    """Apply a LineEditor edit QLineEdit has no key for to the input line."""
+    text = self.input.text()
+    editor = LineEditor()
+    editor.set_text(text)
+    # QLineEdit counts UTF-16 code units, like QTextDocument
+    position = self.input.cursorPosition()
+    if not text.isascii():
+      position = len(text.encode("utf-16-le")[:2 * position].decode("utf-16-le", "ignore"))
+    editor.cursor = position
+    edit(editor)
+    # Replacing the selection rather than setText() keeps Ctrl+Z working
+    self.input.selectAll()
+    self.input.insert(editor.text)
+    self.input.setCursorPosition(utf16_length(editor.text[:editor.cursor]))
+
+  def copy_selection(self):
+    # Text selected in the input line, else the selected output lines
+    if self.input.hasSelectedText():
+      self.input.copy()
+    else:
+      self.output_view.copy_selection()
+
+  # TAB COMPLETION
+  def show_completions(self, line, candidates, total):
+    self.echo_command(line)
+    self.output.write_line("  ".join(candidates))
+    if total > len(candidates):
+      self.output.write_line(f"... and {total - len(candidates)} more")
+
+  # CLEAR SCREEN
+  def clear(self):
+    self.output_view.clear()
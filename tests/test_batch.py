@@ -0,0 +1,64 @@
+import io
+import shutil
+import pytest
+from src.batch import main, run_batch
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+  (tmp_path / "app.log").write_text("start\nERROR one\nok\nERROR two\n", encoding="utf-8")
+  monkeypatch.chdir(tmp_path)
+  return tmp_path
+
+
+def run(*lines):
+  stream = io.StringIO()
+  status = run_batch(lines, stream)
+  return status, stream.getvalue()
+
+
+def test_successful_script(workdir):
+  status, output = run("# a comment", "", "pwd")
+  assert status == 0
+  assert output.strip() == str(workdir)
+
+
+def test_usage_error_fails(workdir):
+  status, output = run("head --lines 0 app.log")
+  assert status == 1
+  assert "Usage: head" in output
+
+
+def test_exit_ends_the_script(workdir):
+  status, output = run("exit", "read app.log |")
+  assert status == 0
+  assert output == ""
+
+
+def test_missing_script(workdir, capsys):
+  assert main(["--batch", "missing.txt"]) == 2
+  assert "could not read 'missing.txt'" in capsys.readouterr().err
+  assert main(["--batch"]) == 2
+
+
+@pytest.mark.parametrize("line", [
+  "read missing.txt", "cd nowhere", "rm nothing", "cat missing.txt", "du missing",
+])
+def test_failed_command(workdir, line):
+  status, output = run(line, "pwd")
+  assert status == 1
+  assert output.strip().endswith(str(workdir))
+
+
+@pytest.mark.skipif(not shutil.which("false"), reason="needs the false program")
+def test_program_exiting_with_an_error(workdir):
+  status, output = run("false")
+  assert status == 1
+  assert "false exited with code 1" in output
+
+
+def test_error_lines_in_a_file_are_not_a_failure(workdir):
+  (workdir / "errors.log").write_text("Error: disk full\n", encoding="utf-8")
+  status, output = run("read errors.log")
+  assert status == 0
+  assert "Error: disk full" in output
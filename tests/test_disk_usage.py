@@ -0,0 +1,76 @@
+import os
+import time
+from src import disk_usage as disk_usage_module
+from src.disk_usage import DiskUsageCache, disk_usage
+
+
+def make_tree(root):
+  (root / "sub").mkdir()
+  (root / "a.txt").write_bytes(b"x" * 10000)
+  (root / "sub" / "b.txt").write_bytes(b"y" * 20000)
+  # Changed long enough ago for scans to be trusted right away
+  past = time.time() - 60
+  for path in (root / "sub", root):
+    os.utime(path, (past, past))
+
+
+def totals(root, cache):
+  return {os.path.relpath(path, root): total for path, total, depth in disk_usage(root, cache)}
+
+
+def counting_scandir(monkeypatch):
+  scanned = []
+  scandir = os.scandir
+  monkeypatch.setattr(disk_usage_module.os, "scandir", lambda path: scanned.append(path) or scandir(path))
+  return scanned
+
+
+def test_scans_are_reused_while_the_directory_is_unchanged(tmp_path, monkeypatch):
+  make_tree(tmp_path)
+  cache = DiskUsageCache()
+  first = totals(tmp_path, cache)
+  assert first["."] > first["sub"] > 0
+  assert cache.total(tmp_path) == first["."]
+
+  # However long ago the scans were taken
+  monkeypatch.setattr(disk_usage_module.time, "time", lambda: time.perf_counter() + 1e9)
+  scanned = counting_scandir(monkeypatch)
+  assert totals(tmp_path, cache) == first
+  assert scanned == []
+
+
+def test_scan_right_after_a_change_is_not_trusted(tmp_path, monkeypatch):
+  (tmp_path / "a.txt").write_bytes(b"x" * 10000)
+  cache = DiskUsageCache()
+  totals(tmp_path, cache)
+  scanned = counting_scandir(monkeypatch)
+  totals(tmp_path, cache)
+  assert scanned == [str(tmp_path)]
+
+
+def test_changed_directory_is_scanned_again(tmp_path):
+  make_tree(tmp_path)
+  cache = DiskUsageCache()
+  before = totals(tmp_path, cache)
+  (tmp_path / "sub" / "c.txt").write_bytes(b"z" * 50000)
+  assert cache.total(tmp_path / "sub") is None
+  after = totals(tmp_path, cache)
+  assert after["sub"] > before["sub"]
+  assert after["."] - before["."] == after["sub"] - before["sub"]
+
+
+def test_invalidate_drops_the_directory_and_the_totals_holding_it(tmp_path):
+  make_tree(tmp_path)
+  cache = DiskUsageCache()
+  before = totals(tmp_path, cache)
+  mtime = os.stat(tmp_path / "sub").st_mtime_ns
+  with open(tmp_path / "sub" / "b.txt", "ab") as f:
+    f.write(b"y" * 100000)
+  # Grown in place: the directory looks unchanged
+  assert os.stat(tmp_path / "sub").st_mtime_ns == mtime
+  assert totals(tmp_path, cache) == before
+
+  cache.invalidate(tmp_path / "sub")
+  assert cache.total(tmp_path) is None
+  assert cache.total(tmp_path / "sub") is None
+  assert totals(tmp_path, cache)["sub"] > before["sub"]
@@ -0,0 +1,75 @@
+import errno
+import io
+import os
+import stat
+import pytest
+from src import file_copy, tree_remover
+from src.batch import run_batch
+from src.file_copy import atomic_write, concatenate, move
+
+
+@pytest.fixture
+def umask():
+  previous = os.umask(0o027)
+  yield 0o027
+  os.umask(previous)
+
+
+def mode_of(path):
+  return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_new_file_gets_the_default_permissions(tmp_path, umask):
+  atomic_write(tmp_path / "new.txt", [b"one", b"two"])
+  concatenate([tmp_path / "new.txt"], tmp_path / "joined.txt")
+  assert (tmp_path / "new.txt").read_bytes() == b"onetwo"
+  assert mode_of(tmp_path / "new.txt") == 0o666 & ~umask
+  assert mode_of(tmp_path / "joined.txt") == 0o666 & ~umask
+  # No temporary file is left behind
+  assert sorted(os.listdir(tmp_path)) == ["joined.txt", "new.txt"]
+
+
+def test_replaced_file_keeps_its_permissions(tmp_path, umask):
+  target = tmp_path / "secret.txt"
+  target.write_bytes(b"old")
+  os.chmod(target, 0o600)
+  atomic_write(target, [b"new"])
+  assert target.read_bytes() == b"new"
+  assert mode_of(target) == 0o600
+
+
+@pytest.fixture
+def other_file_system(monkeypatch):
+  """Make renaming anything out of "source" fail as it does across file systems."""
+  rename = os.rename
+
+  def cross_device_rename(source, destination):
+    if os.path.basename(os.fspath(source)) == "source":
+      raise OSError(errno.EXDEV, "Invalid cross-device link")
+    rename(source, destination)
+  monkeypatch.setattr(file_copy.os, "rename", cross_device_rename)
+
+
+def test_move_across_file_systems(tmp_path, other_file_system):
+  (tmp_path / "source").mkdir()
+  (tmp_path / "source" / "a.txt").write_bytes(b"a" * 1000)
+  stats = move(tmp_path / "source", tmp_path / "moved")
+  assert (stats.files, stats.errors, stats.left_behind) == (1, [], [])
+  assert not (tmp_path / "source").exists()
+  assert (tmp_path / "moved" / "a.txt").read_bytes() == b"a" * 1000
+
+
+def test_partial_move_is_reported(tmp_path, monkeypatch, other_file_system):
+  (tmp_path / "source").mkdir()
+  (tmp_path / "source" / "a.txt").write_bytes(b"a")
+  failed = tree_remover.RemovalStats()
+  failed.errors.append((str(tmp_path / "source" / "a.txt"), PermissionError(errno.EACCES, "Permission denied")))
+  monkeypatch.setattr(tree_remover, "remove_tree", lambda path, cancel=None: failed)
+  monkeypatch.chdir(tmp_path)
+
+  output = io.StringIO()
+  status = run_batch(["mv source moved"], output)
+  assert status == 1
+  assert "could not remove 1 entries of 'source'" in output.getvalue()
+  assert "Permission denied" in output.getvalue()
+  assert (tmp_path / "moved" / "a.txt").exists()
@@ -0,0 +1,103 @@
+import pytest
+from src import history
+from src.history import CommandHistory
+
+
+@pytest.fixture
+def commands(tmp_path):
+  return CommandHistory(tmp_path / "history")
+
+
+def test_empty_history_finds_nothing(commands):
+  assert commands.previous("") is None
+  assert commands.previous("ls") is None
+  assert commands.next("", after=None) is None
+  assert commands.search("ls") is None
+
+
+def test_next_without_a_recalled_entry(commands):
+  commands.append("ls")
+  # Down before any Up: nothing was recalled, so nothing is newer
+  assert commands.next("", after=None) is None
+  assert commands.next("ls", after=None) is None
+
+
+def test_previous_and_next_walk_the_matches(commands):
+  for command in ("ls", "cd src", "ls -l", "pwd"):
+    commands.append(command)
+  first = commands.previous("ls")
+  assert first[1] == "ls -l"
+  second = commands.previous("ls", before=first[0])
+  assert second[1] == "ls"
+  assert commands.previous("ls", before=second[0]) is None
+  assert commands.next("ls", after=second[0]) == first
+  assert commands.next("ls", after=first[0]) is None
+
+
+def test_prefix_without_a_match(commands):
+  commands.append("ls")
+  commands.append("pwd")
+  assert commands.previous("cd") is None
+  newest = commands.previous("")
+  assert commands.next("cd", after=newest[0] - 1) is None
+
+
+def test_rerun_command_moves_to_the_end(commands):
+  for command in ("ls", "pwd", "ls"):
+    commands.append(command)
+  assert len(commands) == 2
+  newest = commands.previous("")
+  assert newest[1] == "ls"
+  older = commands.previous("", before=newest[0])
+  assert older[1] == "pwd"
+  # The old slot of "ls" is skipped
+  assert commands.previous("", before=older[0]) is None
+
+
+def test_repeated_command_is_recorded_once(commands, tmp_path):
+  commands.append("ls")
+  commands.append("ls")
+  assert len(commands) == 1
+  assert (tmp_path / "history").read_text(encoding="utf-8") == "ls\n"
+
+
+def test_history_is_read_back(tmp_path):
+  commands = CommandHistory(tmp_path / "history")
+  commands.append("echo one\ntwo")
+  commands.append("cd C:\\temp")
+  again = CommandHistory(tmp_path / "history")
+  assert again.previous("")[1] == "cd C:\\temp"
+  assert again.previous("echo")[1] == "echo one\ntwo"
+
+
+@pytest.mark.parametrize("command", [
+  "cd C:\\new", "grep \\n file", "echo \\\\n", "a\\", "one\ntwo", "x\\\nn",
+])
+def test_escaping_round_trip(tmp_path, command):
+  CommandHistory(tmp_path / "history").append(command)
+  assert CommandHistory(tmp_path / "history").previous("")[1] == command
+
+
+def test_walk_across_segments(commands, monkeypatch):
+  monkeypatch.setattr(history, "SEGMENT_SIZE", 4)
+  for number in range(20):
+    commands.append(f"cmd {number}")
+    commands.append(f"other {number}")
+
+  found, position = [], None
+  while True:
+    hit = commands.previous("cmd", before=position)
+    if hit is None:
+      break
+    position, command = hit
+    found.append(command)
+  assert found == [f"cmd {number}" for number in reversed(range(20))]
+
+  found, position = [], commands.previous("cmd 0")[0]
+  while True:
+    hit = commands.next("cmd", after=position)
+    if hit is None:
+      break
+    position, command = hit
+    found.append(command)
+  assert found == [f"cmd {number}" for number in range(1, 20)]
@@ -0,0 +1,59 @@
+import pytest
+from src.line_editor import LineEditor
+
+
+def editor_at(text, cursor):
+  editor = LineEditor()
+  editor.set_text(text)
+  editor.cursor = cursor
+  return editor
+
+
+def test_insert_and_delete():
+  editor = LineEditor()
+  editor.insert("ls -l")
+  editor.move_left()
+  editor.backspace()
+  editor.delete()
+  assert (editor.text, editor.cursor) == ("ls ", 3)
+  editor.move_home()
+  editor.backspace()
+  assert (editor.text, editor.cursor) == ("ls ", 0)
+
+
+@pytest.mark.parametrize("method, text, cursor", [
+  ("delete_to_line_start", "world", 0),
+  ("delete_to_line_end", "hello ", 6),
+])
+def test_delete_to_line_start_and_end(method, text, cursor):
+  editor = editor_at("hello world", 6)
+  getattr(editor, method)()
+  assert (editor.text, editor.cursor) == (text, cursor)
+
+
+def test_delete_to_line_start_and_end_in_a_multi_line_command():
+  editor = editor_at("echo one\necho two", 14)
+  editor.delete_to_line_start()
+  assert (editor.text, editor.cursor) == ("echo one\ntwo", 9)
+  editor.delete_to_line_end()
+  assert (editor.text, editor.cursor) == ("echo one\n", 9)
+
+
+def test_words():
+  editor = editor_at("cd src/commands", 15)
+  editor.delete_word_before()
+  assert (editor.text, editor.cursor) == ("cd src/", 7)
+  editor.move_word_left()
+  assert editor.cursor == 3
+  editor.delete_word_after()
+  assert (editor.text, editor.cursor) == ("cd /", 3)
+
+
+def test_up_and_down_keep_the_column():
+  editor = editor_at("first line\nab\nthird line", 7)
+  assert editor.move_down() and editor.cursor == 13
+  assert editor.move_down() and editor.cursor == 16
+  assert not editor.move_down()
+  assert editor.move_up() and editor.cursor == 13
+  assert editor.move_up() and editor.cursor == 2
+  assert not editor.move_up()
@@ -0,0 +1,79 @@
+from src.line_store import LineStore, normalize_line_breaks
+
+
+def filled(*texts):
+  store = LineStore()
+  for text in texts:
+    store.append(text)
+  return store
+
+
+def test_empty_store():
+  store = LineStore()
+  assert store.is_empty()
+  assert len(store) == 1
+  assert store.lines(0, 1) == [""]
+  assert store.drop(5) == []
+
+
+def test_append_splits_lines():
+  store = filled("one\ntw", "o\nthree")
+  assert len(store) == 3
+  assert store.lines(0, 3) == ["one", "two", "three"]
+  assert store.line(1) == "two"
+  assert store.lines(1, 10) == ["two", "three"]
+  assert store.lines(2, 1) == []
+  assert store.characters == len("one\ntwo\nthree")
+  assert store.longest == 5
+
+
+def test_non_ascii_lines():
+  store = filled("héllo\n", "日本語\n")
+  assert store.lines(0, 3) == ["héllo", "日本語", ""]
+  assert store.characters == 10
+  # In bytes, what the horizontal scrollbar is sized by
+  assert store.longest == 9
+
+
+def test_replace_last():
+  store = filled("output\n$ ")
+  store.replace_last("$ ls")
+  assert store.lines(0, 2) == ["output", "$ ls"]
+  assert store.characters == len("output\n$ ls")
+  store.replace_last("$ a\nb")
+  assert store.lines(0, 3) == ["output", "$ a", "b"]
+
+
+def test_drop_keeps_offsets_absolute():
+  store = filled("a\nbb\nccc\n$ ")
+  end = store.starts[-1]
+  assert store.drop(2) == ["a", "bb"]
+  assert store.lines(0, len(store)) == ["ccc", "$ "]
+  assert store.base == len("a\nbb\n")
+  assert store.starts[-1] == end
+  assert store.characters == len("ccc\n$ ")
+  # The open last line is never dropped
+  assert store.drop(10) == ["ccc"]
+  assert store.lines(0, len(store)) == ["$ "]
+  store.append("more\n")
+  assert store.lines(0, len(store)) == ["$ more", ""]
+
+
+def test_clear():
+  store = filled("a\nb\n")
+  store.drop(1)
+  store.clear()
+  assert store.is_empty()
+  assert (len(store), store.base, store.longest, store.characters) == (1, 0, 0, 0)
+  store.append("x\n")
+  assert store.lines(0, 2) == ["x", ""]
+
+
+def test_line_breaks_are_normalized():
+  assert normalize_line_breaks("one\rtwo\r\nthree\u2028four\u2029five\n") == "one\ntwo\nthree\nfour\nfive\n"
+  assert normalize_line_breaks("plain") == "plain"
+
+
+def test_cr_only_input():
+  store = filled(normalize_line_breaks("one\rtwo\rthree\r"))
+  assert store.lines(0, len(store)) == ["one", "two", "three", ""]
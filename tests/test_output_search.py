@@ -0,0 +1,81 @@
+import random
+import pytest
+from src.line_store import LineStore, normalize_line_breaks
+from src.output_search import OutputSearch, self_overlapping
+
+
+def search_in(text):
+  store = LineStore()
+  store.append(text)
+  return OutputSearch(store)
+
+
+def found(search):
+  return list(zip(search.starts, search.ends))
+
+
+def fresh(store, query, case_sensitive=False):
+  search = OutputSearch(store)
+  search.set_query(query, case_sensitive=case_sensitive)
+  return found(search)
+
+
+@pytest.mark.parametrize("literal, expected", [
+  (b"a", False), (b"ab", False), (b"aa", True), (b"abab", True), (b"aba", True), (b"abc", False),
+])
+def test_self_overlapping(literal, expected):
+  assert self_overlapping(literal) == expected
+
+
+def test_narrowing_finds_a_match_inside_an_old_one():
+  search = search_in("xaaab\n$ ")
+  search.set_query("aa")
+  assert found(search) == [(1, 3)]
+  search.set_query("aab")
+  assert found(search) == [(2, 5)]
+
+
+def test_narrowing_keeps_only_longer_matches():
+  search = search_in("error\nerr\nERROR here\n$ ")
+  search.set_query("err")
+  assert len(search) == 3
+  search.set_query("erro")
+  assert found(search) == [(0, 4), (10, 14)]
+  search.set_query("error", case_sensitive=True)
+  assert found(search) == [(0, 5)]
+
+
+def test_last_line_is_not_searched():
+  search = search_in("abc\nabc")
+  search.set_query("abc")
+  assert found(search) == [(0, 3)]
+  search.store.append("\n")
+  search.update()
+  assert found(search) == [(0, 3), (4, 7)]
+
+
+def test_match_after_cr_line_breaks():
+  search = search_in(normalize_line_breaks("one\rtwo\rthree\r$ "))
+  search.set_query("three")
+  assert search.locate(0) == (2, 0, 5)
+
+
+def test_invalid_regex():
+  search = search_in("abc\n")
+  assert not search.set_query("(", regex=True)
+  assert search.error
+  assert len(search) == 0
+
+
+def test_narrowing_agrees_with_a_fresh_search():
+  generator = random.Random(1)
+  for _ in range(300):
+    text = "\n".join("".join(generator.choice("aAbx") for _ in range(generator.randint(0, 12)))
+                     for _ in range(generator.randint(1, 6))) + "\n$ "
+    query = "".join(generator.choice("aAb") for _ in range(generator.randint(1, 4)))
+    case_sensitive = generator.random() < 0.5
+    search = search_in(text)
+    # Typed one character at a time, as in the find bar
+    for size in range(1, len(query) + 1):
+      search.set_query(query[:size], case_sensitive=case_sensitive)
+      assert found(search) == fresh(search.store, query[:size], case_sensitive), (text, query[:size])
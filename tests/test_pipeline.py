@@ -0,0 +1,71 @@
+import io
+import pytest
+from src.batch import run_batch
+from src.pipeline import PipelineError, split_pipeline
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+  (tmp_path / "app.log").write_text("start\nERROR one\nok\nERROR two\n", encoding="utf-8")
+  monkeypatch.chdir(tmp_path)
+  return tmp_path
+
+
+def run(*lines):
+  stream = io.StringIO()
+  status = run_batch(lines, stream)
+  return status, stream.getvalue()
+
+
+def test_split_pipeline():
+  assert split_pipeline('read a.txt | grep "x | y" | head 2') == (["read a.txt", 'grep "x | y"', "head 2"], None)
+  assert split_pipeline("read a.txt >> 'out.txt'") == (["read a.txt"], ("out.txt", True))
+  for line in ("read a.txt |", "read a.txt > a b", "grep 'x"):
+    with pytest.raises(PipelineError):
+      split_pipeline(line)
+
+
+def test_pipeline(workdir):
+  status, output = run("read app.log | grep ERROR | head 1")
+  assert status == 0
+  assert output.strip() == "ERROR one"
+
+
+def test_redirected_pipeline(workdir):
+  status, output = run("read app.log | grep ERROR > errors.txt")
+  assert status == 0
+  assert output.strip() == ""
+  assert (workdir / "errors.txt").read_text(encoding="utf-8").split() == ["ERROR", "one", "ERROR", "two"]
+
+
+def test_broken_pipeline_fails(workdir):
+  status, output = run("read app.log |", "pwd")
+  assert status == 1
+  assert "empty command in pipeline" in output
+  # The script goes on after a failed line
+  assert output.strip().endswith(str(workdir))
+
+
+@pytest.mark.parametrize("line", ["clear | head", "cd .. | head", "pwd | cd ..", "read app.log | time pwd"])
+def test_gui_thread_command_is_no_stage(workdir, line):
+  status, output = run(line, "pwd")
+  assert status == 1
+  assert "can't be used in a pipeline" in output
+  assert output.strip().endswith(str(workdir))
+
+
+@pytest.mark.parametrize("line", ["mkdir new > out.txt", "touch new.txt >> out.txt", "rmdir -f old > out.txt"])
+def test_gui_thread_command_is_not_redirected(workdir, line):
+  (workdir / "old").mkdir()
+  status, output = run(line)
+  assert status == 1
+  assert "can't be used in a pipeline" in output
+  assert sorted(path.name for path in workdir.iterdir()) == ["app.log", "old"]
+
+
+def test_output_only_command_in_a_pipeline(workdir):
+  status, output = run("pwd > where.txt", "help | grep pwd", "time pwd | head 1")
+  assert status == 0
+  assert (workdir / "where.txt").read_text(encoding="utf-8") == f"{workdir}\n"
+  assert "Show current directory path" in output
+  assert "real " in output
@@ -0,0 +1,66 @@
+import pytest
+from src.commands.reading import write_lines
+
+
+class FakeTask:
+  def __init__(self):
+    self.written = []
+
+  def write(self, text):
+    self.written.append(text)
+
+
+class Lines:
+  """(line, offset) pairs like iter_lines(), remembering how far they were read."""
+
+  def __init__(self, count):
+    self.count = count
+    self.read = 0
+    self.closed = False
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    if self.read >= self.count:
+      raise StopIteration
+    self.read += 1
+    return f"line {self.read}", self.read * 10
+
+  def close(self):
+    self.closed = True
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_no_lines_for_a_limit_below_one(limit):
+  task, lines = FakeTask(), Lines(5)
+  assert write_lines(task, lines, limit) == (0, None)
+  assert task.written == []
+  assert lines.read == 0
+  assert lines.closed
+
+
+def test_limit_of_one():
+  task, lines = FakeTask(), Lines(5)
+  assert write_lines(task, lines, 1) == (1, 10)
+  assert task.written == ["line 1"]
+  assert lines.read == 1
+  assert lines.closed
+
+
+def test_limit_larger_than_the_input():
+  task, lines = FakeTask(), Lines(3)
+  assert write_lines(task, lines, 10, lead="\n") == (3, 30)
+  assert task.written == ["\nline 1\nline 2\nline 3"]
+  assert lines.closed
+
+
+def test_lines_are_written_in_batches():
+  task, lines = FakeTask(), Lines(1000)
+  assert write_lines(task, lines, 600, lead="\n") == (600, 6000)
+  assert len(task.written) == 3
+  # Only the first batch carries the lead
+  assert task.written[0].startswith("\nline 1\n")
+  assert task.written[1].startswith("line 257\n")
+  assert "\n".join(task.written).split("\n")[1:] == [f"line {n}" for n in range(1, 601)]
+  assert lines.read == 600